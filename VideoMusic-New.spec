@@ -6,7 +6,7 @@ a = Analysis(
     pathex=[],
     binaries=[],
     datas=[],
-    hiddenimports=[],
+    hiddenimports=['aiohttp'],  # cargado con lazy_module: invisible al análisis estático
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
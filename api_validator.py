@@ -3,12 +3,36 @@ API Connectivity Validator
 Validates that API keys are working correctly
 """
 import asyncio
-import aiohttp
-from typing import Dict, Tuple
+import hashlib
+import time
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from src.infrastructure.adapters.lazy_module import lazy_module
+
+# Cargado con la primera validación, no al importar la app
+aiohttp = lazy_module("aiohttp")
+
+# Upper bound per provider for the whole check (the OpenAI assistant lookup runs in a thread)
+PROVIDER_TIMEOUTS = {"suno": 12, "replicate": 12, "openai": 20}
+# How long a result is reused; failures expire sooner so a fixed key is picked up quickly
+RESULT_TTL = 300
+FAILURE_TTL = 60
+
+
+def key_fingerprint(*parts: Optional[str]) -> str:
+    """Stable identifier for a set of credentials that never exposes the key itself"""
+    joined = "\x00".join(part or "" for part in parts)
+    return hashlib.sha256(joined.encode("utf-8")).hexdigest()[:16]
+
 
 class APIValidator:
     """Validates API connectivity and credentials"""
 
+    # (provider, key fingerprint) -> (expires_at, checked_at, result)
+    _results: Dict[Tuple[str, str], Tuple[float, float, Tuple[bool, str]]] = {}
+    # Probes in flight, shared by concurrent callers with the same credentials
+    _inflight: Dict[Tuple[str, str], "asyncio.Future"] = {}
+
     @staticmethod
     async def validate_suno_api(api_key: str, base_url: str = "https://api.sunoapi.org") -> Tuple[bool, str]:
         """
@@ -170,39 +194,137 @@ class APIValidator:
                 return True, f"✅ OpenAI API conectada (Assistant no validado - {str(e)[:50]})"
 
     @staticmethod
-    async def validate_all_apis(
+    def _provider_checks(
         suno_key: str = None,
         suno_url: str = "https://api.sunoapi.org",
         replicate_token: str = None,
         openai_key: str = None,
         openai_assistant: str = None
-    ) -> Dict[str, Tuple[bool, str]]:
-        """
-        Validate all APIs at once
-        Returns dict with results for each API
-        """
-        results = {}
-
-        tasks = []
+    ) -> Dict[str, Tuple[str, Callable[[], Awaitable[Tuple[bool, str]]]]]:
+        """provider -> (key fingerprint, probe factory) for every configured provider"""
+        checks = {}
         if suno_key:
-            tasks.append(("suno", APIValidator.validate_suno_api(suno_key, suno_url)))
+            checks["suno"] = (
+                key_fingerprint(suno_key, suno_url),
+                lambda: APIValidator.validate_suno_api(suno_key, suno_url)
+            )
         if replicate_token:
-            tasks.append(("replicate", APIValidator.validate_replicate_api(replicate_token)))
+            checks["replicate"] = (
+                key_fingerprint(replicate_token),
+                lambda: APIValidator.validate_replicate_api(replicate_token)
+            )
         if openai_key:
-            tasks.append(("openai", APIValidator.validate_openai_api(openai_key, openai_assistant)))
+            checks["openai"] = (
+                key_fingerprint(openai_key, openai_assistant),
+                lambda: APIValidator.validate_openai_api(openai_key, openai_assistant)
+            )
+        return checks
+
+    @staticmethod
+    def _cached(provider: str, fingerprint: str) -> Optional[Tuple[float, Tuple[bool, str]]]:
+        entry = APIValidator._results.get((provider, fingerprint))
+        if entry is None:
+            return None
+        expires_at, checked_at, result = entry
+        if time.monotonic() >= expires_at:
+            del APIValidator._results[(provider, fingerprint)]
+            return None
+        return checked_at, result
 
-        if not tasks:
-            return results
+    @staticmethod
+    async def _run_check(provider: str, fingerprint: str,
+                         probe: Callable[[], Awaitable[Tuple[bool, str]]]) -> Tuple[bool, str]:
+        key = (provider, fingerprint)
+        inflight = APIValidator._inflight.get(key)
+        if inflight is not None:
+            return await asyncio.shield(inflight)
 
-        # Run all validations concurrently
-        for api_name, task in tasks:
+        future = asyncio.get_running_loop().create_future()
+        APIValidator._inflight[key] = future
+        try:
             try:
-                is_valid, message = await task
-                results[api_name] = (is_valid, message)
+                result = await asyncio.wait_for(probe(), timeout=PROVIDER_TIMEOUTS.get(provider, 15))
+            except asyncio.TimeoutError:
+                result = (False, f"⏱️ Timeout al validar {provider} ({PROVIDER_TIMEOUTS.get(provider, 15)}s)")
             except Exception as e:
-                results[api_name] = (False, f"❌ Error: {str(e)}")
+                result = (False, f"❌ Error: {str(e)}")
+
+            now = time.monotonic()
+            ttl = RESULT_TTL if result[0] else FAILURE_TTL
+            APIValidator._results[key] = (now + ttl, time.time(), result)
+            future.set_result(result)
+            return result
+        finally:
+            if not future.done():
+                future.cancel()
+            APIValidator._inflight.pop(key, None)
+
+    @staticmethod
+    async def validate_all_apis(
+        suno_key: str = None,
+        suno_url: str = "https://api.sunoapi.org",
+        replicate_token: str = None,
+        openai_key: str = None,
+        openai_assistant: str = None,
+        use_cache: bool = True
+    ) -> Dict[str, Tuple[bool, str]]:
+        """
+        Validate all APIs at once, concurrently, each with its own timeout.
+        Fresh cached results are reused unless use_cache is False.
+        Returns dict with results for each API
+        """
+        checks = APIValidator._provider_checks(
+            suno_key, suno_url, replicate_token, openai_key, openai_assistant
+        )
+
+        results = {}
+        pending = {}
+        for provider, (fingerprint, probe) in checks.items():
+            cached = APIValidator._cached(provider, fingerprint) if use_cache else None
+            if cached is not None:
+                results[provider] = cached[1]
+            else:
+                pending[provider] = APIValidator._run_check(provider, fingerprint, probe)
 
-        return results
+        if pending:
+            # Run all validations concurrently
+            outcomes = await asyncio.gather(*pending.values(), return_exceptions=True)
+            for provider, outcome in zip(pending, outcomes):
+                if isinstance(outcome, BaseException):
+                    results[provider] = (False, f"❌ Error: {str(outcome)}")
+                else:
+                    results[provider] = outcome
+
+        return {provider: results[provider] for provider in checks}
+
+    @staticmethod
+    def cached_health(
+        suno_key: str = None,
+        suno_url: str = "https://api.sunoapi.org",
+        replicate_token: str = None,
+        openai_key: str = None,
+        openai_assistant: str = None
+    ) -> Dict[str, Dict]:
+        """
+        Last known health of each configured API, without probing.
+        Providers with no fresh result are reported as "unknown".
+        """
+        checks = APIValidator._provider_checks(
+            suno_key, suno_url, replicate_token, openai_key, openai_assistant
+        )
+        health = {}
+        for provider, (fingerprint, _) in checks.items():
+            cached = APIValidator._cached(provider, fingerprint)
+            if cached is None:
+                health[provider] = {"status": "unknown"}
+            else:
+                checked_at, (is_valid, message) = cached
+                health[provider] = {
+                    "status": "ok" if is_valid else "error",
+                    "message": message,
+                    "checked_at": checked_at
+                }
+        return health
 
     @staticmethod
     async def quick_validate(api_name: str, **kwargs) -> Tuple[bool, str]:
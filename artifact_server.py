@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Static artifact serving for generated files (audio, images, video)
+Strong ETags from content hashes, conditional requests, byte ranges and caching
+"""
+
+import asyncio
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from email.utils import formatdate
+from pathlib import Path
+from typing import Iterator, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import Response, StreamingResponse
+
+
+MEDIA_TYPES = {
+    ".mp3": "audio/mpeg",
+    ".wav": "audio/wav",
+    ".ogg": "audio/ogg",
+    ".png": "image/png",
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".mp4": "video/mp4",
+    ".webm": "video/webm",
+    ".m3u8": "application/vnd.apple.mpegurl",
+    ".m4s": "video/iso.segment"
+}
+
+# Versioned URLs (?v=...) point at one exact file state, so browsers may keep them forever.
+# Unversioned URLs must revalidate because a session file can be regenerated in place.
+IMMUTABLE_CACHE_CONTROL = "private, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "private, no-cache"
+
+_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class ArtifactServer:
+    """Serves files under a root directory with ETag/304, Range/206 and cache headers"""
+
+    def __init__(self, chunk_size: int = 256 * 1024, max_cached_etags: int = 4096):
+        self.chunk_size = chunk_size
+        self.max_cached_etags = max_cached_etags
+        # (path, mtime_ns, size) -> etag; a changed file gets a new key, so no invalidation needed
+        self._etags: "OrderedDict[Tuple[str, int, int], str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def version_token(file_path: Path) -> str:
+        """Cheap per-file-state token for cache-busting URLs"""
+        stat = file_path.stat()
+        return f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
+
+    def versioned_url(self, url: str, file_path: Path) -> str:
+        return f"{url}?v={self.version_token(file_path)}"
+
+    def _hash_file(self, file_path: Path) -> str:
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return f'"{digest.hexdigest()[:32]}"'
+
+    def etag_for(self, file_path: Path, stat: os.stat_result) -> str:
+        """Strong ETag from the file content, hashed once per file state"""
+        key = (str(file_path), stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            etag = self._etags.get(key)
+            if etag is not None:
+                self._etags.move_to_end(key)
+                return etag
+
+        etag = self._hash_file(file_path)
+        with self._lock:
+            self._etags[key] = etag
+            while len(self._etags) > self.max_cached_etags:
+                self._etags.popitem(last=False)
+        return etag
+
+    @staticmethod
+    def resolve(root: Path, *parts: str) -> Optional[Path]:
+        """Join parts under root, refusing anything that escapes it"""
+        root = root.resolve()
+        candidate = root.joinpath(*parts).resolve()
+        if candidate != root and root not in candidate.parents:
+            return None
+        return candidate if candidate.is_file() else None
+
+    @staticmethod
+    def _etag_matches(header: str, etag: str) -> bool:
+        if header.strip() == '*':
+            return True
+        candidates = [tag.strip() for tag in header.split(',')]
+        # If-None-Match uses weak comparison
+        return any(tag.removeprefix('W/') == etag for tag in candidates)
+
+    @staticmethod
+    def parse_range(header: str, file_size: int) -> Optional[Tuple[int, int]]:
+        """
+        Parse a single "bytes=" range into inclusive (start, end).
+        Returns None when the header should be ignored (multi-range or malformed)
+        and raises ValueError when it is unsatisfiable.
+        """
+        match = _RANGE_RE.match(header.strip())
+        if not match:
+            return None
+        start_s, end_s = match.groups()
+        if not start_s and not end_s:
+            return None
+
+        if not start_s:
+            # Suffix range: last N bytes
+            length = int(end_s)
+            if length == 0:
+                raise ValueError("Empty suffix range")
+            return max(file_size - length, 0), file_size - 1
+
+        start = int(start_s)
+        end = int(end_s) if end_s else file_size - 1
+        if start >= file_size or end < start:
+            raise ValueError("Range not satisfiable")
+        return start, min(end, file_size - 1)
+
+    def _iter_file(self, file_path: Path, start: int, length: int) -> Iterator[bytes]:
+        with open(file_path, 'rb') as f:
+            f.seek(start)
+            remaining = length
+            while remaining > 0:
+                chunk = f.read(min(self.chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+
+    async def serve(self, request: Request, file_path: Path) -> Response:
+        stat = file_path.stat()
+        file_size = stat.st_size
+        etag = await asyncio.to_thread(self.etag_for, file_path, stat)
+
+        versioned = request.query_params.get('v') == f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
+        headers = {
+            "ETag": etag,
+            "Last-Modified": formatdate(stat.st_mtime, usegmt=True),
+            "Accept-Ranges": "bytes",
+            "Cache-Control": IMMUTABLE_CACHE_CONTROL if versioned else REVALIDATE_CACHE_CONTROL
+        }
+        media_type = MEDIA_TYPES.get(file_path.suffix.lower(), "application/octet-stream")
+
+        if_none_match = request.headers.get('if-none-match')
+        if if_none_match and self._etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=headers)
+
+        start, end = 0, file_size - 1
+        status_code = 200
+        range_header = request.headers.get('range')
+        if_range = request.headers.get('if-range')
+        # If-Range with a stale validator means "send the whole new file"
+        if range_header and (not if_range or if_range.strip() == etag):
+            try:
+                byte_range = self.parse_range(range_header, file_size)
+            except ValueError:
+                return Response(
+                    status_code=416,
+                    headers={**headers, "Content-Range": f"bytes */{file_size}"}
+                )
+            if byte_range is not None:
+                start, end = byte_range
+                status_code = 206
+                headers["Content-Range"] = f"bytes {start}-{end}/{file_size}"
+
+        length = max(end - start + 1, 0)
+        headers["Content-Length"] = str(length)
+
+        if request.method == "HEAD":
+            return Response(status_code=status_code, headers=headers, media_type=media_type)
+
+        return StreamingResponse(
+            self._iter_file(file_path, start, length),
+            status_code=status_code,
+            headers=headers,
+            media_type=media_type
+        )
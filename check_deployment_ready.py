@@ -81,6 +81,11 @@ def check_deployment_readiness():
         print("[ERROR] Source directory not found!")
         all_good = False
 
+    # Cold start: importing the app must not pull in media/SDK dependencies
+    from startup_profile import check_import_budget
+    if check_import_budget("web_app_secure") is False:
+        all_good = False
+
     print("\n" + "="*50)
 
     if all_good:
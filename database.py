@@ -4,96 +4,158 @@ Database module for user management and sessions
 import sqlite3
 import hashlib
 import secrets
+import threading
+import time
 from datetime import datetime, timedelta
 from typing import Optional, Dict, List
 from pathlib import Path
 
+from src.infrastructure.persistence.sqlite_pool import get_pool
+
+
+class SessionCache:
+    """Short-lived in-memory cache of auth token -> user lookups"""
+
+    def __init__(self, ttl_seconds: float = 30.0, negative_ttl_seconds: float = 5.0,
+                 max_entries: int = 10000):
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.max_entries = max_entries
+        self._entries: Dict[str, tuple] = {}  # token -> (expires_monotonic, user or None)
+        self._lock = threading.Lock()
+
+    def get(self, token: str):
+        """Return (hit, user). A hit with user None means the token is known to be invalid."""
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return False, None
+            expires, user = entry
+            if expires <= time.monotonic():
+                del self._entries[token]
+                return False, None
+            return True, (dict(user) if user else None)
+
+    def put(self, token: str, user: Optional[Dict], session_expires_at: Optional[datetime] = None):
+        ttl = self.ttl_seconds if user else self.negative_ttl_seconds
+        if session_expires_at is not None:
+            # Never serve a token past its own expiry
+            remaining = (session_expires_at - datetime.now()).total_seconds()
+            ttl = min(ttl, max(remaining, 0.0))
+        if ttl <= 0:
+            return
+
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self._evict()
+            self._entries[token] = (time.monotonic() + ttl, dict(user) if user else None)
+
+    def invalidate(self, token: str):
+        with self._lock:
+            self._entries.pop(token, None)
+
+    def invalidate_user(self, user_id: int):
+        with self._lock:
+            stale = [token for token, (_, user) in self._entries.items()
+                     if user and user.get("id") == user_id]
+            for token in stale:
+                del self._entries[token]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _evict(self):
+        now = time.monotonic()
+        for token in [t for t, (expires, _) in self._entries.items() if expires <= now]:
+            del self._entries[token]
+        # Still full: drop the oldest insertions
+        overflow = len(self._entries) - self.max_entries + 1
+        if overflow > 0:
+            for token in list(self._entries)[:overflow]:
+                del self._entries[token]
+
+
 class Database:
     def __init__(self, db_path: str = "data/videomusic.db"):
         # Ensure data directory exists
         Path(db_path).parent.mkdir(parents=True, exist_ok=True)
         self.db_path = db_path
+        self.pool = get_pool(db_path)
+        self.session_cache = SessionCache()
         self.init_database()
 
-    def get_connection(self):
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        return conn
-
     def init_database(self):
         """Initialize database tables"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-
-        # Users table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT UNIQUE NOT NULL,
-                email TEXT UNIQUE NOT NULL,
-                password_hash TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                is_admin BOOLEAN DEFAULT 0,
-                is_active BOOLEAN DEFAULT 1
-            )
-        """)
-
-        # Sessions table (auth tokens)
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS auth_sessions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                token TEXT UNIQUE NOT NULL,
-                expires_at TIMESTAMP NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users(id)
-            )
-        """)
-
-        # User API settings table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS user_api_settings (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER UNIQUE NOT NULL,
-                suno_api_key TEXT,
-                suno_base_url TEXT DEFAULT 'https://api.sunoapi.org',
-                replicate_api_token TEXT,
-                openai_api_key TEXT,
-                openai_assistant_id TEXT DEFAULT 'asst_tR6OL8QLpSsDDlc6hKdBmVNU',
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users(id)
-            )
-        """)
-
-        # Generation sessions tracking
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS generation_sessions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                session_id TEXT UNIQUE NOT NULL,
-                title TEXT NOT NULL,
-                style TEXT,
-                status TEXT DEFAULT 'pending',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                completed_at TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users(id)
-            )
-        """)
-
-        # Create default admin user if not exists
-        cursor.execute("SELECT COUNT(*) as count FROM users WHERE username = ?", ("admin",))
-        if cursor.fetchone()["count"] == 0:
-            admin_password = "admin123"  # Change this in production!
-            password_hash = self.hash_password(admin_password)
-            cursor.execute("""
-                INSERT INTO users (username, email, password_hash, is_admin)
-                VALUES (?, ?, ?, 1)
-            """, ("admin", "admin@videomusic.local", password_hash))
-            print(f"⚠️  Default admin user created: admin / {admin_password}")
-            print("⚠️  PLEASE CHANGE THE PASSWORD IMMEDIATELY!")
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
 
-        conn.commit()
-        conn.close()
+            # Users table
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS users (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    username TEXT UNIQUE NOT NULL,
+                    email TEXT UNIQUE NOT NULL,
+                    password_hash TEXT NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    is_admin BOOLEAN DEFAULT 0,
+                    is_active BOOLEAN DEFAULT 1
+                )
+            """)
+
+            # Sessions table (auth tokens)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS auth_sessions (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id INTEGER NOT NULL,
+                    token TEXT UNIQUE NOT NULL,
+                    expires_at TIMESTAMP NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (user_id) REFERENCES users(id)
+                )
+            """)
+
+            # User API settings table
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS user_api_settings (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id INTEGER UNIQUE NOT NULL,
+                    suno_api_key TEXT,
+                    suno_base_url TEXT DEFAULT 'https://api.sunoapi.org',
+                    replicate_api_token TEXT,
+                    openai_api_key TEXT,
+                    openai_assistant_id TEXT DEFAULT 'asst_tR6OL8QLpSsDDlc6hKdBmVNU',
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (user_id) REFERENCES users(id)
+                )
+            """)
+
+            # Generation sessions tracking
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS generation_sessions (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id INTEGER NOT NULL,
+                    session_id TEXT UNIQUE NOT NULL,
+                    title TEXT NOT NULL,
+                    style TEXT,
+                    status TEXT DEFAULT 'pending',
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    completed_at TIMESTAMP,
+                    FOREIGN KEY (user_id) REFERENCES users(id)
+                )
+            """)
+
+            # Create default admin user if not exists
+            cursor.execute("SELECT COUNT(*) as count FROM users WHERE username = ?", ("admin",))
+            if cursor.fetchone()["count"] == 0:
+                admin_password = "admin123"  # Change this in production!
+                password_hash = self.hash_password(admin_password)
+                cursor.execute("""
+                    INSERT INTO users (username, email, password_hash, is_admin)
+                    VALUES (?, ?, ?, 1)
+                """, ("admin", "admin@videomusic.local", password_hash))
+                print(f"⚠️  Default admin user created: admin / {admin_password}")
+                print("⚠️  PLEASE CHANGE THE PASSWORD IMMEDIATELY!")
 
     @staticmethod
     def hash_password(password: str) -> str:
@@ -108,18 +170,16 @@ class Database:
     def create_user(self, username: str, email: str, password: str, is_admin: bool = False) -> Optional[int]:
         """Create a new user"""
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
 
-            password_hash = self.hash_password(password)
-            cursor.execute("""
-                INSERT INTO users (username, email, password_hash, is_admin)
-                VALUES (?, ?, ?, ?)
-            """, (username, email, password_hash, is_admin))
+                password_hash = self.hash_password(password)
+                cursor.execute("""
+                    INSERT INTO users (username, email, password_hash, is_admin)
+                    VALUES (?, ?, ?, ?)
+                """, (username, email, password_hash, is_admin))
 
-            user_id = cursor.lastrowid
-            conn.commit()
-            conn.close()
+                user_id = cursor.lastrowid
 
             return user_id
         except sqlite3.IntegrityError:
@@ -127,18 +187,17 @@ class Database:
 
     def authenticate_user(self, username: str, password: str) -> Optional[Dict]:
         """Authenticate user and return user data"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
 
-        password_hash = self.hash_password(password)
-        cursor.execute("""
-            SELECT id, username, email, is_admin, is_active
-            FROM users
-            WHERE username = ? AND password_hash = ? AND is_active = 1
-        """, (username, password_hash))
+            password_hash = self.hash_password(password)
+            cursor.execute("""
+                SELECT id, username, email, is_admin, is_active
+                FROM users
+                WHERE username = ? AND password_hash = ? AND is_active = 1
+            """, (username, password_hash))
 
-        user = cursor.fetchone()
-        conn.close()
+            user = cursor.fetchone()
 
         if user:
             return dict(user)
@@ -146,100 +205,110 @@ class Database:
 
     def create_session(self, user_id: int, expires_hours: int = 24) -> str:
         """Create authentication session and return token"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
 
-        token = self.generate_token()
-        expires_at = datetime.now() + timedelta(hours=expires_hours)
+            token = self.generate_token()
+            expires_at = datetime.now() + timedelta(hours=expires_hours)
 
-        cursor.execute("""
-            INSERT INTO auth_sessions (user_id, token, expires_at)
-            VALUES (?, ?, ?)
-        """, (user_id, token, expires_at))
+            cursor.execute("""
+                INSERT INTO auth_sessions (user_id, token, expires_at)
+                VALUES (?, ?, ?)
+            """, (user_id, token, expires_at))
 
-        conn.commit()
-        conn.close()
+        # Drop any negative entry left by an earlier probe of this token
+        self.session_cache.invalidate(token)
 
         return token
 
     def validate_session(self, token: str) -> Optional[Dict]:
-        """Validate session token and return user data"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        """Validate session token and return user data (cached, SQLite only on misses)"""
+        hit, user = self.session_cache.get(token)
+        if hit:
+            return user
 
-        cursor.execute("""
-            SELECT u.id, u.username, u.email, u.is_admin
-            FROM auth_sessions s
-            JOIN users u ON s.user_id = u.id
-            WHERE s.token = ? AND s.expires_at > ? AND u.is_active = 1
-        """, (token, datetime.now()))
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
 
-        user = cursor.fetchone()
-        conn.close()
+            cursor.execute("""
+                SELECT u.id, u.username, u.email, u.is_admin, s.expires_at
+                FROM auth_sessions s
+                JOIN users u ON s.user_id = u.id
+                WHERE s.token = ? AND s.expires_at > ? AND u.is_active = 1
+            """, (token, datetime.now()))
 
-        if user:
-            return dict(user)
+            row = cursor.fetchone()
+
+        if row:
+            user = dict(row)
+            expires_at = self._parse_timestamp(user.pop("expires_at"))
+            self.session_cache.put(token, user, expires_at)
+            return user
+
+        self.session_cache.put(token, None)
         return None
 
+    @staticmethod
+    def _parse_timestamp(value) -> Optional[datetime]:
+        if isinstance(value, datetime):
+            return value
+        try:
+            return datetime.fromisoformat(str(value))
+        except (TypeError, ValueError):
+            return None
+
     def delete_session(self, token: str):
         """Delete (logout) a session"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM auth_sessions WHERE token = ?", (token,))
-        conn.commit()
-        conn.close()
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM auth_sessions WHERE token = ?", (token,))
+        self.session_cache.invalidate(token)
 
     def cleanup_expired_sessions(self):
         """Clean up expired sessions"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM auth_sessions WHERE expires_at <= ?", (datetime.now(),))
-        conn.commit()
-        conn.close()
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM auth_sessions WHERE expires_at <= ?", (datetime.now(),))
 
     def save_user_api_settings(self, user_id: int, settings: Dict):
         """Save or update user API settings"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-
-        cursor.execute("""
-            INSERT INTO user_api_settings (
-                user_id, suno_api_key, suno_base_url,
-                replicate_api_token, openai_api_key, openai_assistant_id
-            ) VALUES (?, ?, ?, ?, ?, ?)
-            ON CONFLICT(user_id) DO UPDATE SET
-                suno_api_key = excluded.suno_api_key,
-                suno_base_url = excluded.suno_base_url,
-                replicate_api_token = excluded.replicate_api_token,
-                openai_api_key = excluded.openai_api_key,
-                openai_assistant_id = excluded.openai_assistant_id,
-                updated_at = CURRENT_TIMESTAMP
-        """, (
-            user_id,
-            settings.get('suno_api_key', ''),
-            settings.get('suno_base_url', 'https://api.sunoapi.org'),
-            settings.get('replicate_api_token', ''),
-            settings.get('openai_api_key', ''),
-            settings.get('openai_assistant_id', 'asst_tR6OL8QLpSsDDlc6hKdBmVNU')
-        ))
-
-        conn.commit()
-        conn.close()
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+
+            cursor.execute("""
+                INSERT INTO user_api_settings (
+                    user_id, suno_api_key, suno_base_url,
+                    replicate_api_token, openai_api_key, openai_assistant_id
+                ) VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(user_id) DO UPDATE SET
+                    suno_api_key = excluded.suno_api_key,
+                    suno_base_url = excluded.suno_base_url,
+                    replicate_api_token = excluded.replicate_api_token,
+                    openai_api_key = excluded.openai_api_key,
+                    openai_assistant_id = excluded.openai_assistant_id,
+                    updated_at = CURRENT_TIMESTAMP
+            """, (
+                user_id,
+                settings.get('suno_api_key', ''),
+                settings.get('suno_base_url', 'https://api.sunoapi.org'),
+                settings.get('replicate_api_token', ''),
+                settings.get('openai_api_key', ''),
+                settings.get('openai_assistant_id', 'asst_tR6OL8QLpSsDDlc6hKdBmVNU')
+            ))
 
     def get_user_api_settings(self, user_id: int) -> Optional[Dict]:
         """Get user API settings"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
 
-        cursor.execute("""
-            SELECT suno_api_key, suno_base_url, replicate_api_token,
-                   openai_api_key, openai_assistant_id
-            FROM user_api_settings
-            WHERE user_id = ?
-        """, (user_id,))
+            cursor.execute("""
+                SELECT suno_api_key, suno_base_url, replicate_api_token,
+                       openai_api_key, openai_assistant_id
+                FROM user_api_settings
+                WHERE user_id = ?
+            """, (user_id,))
 
-        settings = cursor.fetchone()
-        conn.close()
+            settings = cursor.fetchone()
 
         if settings:
             return dict(settings)
@@ -247,64 +316,56 @@ class Database:
 
     def track_generation_session(self, user_id: int, session_id: str, title: str, style: str):
         """Track a generation session"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-
-        cursor.execute("""
-            INSERT INTO generation_sessions (user_id, session_id, title, style)
-            VALUES (?, ?, ?, ?)
-        """, (user_id, session_id, title, style))
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
 
-        conn.commit()
-        conn.close()
+            cursor.execute("""
+                INSERT INTO generation_sessions (user_id, session_id, title, style)
+                VALUES (?, ?, ?, ?)
+            """, (user_id, session_id, title, style))
 
     def update_generation_status(self, session_id: str, status: str):
         """Update generation session status"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-
-        completed_at = datetime.now() if status == 'completed' else None
-        cursor.execute("""
-            UPDATE generation_sessions
-            SET status = ?, completed_at = ?
-            WHERE session_id = ?
-        """, (status, completed_at, session_id))
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
 
-        conn.commit()
-        conn.close()
+            completed_at = datetime.now() if status == 'completed' else None
+            cursor.execute("""
+                UPDATE generation_sessions
+                SET status = ?, completed_at = ?
+                WHERE session_id = ?
+            """, (status, completed_at, session_id))
 
     def get_user_sessions(self, user_id: int) -> List[Dict]:
         """Get all generation sessions for a user"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
 
-        cursor.execute("""
-            SELECT session_id, title, style, status, created_at, completed_at
-            FROM generation_sessions
-            WHERE user_id = ?
-            ORDER BY created_at DESC
-        """, (user_id,))
+            cursor.execute("""
+                SELECT session_id, title, style, status, created_at, completed_at
+                FROM generation_sessions
+                WHERE user_id = ?
+                ORDER BY created_at DESC
+            """, (user_id,))
 
-        sessions = [dict(row) for row in cursor.fetchall()]
-        conn.close()
+            sessions = [dict(row) for row in cursor.fetchall()]
 
         return sessions
 
     def change_password(self, user_id: int, new_password: str) -> bool:
         """Change user password"""
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
 
-            password_hash = self.hash_password(new_password)
-            cursor.execute("""
-                UPDATE users
-                SET password_hash = ?
-                WHERE id = ?
-            """, (password_hash, user_id))
+                password_hash = self.hash_password(new_password)
+                cursor.execute("""
+                    UPDATE users
+                    SET password_hash = ?
+                    WHERE id = ?
+                """, (password_hash, user_id))
 
-            conn.commit()
-            conn.close()
+            self.session_cache.invalidate_user(user_id)
             return True
         except Exception as e:
             print(f"Error changing password: {e}")
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Structured progress events for background generation jobs
+Job ids, numeric progress and stage, coalescing and per-job replay buffers
+"""
+
+import asyncio
+import hashlib
+import json
+import time
+import uuid
+from collections import deque
+from datetime import datetime
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+
+# (keywords que deben aparecer todos, stage, progreso); el primer match gana
+_STAGE_RULES: List[Tuple[Tuple[str, ...], str, int]] = [
+    (("iniciando",), "starting", 5),
+    (("creando sesión",), "starting", 5),
+    (("estado música",), "song", 35),
+    (("esperando", "música"), "song", 25),
+    (("descargando", "audio"), "song", 50),
+    (("generando imagen",), "image", 60),
+    (("enviando imagen",), "image", 60),
+    (("esperando", "imagen"), "image", 70),
+    (("descargando imagen",), "image", 75),
+    (("creando video",), "video", 80),
+    (("enviando", "video"), "video", 80),
+    (("esperando", "video"), "video", 85),
+    (("descargando video",), "video", 90),
+    (("streaming",), "loop", 97),
+    (("bucle",), "loop", 95),
+    (("loop",), "loop", 95),
+    (("subtítulos",), "loop", 95),
+    (("karaoke",), "loop", 95),
+    (("enviando",), "song", 15),
+    (("petición",), "song", 15),
+]
+
+
+def request_fingerprint(command: str, payload: dict) -> str:
+    """Hash of a generation command that ignores case, spacing and key order"""
+    def normalize(value):
+        if isinstance(value, str):
+            return ' '.join(value.split()).lower()
+        if isinstance(value, dict):
+            return {k: normalize(v) for k, v in value.items() if k not in ("command", "idempotency_key")}
+        if isinstance(value, list):
+            return [normalize(v) for v in value]
+        return value
+
+    canonical = json.dumps([command, normalize(payload)], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def classify_message(message: str) -> Tuple[Optional[str], Optional[int]]:
+    """Map a free-text progress message to (stage, percent); (None, None) if unknown"""
+    msg = message.lower()
+    if "error" in msg:
+        # Errores intermedios no mueven la barra; el fallo del job llega como evento "error"
+        return None, None
+    for keywords, stage, progress in _STAGE_RULES:
+        if all(k in msg for k in keywords):
+            return stage, progress
+    return None, None
+
+
+class JobState:
+    def __init__(self, job_id: str, user_id: int, kind: str, buffer_size: int):
+        self.job_id = job_id
+        self.user_id = user_id
+        self.kind = kind
+        self.seq = 0
+        self.stage = "queued"
+        self.progress = 0
+        self.status = "running"
+        self.session_id: Optional[str] = None
+        self.events: Deque[dict] = deque(maxlen=buffer_size)
+        self.pending: Optional[dict] = None  # Progress event held back by coalescing
+        self.last_emit = 0.0
+        self.flush_handle: Optional[asyncio.TimerHandle] = None
+        self.created_at = time.monotonic()
+        self.finished_at: Optional[float] = None
+        self.idempotency_key: Optional[str] = None
+        self.attached_keys: Set[str] = set()  # Keys of resubmissions mapped to this job
+        self.fingerprint: Optional[str] = None
+
+
+class JobEventHub:
+    """
+    Publishes job events to every socket of the job owner.
+
+    Each job numbers its events (seq) and keeps the last ``buffer_size`` of them,
+    so a reconnecting client can ask for everything after the last seq it saw.
+    Progress updates arriving faster than ``coalesce_interval`` are merged and
+    only the latest is sent; stage changes and terminal events go out at once.
+
+    Resubmissions are matched to an existing job instead of starting a new one:
+    by idempotency key for as long as the job is retained, and by request
+    fingerprint while the job runs or within ``dedup_window`` seconds of a
+    successful one (a retry after an error starts a new attempt). The key of
+    a resubmission matched by fingerprint is attached to the job, so the
+    same key keeps mapping to it after the window.
+    """
+
+    def __init__(self, send: Callable[[int, dict], Awaitable[None]], buffer_size: int = 50,
+                 coalesce_interval: float = 0.3, retention_seconds: float = 900,
+                 dedup_window: float = 30):
+        self.send = send
+        self.buffer_size = buffer_size
+        self.coalesce_interval = coalesce_interval
+        self.retention_seconds = retention_seconds
+        self.dedup_window = dedup_window
+        self.jobs: Dict[str, JobState] = {}
+
+    def create_job(self, user_id: int, kind: str, session_id: Optional[str] = None,
+                   idempotency_key: Optional[str] = None, fingerprint: Optional[str] = None) -> str:
+        self._purge_finished()
+        job_id = uuid.uuid4().hex
+        job = JobState(job_id, user_id, kind, self.buffer_size)
+        job.session_id = session_id
+        job.idempotency_key = idempotency_key
+        job.fingerprint = fingerprint
+        self.jobs[job_id] = job
+        return job_id
+
+    def find_duplicate(self, user_id: int, idempotency_key: Optional[str] = None,
+                       fingerprint: Optional[str] = None) -> Optional[str]:
+        """Job id of an equivalent earlier submission by the same user, if any"""
+        now = time.monotonic()
+        for job in self.jobs.values():
+            if job.user_id != user_id:
+                continue
+            if idempotency_key and (job.idempotency_key == idempotency_key
+                                    or idempotency_key in job.attached_keys):
+                return job.job_id
+            if (fingerprint and job.fingerprint == fingerprint
+                    and (job.status == "running"
+                         or (job.status == "completed" and now - job.created_at < self.dedup_window))):
+                if idempotency_key:
+                    job.attached_keys.add(idempotency_key)
+                return job.job_id
+        return None
+
+    def history(self, job_id: str) -> List[dict]:
+        job = self.jobs.get(job_id)
+        return list(job.events) if job else []
+
+    def _purge_finished(self):
+        now = time.monotonic()
+        expired = [
+            job_id for job_id, job in self.jobs.items()
+            if job.finished_at is not None and now - job.finished_at > self.retention_seconds
+        ]
+        for job_id in expired:
+            del self.jobs[job_id]
+
+    def _make_event(self, job: JobState, event_type: str, **fields) -> dict:
+        job.seq += 1
+        event = {
+            "type": event_type,
+            "job_id": job.job_id,
+            "seq": job.seq,
+            "kind": job.kind,
+            "stage": job.stage,
+            "progress": job.progress,
+            "session_id": job.session_id,
+            "timestamp": datetime.now().isoformat()
+        }
+        event.update(fields)
+        return event
+
+    async def _emit(self, job: JobState, event: dict):
+        job.events.append(event)
+        job.last_emit = time.monotonic()
+        await self.send(job.user_id, event)
+
+    async def started(self, job_id: str, message: str = ""):
+        job = self.jobs[job_id]
+        await self._emit(job, self._make_event(
+            job, "job_started", message=message, idempotency_key=job.idempotency_key
+        ))
+
+    async def progress(self, job_id: str, message: str, progress: Optional[int] = None,
+                       stage: Optional[str] = None):
+        job = self.jobs.get(job_id)
+        if job is None or job.status != "running":
+            return
+
+        guessed_stage, guessed_progress = classify_message(message)
+        new_stage = stage or guessed_stage or job.stage
+        if progress is None:
+            progress = guessed_progress
+        if progress is None:
+            # Pasos desconocidos: avanzar poco a poco sin llegar al 100%
+            progress = min(job.progress + 2, 98)
+        stage_changed = new_stage != job.stage
+        job.stage = new_stage
+        job.progress = max(job.progress, min(progress, 99))
+
+        # The seq is only assigned when the event is actually sent
+        job.pending = {"message": message}
+        elapsed = time.monotonic() - job.last_emit
+        if stage_changed or elapsed >= self.coalesce_interval:
+            await self._send_pending_progress(job)
+        elif job.flush_handle is None:
+            loop = asyncio.get_running_loop()
+            job.flush_handle = loop.call_later(
+                self.coalesce_interval - elapsed,
+                lambda: asyncio.ensure_future(self._send_pending_progress(job))
+            )
+
+    async def _send_pending_progress(self, job: JobState):
+        if job.flush_handle is not None:
+            job.flush_handle.cancel()
+            job.flush_handle = None
+        if job.pending is None:
+            return
+        fields, job.pending = job.pending, None
+        await self._emit(job, self._make_event(job, "progress", **fields))
+
+    async def delta(self, job_id: str, text: str, offset: int):
+        """
+        Streamed output fragment (e.g. generated lyrics). Sent at once and not
+        buffered: the complete event carries the full text for replays.
+        """
+        job = self.jobs.get(job_id)
+        if job is None or job.status != "running":
+            return
+        await self.send(job.user_id, {
+            "type": "delta",
+            "job_id": job.job_id,
+            "kind": job.kind,
+            "offset": offset,
+            "text": text
+        })
+
+    async def complete(self, job_id: str, data: dict):
+        job = self.jobs[job_id]
+        await self._send_pending_progress(job)
+        job.status = "completed"
+        job.stage = "done"
+        job.progress = 100
+        job.session_id = data.get("session_id", job.session_id)
+        job.finished_at = time.monotonic()
+        await self._emit(job, self._make_event(job, "complete", data=data))
+
+    async def error(self, job_id: str, error: str):
+        job = self.jobs[job_id]
+        await self._send_pending_progress(job)
+        job.status = "failed"
+        job.stage = "error"
+        job.finished_at = time.monotonic()
+        await self._emit(job, self._make_event(job, "error", error=error))
+
+    def replay(self, user_id: int, cursors: Dict[str, int]) -> List[dict]:
+        """
+        Events a reconnecting client missed: everything after its cursor for the
+        jobs it knows, and the buffered history of the user's still-running jobs.
+        """
+        events = []
+        for job in self.jobs.values():
+            if job.user_id != user_id:
+                continue
+            if job.job_id in cursors:
+                last_seq = cursors[job.job_id]
+            elif job.status == "running":
+                last_seq = 0
+            else:
+                continue
+            events.extend(e for e in job.events if e["seq"] > last_seq)
+        return events
+
+    def active_jobs(self, user_id: int) -> List[dict]:
+        return [
+            {
+                "job_id": job.job_id,
+                "kind": job.kind,
+                "stage": job.stage,
+                "progress": job.progress,
+                "seq": job.seq,
+                "session_id": job.session_id
+            }
+            for job in self.jobs.values()
+            if job.user_id == user_id and job.status == "running"
+        ]
@@ -2,9 +2,11 @@ import asyncio
 from typing import Callable, Optional
 
 from ...domain.entities.image_request import ImageRequest
+from ...domain.entities.image_response import ImageResponse
 from ...domain.entities.generation_session import GenerationSession
 from ...domain.ports.image_generator import ImageGeneratorPort
 from ...domain.ports.file_storage import FileStoragePort
+from ...domain.ports.image_cache import ImageCachePort
 
 
 class GenerateImageUseCase:
@@ -12,16 +14,19 @@ class GenerateImageUseCase:
     def __init__(
         self,
         image_generator: ImageGeneratorPort,
-        file_storage: FileStoragePort
+        file_storage: FileStoragePort,
+        image_cache: Optional[ImageCachePort] = None
     ):
         self.image_generator = image_generator
         self.file_storage = file_storage
+        self.image_cache = image_cache
     
     async def execute(
         self,
         session: GenerationSession,
         image_prompt: str,
-        progress_callback: Optional[Callable[[str], None]] = None
+        progress_callback: Optional[Callable[[str], None]] = None,
+        reuse_cached: bool = True
     ) -> GenerationSession:
         try:
             if progress_callback:
@@ -35,6 +40,13 @@ class GenerateImageUseCase:
                 prompt=enhanced_prompt,
                 aspect_ratio="16:9"
             )
+
+            # Prompt repetido: reutilizar una imagen ya generada en vez de pagar otra predicción
+            if reuse_cached and await self._reuse_cached_image(session, image_request):
+                if progress_callback:
+                    await progress_callback("Imagen reutilizada de la caché")
+                    await progress_callback("¡Imagen generada!")
+                return session
             
             # Generar imagen
             image_response = await self.image_generator.generate_image(image_request)
@@ -70,7 +82,7 @@ class GenerateImageUseCase:
                 if progress_callback:
                     await progress_callback("Descargando imagen...")
 
-                await self._download_image(session, progress_callback)
+                await self._download_image(session, progress_callback, image_request)
 
                 if progress_callback:
                     await progress_callback("¡Imagen generada!")
@@ -116,10 +128,35 @@ class GenerateImageUseCase:
         enhanced = f"IMPORTANT: {', '.join(no_text_instructions)}. {base_prompt}, {', '.join(visual_style_keywords)}"
         return enhanced
     
+    async def _reuse_cached_image(self, session: GenerationSession, image_request: ImageRequest) -> bool:
+        if not self.image_cache:
+            return False
+        # SQLite + SHA-256: fuera del event loop
+        key = await asyncio.to_thread(self.image_cache.find, image_request.prompt, image_request.aspect_ratio)
+        if not key:
+            return False
+
+        session_path = self.file_storage.create_session_directory(session)
+        file_path = f"{session_path}/{session.session_id}_cover.png"
+        if not await asyncio.to_thread(self.image_cache.materialize, key, file_path):
+            return False
+
+        session.image_response = ImageResponse(
+            prediction_id=f"cache:{key}",
+            status="succeeded",
+            # Igual que las portadas recuperadas del disco: has_images debe ser True
+            image_urls=[f"file://{file_path}"]
+        )
+        session.image_path = file_path
+        self.file_storage.save_metadata(session)
+        await asyncio.to_thread(self.file_storage.adopt_artifact, file_path)
+        return True
+
     async def _download_image(
         self,
         session: GenerationSession,
-        progress_callback: Optional[Callable[[str], None]] = None
+        progress_callback: Optional[Callable[[str], None]] = None,
+        image_request: Optional[ImageRequest] = None
     ):
         if not session.image_response or not session.image_response.has_images:
             return
@@ -136,6 +173,13 @@ class GenerateImageUseCase:
         if success:
             session.image_path = file_path
             self.file_storage.save_metadata(session)
+            # Hash SHA-256 + SQLite: fuera del event loop
+            await asyncio.to_thread(self.file_storage.adopt_artifact, file_path)
+
+            if self.image_cache and image_request:
+                await asyncio.to_thread(
+                    self.image_cache.store, image_request.prompt, image_request.aspect_ratio, file_path
+                )
 
             if progress_callback:
                 await progress_callback(f"Imagen guardada: {filename}")
@@ -6,6 +6,7 @@ from ...domain.entities.generation_session import GenerationSession
 from ...domain.ports.music_generator import MusicGeneratorPort
 from ...domain.ports.file_storage import FileStoragePort
 from ...domain.ports.image_generator import ImageGeneratorPort
+from ...domain.ports.image_cache import ImageCachePort
 from .generate_image import GenerateImageUseCase
 
 
@@ -15,7 +16,8 @@ class GenerateSongUseCase:
         self,
         music_generator: MusicGeneratorPort,
         file_storage: FileStoragePort,
-        image_generator: Optional[ImageGeneratorPort] = None
+        image_generator: Optional[ImageGeneratorPort] = None,
+        image_cache: Optional[ImageCachePort] = None
     ):
         self.music_generator = music_generator
         self.file_storage = file_storage
@@ -25,7 +27,8 @@ class GenerateSongUseCase:
         if self.image_generator:
             self.generate_image_use_case = GenerateImageUseCase(
                 self.image_generator,
-                self.file_storage
+                self.file_storage,
+                image_cache
             )
     
     async def execute(
@@ -245,6 +248,8 @@ class GenerateSongUseCase:
                 file_path = f"{session_path}/{filename}"
                 
                 success = await self.music_generator.download_track(track.audio_url, file_path)
+                if success:
+                    await asyncio.to_thread(self.file_storage.adopt_artifact, file_path)
                 
                 if success and not session.local_path:
                     session.local_path = session_path
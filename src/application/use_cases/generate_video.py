@@ -37,7 +37,7 @@ class GenerateVideoUseCase:
                 await progress_callback("Creando video animado...")
 
             # Calcular duración objetivo basada en los tracks de audio
-            target_duration = self._calculate_target_duration(session)
+            target_duration = await asyncio.to_thread(self._calculate_target_duration, session)
             if not target_duration:
                 if progress_callback:
                     await progress_callback("Error: No se pudo calcular duración de la canción")
@@ -180,6 +180,7 @@ class GenerateVideoUseCase:
             if progress_callback:
                 await progress_callback("Error descargando video")
             return
+        await asyncio.to_thread(self.file_storage.adopt_artifact, original_video_path)
 
         # Crear video en bucle de la duración correcta con subtítulos
         if progress_callback:
@@ -192,7 +193,8 @@ class GenerateVideoUseCase:
         
         # Intentar crear bucle con subtítulos
         if hasattr(self.video_generator, 'loop_video_with_subtitles'):
-            loop_success = self.video_generator.loop_video_with_subtitles(
+            loop_success = await asyncio.to_thread(
+                self.video_generator.loop_video_with_subtitles,
                 original_video_path,
                 looped_video_path,
                 target_duration,
@@ -201,13 +203,18 @@ class GenerateVideoUseCase:
             )
         else:
             # Fallback al método básico
-            loop_success = self.video_generator.loop_video_to_duration(
+            loop_success = await asyncio.to_thread(
+                self.video_generator.loop_video_to_duration,
                 original_video_path,
                 looped_video_path,
                 target_duration
             )
         
         if loop_success:
+            if progress_callback:
+                await progress_callback("Preparando video para streaming...")
+            await asyncio.to_thread(self.video_generator.prepare_for_streaming, looped_video_path)
+
             session.video_path = looped_video_path
             self.file_storage.save_metadata(session)
 
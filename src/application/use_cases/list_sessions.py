@@ -1,4 +1,4 @@
-from typing import List
+from typing import Callable, List, Tuple
 
 from ...domain.entities.generation_session import GenerationSession
 from ...domain.ports.file_storage import FileStoragePort
@@ -13,4 +13,20 @@ class ListSessionsUseCase:
         return self.file_storage.get_all_sessions()
     
     def get_session_by_id(self, session_id: str) -> GenerationSession:
-        return self.file_storage.get_session_by_id(session_id)
\ No newline at end of file
+        return self.file_storage.get_session_by_id(session_id)
+    
+    def search(self, query: str, limit: int = 50) -> List[Tuple[str, float]]:
+        """Ranked (session_id, score) matches over title, style and lyrics"""
+        return self.file_storage.search_sessions(query, limit)
+    
+    def is_search_ready(self) -> bool:
+        return self.file_storage.is_search_ready()
+    
+    def build_search_index(self) -> None:
+        self.file_storage.build_search_index()
+    
+    def subscribe_changes(self, listener: Callable[[str], None]) -> None:
+        self.file_storage.subscribe(listener)
+    
+    def unsubscribe_changes(self, listener: Callable[[str], None]) -> None:
+        self.file_storage.unsubscribe(listener)
\ No newline at end of file
@@ -1,3 +1,4 @@
+import asyncio
 import os
 from typing import Callable, Optional
 
@@ -16,6 +17,14 @@ class LoopVideoUseCase:
         self.video_generator = video_generator
         self.file_storage = file_storage
     
+    def original_video_path(self, session: GenerationSession) -> str:
+        session_path = self.file_storage.create_session_directory(session)
+        return os.path.join(session_path, f"{session.session_id}_animation_original.mp4")
+    
+    def has_original_video(self, session: GenerationSession) -> bool:
+        """False once StorageJanitor has evicted the original animation to free space"""
+        return os.path.exists(self.original_video_path(session))
+    
     async def execute(
         self,
         session: GenerationSession,
@@ -26,20 +35,23 @@ class LoopVideoUseCase:
         Crea un bucle del video original para que coincida con la duración de la canción
         """
         try:
-            # Verificar que existe el video original
+            # Verificar que existe el video original (se desaloja al pasar de cuota o con poco disco)
             session_path = self.file_storage.create_session_directory(session)
-            original_video_path = os.path.join(session_path, f"{session.session_id}_animation_original.mp4")
+            original_video_path = self.original_video_path(session)
             
             if not os.path.exists(original_video_path):
                 if progress_callback:
-                    await progress_callback("Error: No se encontró el video original para hacer bucle")
+                    await progress_callback(
+                        "Error: El video original ya no está disponible (se eliminó para liberar espacio). "
+                        "Genera el video de nuevo para crear el bucle"
+                    )
                 return session
 
             if progress_callback:
                 await progress_callback("Calculando duración de la canción...")
 
             # Calcular duración objetivo basada en los tracks de audio
-            target_duration = self._calculate_target_duration(session)
+            target_duration = await asyncio.to_thread(self._calculate_target_duration, session)
             if not target_duration:
                 if progress_callback:
                     await progress_callback("Error: No se pudo calcular duración de la canción")
@@ -61,7 +73,8 @@ class LoopVideoUseCase:
                 
                 # Usar método con subtítulos si está disponible
                 if hasattr(self.video_generator, 'loop_video_with_subtitles'):
-                    loop_success = self.video_generator.loop_video_with_subtitles(
+                    loop_success = await asyncio.to_thread(
+                        self.video_generator.loop_video_with_subtitles,
                         original_video_path,
                         looped_video_path,
                         target_duration,
@@ -71,20 +84,26 @@ class LoopVideoUseCase:
                     )
                 else:
                     # Fallback al método básico
-                    loop_success = self.video_generator.loop_video_to_duration(
+                    loop_success = await asyncio.to_thread(
+                        self.video_generator.loop_video_to_duration,
                         original_video_path,
                         looped_video_path,
                         target_duration
                     )
             else:
                 # Sin letras, usar método básico
-                loop_success = self.video_generator.loop_video_to_duration(
+                loop_success = await asyncio.to_thread(
+                    self.video_generator.loop_video_to_duration,
                     original_video_path,
                     looped_video_path,
                     target_duration
                 )
             
             if loop_success:
+                if progress_callback:
+                    await progress_callback("Preparando video para streaming...")
+                await asyncio.to_thread(self.video_generator.prepare_for_streaming, looped_video_path)
+
                 session.video_path = looped_video_path
                 self.file_storage.save_metadata(session)
 
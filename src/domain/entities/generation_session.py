@@ -2,6 +2,7 @@ from dataclasses import dataclass
 from datetime import datetime
 from typing import Optional
 import time
+import uuid
 
 
 @dataclass
@@ -19,7 +20,8 @@ class GenerationSession:
     @classmethod
     def create_new(cls, request: 'SongRequest') -> 'GenerationSession':
         timestamp = int(time.time())
-        session_id = f"song_{timestamp}"
+        # Sufijo aleatorio: dos peticiones en el mismo segundo no comparten directorio
+        session_id = f"song_{timestamp}_{uuid.uuid4().hex[:8]}"
         return cls(
             session_id=session_id,
             timestamp=timestamp,
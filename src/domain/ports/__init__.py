@@ -1,4 +1,5 @@
 from .music_generator import MusicGeneratorPort
 from .file_storage import FileStoragePort
 from .image_generator import ImageGeneratorPort
-from .video_generator import VideoGeneratorPort
\ No newline at end of file
+from .video_generator import VideoGeneratorPort
+from .image_cache import ImageCachePort
\ No newline at end of file
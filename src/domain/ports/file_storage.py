@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import List
+from typing import Callable, List, Tuple
 from ..entities.generation_session import GenerationSession
 
 
@@ -19,4 +19,27 @@ class FileStoragePort(ABC):
     
     @abstractmethod
     def get_session_by_id(self, session_id: str) -> GenerationSession:
+        pass
+    
+    def search_sessions(self, query: str, limit: int = 50) -> List[Tuple[str, float]]:
+        """Ranked (session_id, score) matches for a free-text query"""
+        return []
+    
+    def is_search_ready(self) -> bool:
+        """Whether search_sessions can answer without building its index first"""
+        return True
+    
+    def build_search_index(self) -> None:
+        """Build the search index if it does not exist yet (slow; call it off the UI thread)"""
+        pass
+    
+    def adopt_artifact(self, file_path: str) -> None:
+        """Hand a finished, write-once session file to the storage for deduplication"""
+        pass
+    
+    def subscribe(self, listener: Callable[[str], None]) -> None:
+        """Register a callback called with the session_id whenever a session's metadata is saved"""
+        pass
+    
+    def unsubscribe(self, listener: Callable[[str], None]) -> None:
         pass
\ No newline at end of file
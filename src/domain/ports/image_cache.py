@@ -0,0 +1,27 @@
+from abc import ABC, abstractmethod
+from typing import Optional
+
+
+class ImageCachePort(ABC):
+    
+    @abstractmethod
+    def find(self, prompt: str, aspect_ratio: str) -> Optional[str]:
+        """
+        Devuelve la clave de una imagen ya generada para este prompt, o None
+        si hay que generar una nueva
+        """
+        pass
+    
+    @abstractmethod
+    def materialize(self, key: str, file_path: str) -> bool:
+        """
+        Coloca la imagen cacheada en file_path (enlace o copia)
+        """
+        pass
+    
+    @abstractmethod
+    def store(self, prompt: str, aspect_ratio: str, file_path: str) -> Optional[str]:
+        """
+        Guarda una imagen recién generada para reutilizarla; devuelve su clave
+        """
+        pass
@@ -33,4 +33,10 @@ class VideoGeneratorPort(ABC):
         """
         Crea un bucle del video hasta alcanzar la duración objetivo usando FFmpeg
         """
-        pass
\ No newline at end of file
+        pass
+    
+    def prepare_for_streaming(self, video_path: str) -> bool:
+        """
+        Prepara el video final para streaming (faststart, variantes HLS). Opcional
+        """
+        return False
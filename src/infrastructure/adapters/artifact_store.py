@@ -0,0 +1,252 @@
+import os
+import shutil
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Set, Tuple
+
+from ..config.settings import ArtifactStoreSettings
+from ..persistence.sqlite_pool import get_pool
+from .content_addressed_store import ContentAddressedStore
+
+
+class ScratchArea:
+    """
+    Directory for intermediates (temporary loops, re-encodes, subtitle files...).
+    Files live only inside ``scratch_file`` (or between ``track`` and
+    ``discard`` when the path is handed around); leftovers of crashed renders are
+    removed by ``sweep``. It sits next to the outputs so results can be moved
+    with os.replace instead of copied.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        # Rutas en uso por este proceso: sweep no las toca aunque sean antiguas
+        self._active: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def new_path(self, suffix: str = "", prefix: str = "") -> str:
+        return os.path.join(self.root, f"{prefix}{uuid.uuid4().hex}{suffix}")
+
+    def track(self, path: str) -> str:
+        with self._lock:
+            self._active.add(os.path.abspath(path))
+        return path
+
+    def release(self, path: str):
+        with self._lock:
+            self._active.discard(os.path.abspath(path))
+
+    def discard(self, path: str):
+        """Release a tracked file or directory and delete it"""
+        self.release(path)
+        try:
+            if os.path.isdir(path) and not os.path.islink(path):
+                shutil.rmtree(path)
+            elif os.path.lexists(path):
+                os.unlink(path)
+        except OSError:
+            pass
+
+    @contextmanager
+    def scratch_file(self, suffix: str = "", prefix: str = "") -> Iterator[str]:
+        path = self.track(self.new_path(suffix, prefix))
+        try:
+            yield path
+        finally:
+            self.discard(path)
+
+    def usage(self) -> Tuple[int, int]:
+        """(entries, bytes) currently in the scratch area"""
+        entries = total = 0
+        for entry in os.scandir(self.root):
+            entries += 1
+            total += _tree_size(entry.path)
+        return entries, total
+
+    def sweep(self, max_age_seconds: float) -> Tuple[int, int]:
+        """Delete scratch files and directories older than max_age_seconds. Returns (entries, bytes)"""
+        removed = freed = 0
+        cutoff = time.time() - max_age_seconds
+        with self._lock:
+            active = set(self._active)
+        for entry in os.scandir(self.root):
+            try:
+                if os.path.abspath(entry.path) in active or entry.stat().st_mtime >= cutoff:
+                    continue
+                size = _tree_size(entry.path)
+                if entry.is_dir(follow_symlinks=False):
+                    shutil.rmtree(entry.path)
+                else:
+                    os.unlink(entry.path)
+                removed += 1
+                freed += size
+            except OSError:
+                pass
+        return removed, freed
+
+
+def _tree_size(path: str) -> int:
+    try:
+        if not os.path.isdir(path) or os.path.islink(path):
+            return os.lstat(path).st_size
+        return sum(
+            os.lstat(os.path.join(folder, name)).st_size
+            for folder, _, names in os.walk(path) for name in names
+        )
+    except OSError:
+        return 0
+
+
+def scratch_dir() -> str:
+    """Absolute scratch directory, for ``tempfile`` calls (dir=...) of the media adapters"""
+    return os.path.abspath(ArtifactStore.shared().scratch.root)
+
+
+def scratch_area() -> ScratchArea:
+    """Shared scratch area, to ``track`` paths made by the media adapters and ``discard`` them when done"""
+    return ArtifactStore.shared().scratch
+
+
+class ArtifactStore:
+    """
+    Session artifacts (audio, covers, videos) deduplicated by content.
+
+    ``adopt`` moves a freshly written file into the content-addressed store and
+    leaves a hard link at its original path, so identical MP3s, covers or
+    original animations across sessions share one copy on disk. Every linked
+    path is recorded as a reference; ``collect_garbage`` drops references whose
+    path was deleted or replaced and removes blobs nobody references.
+    """
+
+    GC_GRACE_SECONDS = 600
+
+    _shared: Dict[str, 'ArtifactStore'] = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, settings: Optional[ArtifactStoreSettings] = None):
+        self.settings = settings or ArtifactStoreSettings.from_env()
+        self.blobs = ContentAddressedStore(self.settings.root)
+        self.scratch = ScratchArea(self.settings.scratch_dir)
+        self.pool = get_pool(os.path.join(self.settings.root, "artifacts.db"))
+        self._init_database()
+
+    @classmethod
+    def shared(cls, settings: Optional[ArtifactStoreSettings] = None) -> 'ArtifactStore':
+        """One store per root directory for the whole process"""
+        settings = settings or ArtifactStoreSettings.from_env()
+        key = os.path.abspath(settings.root)
+        with cls._shared_lock:
+            store = cls._shared.get(key)
+            if store is None:
+                store = cls._shared[key] = cls(settings)
+            return store
+
+    def _init_database(self):
+        with self.pool.connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS artifact_refs (
+                    path TEXT PRIMARY KEY,
+                    blob_key TEXT NOT NULL,
+                    linked INTEGER NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_artifact_refs_blob ON artifact_refs(blob_key)")
+
+    def adopt(self, path: str) -> Optional[str]:
+        """Deduplicate a finished artifact in place. Returns its blob key"""
+        if not self.settings.enabled or not os.path.isfile(path):
+            return None
+        try:
+            key = self.blobs.hash_and_key(path)
+            if not self.blobs.exists(key):
+                self.blobs.put_file(path, key)
+            elif not self._same_file(path, self.blobs.path_for(key)):
+                # Contenido ya almacenado: sustituir la copia por un enlace al blob
+                self.blobs.link_into(key, path)
+
+            linked = self._same_file(path, self.blobs.path_for(key))
+            with self.pool.connection() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO artifact_refs (path, blob_key, linked, created_at) VALUES (?, ?, ?, ?)",
+                    (os.path.abspath(path), key, int(linked), time.time())
+                )
+            return key
+        except Exception as e:
+            print(f"Error deduplicando {path}: {str(e)}")
+            return None
+
+    @staticmethod
+    def _same_file(a: str, b: str) -> bool:
+        try:
+            return os.path.samefile(a, b)
+        except OSError:
+            return False
+
+    def _ref_is_live(self, path: str, blob_key: str, linked: bool) -> bool:
+        if not os.path.isfile(path):
+            return False
+        if linked:
+            # Reemplazado atómicamente por otro contenido: ya no apunta al blob
+            return self._same_file(path, self.blobs.path_for(blob_key))
+        return True
+
+    def reference_counts(self) -> Dict[str, int]:
+        with self.pool.connection() as conn:
+            return {
+                row["blob_key"]: row["refs"]
+                for row in conn.execute(
+                    "SELECT blob_key, COUNT(*) AS refs FROM artifact_refs GROUP BY blob_key"
+                )
+            }
+
+    def collect_garbage(self) -> Tuple[int, int]:
+        """Drop dead references and delete unreferenced blobs. Returns (blobs removed, bytes freed)"""
+        with self.pool.connection() as conn:
+            rows = conn.execute("SELECT path, blob_key, linked FROM artifact_refs").fetchall()
+            dead = [row["path"] for row in rows if not self._ref_is_live(row["path"], row["blob_key"], bool(row["linked"]))]
+            conn.executemany("DELETE FROM artifact_refs WHERE path = ?", [(path,) for path in dead])
+
+        referenced = set(self.reference_counts())
+        # Blobs just added may not have their reference recorded yet: they are
+        # still linked from their session (nlink > 1) or, if copied, recently written
+        grace_cutoff = time.time() - self.GC_GRACE_SECONDS
+        removed = freed = 0
+        for key in self.blobs.iter_keys():
+            if key in referenced:
+                continue
+            try:
+                st = os.stat(self.blobs.path_for(key))
+                if st.st_nlink > 1 or st.st_mtime > grace_cutoff:
+                    continue
+            except OSError:
+                continue
+            size = self.blobs.remove(key)
+            if size is not None:
+                removed += 1
+                freed += size
+        return removed, freed
+
+    def usage(self) -> Dict[str, int]:
+        """Bytes held by the blob store and the scratch area"""
+        blob_bytes = 0
+        blob_count = 0
+        for key in self.blobs.iter_keys():
+            try:
+                blob_bytes += os.path.getsize(self.blobs.path_for(key))
+                blob_count += 1
+            except OSError:
+                pass
+        scratch_entries, scratch_bytes = self.scratch.usage()
+        return {
+            "blobs": blob_count,
+            "blob_bytes": blob_bytes,
+            "scratch_entries": scratch_entries,
+            "scratch_bytes": scratch_bytes
+        }
+
+    def sweep_scratch(self) -> Tuple[int, int]:
+        return self.scratch.sweep(self.settings.scratch_max_age_hours * 3600)
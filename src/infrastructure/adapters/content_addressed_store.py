@@ -0,0 +1,99 @@
+import hashlib
+import os
+import shutil
+import uuid
+from typing import Iterator, Optional
+
+
+class ContentAddressedStore:
+    """
+    Blobs stored once by SHA-256 under ``<root>/objects/ab/<digest><ext>``.
+
+    Files are placed into session directories as hard links (a copy when the
+    filesystem doesn't allow it). Writers must replace files atomically
+    (write elsewhere + os.replace) and never rewrite them in place, otherwise
+    every link to the blob would change with them.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self.objects_dir = os.path.join(root, "objects")
+        os.makedirs(self.objects_dir, exist_ok=True)
+
+    @staticmethod
+    def hash_file(file_path: str) -> str:
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def hash_and_key(self, file_path: str) -> str:
+        """Key a file would be stored under: content digest plus its extension"""
+        return f"{self.hash_file(file_path)}{os.path.splitext(file_path)[1].lower()}"
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.objects_dir, key[:2], key)
+
+    def exists(self, key: str) -> bool:
+        return os.path.isfile(self.path_for(key))
+
+    def put_file(self, file_path: str, key: Optional[str] = None) -> str:
+        """Add a file to the store (no-op if its content is already there). Returns its key"""
+        key = key or self.hash_and_key(file_path)
+        blob_path = self.path_for(key)
+        if os.path.exists(blob_path):
+            return key
+
+        os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+        tmp_path = f"{blob_path}.{uuid.uuid4().hex}.tmp"
+        try:
+            try:
+                os.link(file_path, tmp_path)
+            except OSError:
+                shutil.copyfile(file_path, tmp_path)
+            os.replace(tmp_path, blob_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+        return key
+
+    def link_into(self, key: str, dest_path: str) -> bool:
+        """Atomically place the blob at dest_path, replacing whatever was there"""
+        blob_path = self.path_for(key)
+        if not os.path.isfile(blob_path):
+            return False
+
+        os.makedirs(os.path.dirname(dest_path) or '.', exist_ok=True)
+        tmp_path = f"{dest_path}.{uuid.uuid4().hex}.tmp"
+        try:
+            try:
+                os.link(blob_path, tmp_path)
+            except OSError:
+                shutil.copyfile(blob_path, tmp_path)
+            os.replace(tmp_path, dest_path)
+            return True
+        except OSError as e:
+            print(f"Error enlazando {key} en {dest_path}: {str(e)}")
+            return False
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+    def iter_keys(self) -> Iterator[str]:
+        for shard in os.scandir(self.objects_dir):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.is_file() and not entry.name.endswith('.tmp'):
+                    yield entry.name
+
+    def remove(self, key: str) -> Optional[int]:
+        """Delete a blob; returns the bytes freed (None if it didn't exist)"""
+        blob_path = self.path_for(key)
+        try:
+            size = os.path.getsize(blob_path)
+            os.unlink(blob_path)
+            return size
+        except FileNotFoundError:
+            return None
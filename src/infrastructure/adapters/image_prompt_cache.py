@@ -0,0 +1,109 @@
+import hashlib
+import os
+import random
+import time
+from typing import Optional
+
+from ...domain.ports.image_cache import ImageCachePort
+from ..config.settings import ImageCacheSettings
+from ..persistence.sqlite_pool import get_pool
+from .content_addressed_store import ContentAddressedStore
+
+
+class ImagePromptCache(ImageCachePort):
+    """
+    Reuses cover images for prompts that repeat.
+
+    The lyrics → visual prompt mapping uses a small vocabulary, so many songs
+    end up with the same Seedream prompt. With ``variants = N`` each
+    (prompt, aspect ratio) collects up to N generated images; once it has N,
+    new requests get the least used of them instead of a new prediction.
+    ``variants = 0`` disables reuse (images are still stored).
+    """
+
+    def __init__(self, settings: Optional[ImageCacheSettings] = None):
+        self.settings = settings or ImageCacheSettings.from_env()
+        self.blobs = ContentAddressedStore(self.settings.root)
+        self.pool = get_pool(os.path.join(self.settings.root, "image_cache.db"))
+        self._init_database()
+
+    def _init_database(self):
+        with self.pool.connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS cached_images (
+                    prompt_key TEXT NOT NULL,
+                    blob_key TEXT NOT NULL,
+                    aspect_ratio TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    uses INTEGER DEFAULT 0,
+                    PRIMARY KEY (prompt_key, blob_key)
+                )
+            """)
+
+    @staticmethod
+    def prompt_key(prompt: str, aspect_ratio: str) -> str:
+        normalized = ' '.join(prompt.casefold().split())
+        return hashlib.sha256(f"{aspect_ratio}\x00{normalized}".encode('utf-8')).hexdigest()
+
+    def find(self, prompt: str, aspect_ratio: str) -> Optional[str]:
+        variants = self.settings.variants
+        if variants <= 0:
+            return None
+
+        key = self.prompt_key(prompt, aspect_ratio)
+        with self.pool.connection() as conn:
+            rows = [
+                row for row in conn.execute(
+                    "SELECT blob_key, uses FROM cached_images WHERE prompt_key = ?", (key,)
+                ).fetchall()
+                if self.blobs.exists(row["blob_key"])
+            ]
+            # Aún faltan variantes: generar otra para ampliar la selección
+            if len(rows) < variants:
+                return None
+
+            fewest = min(row["uses"] for row in rows)
+            blob_key = random.choice([row["blob_key"] for row in rows if row["uses"] == fewest])
+            conn.execute(
+                "UPDATE cached_images SET uses = uses + 1 WHERE prompt_key = ? AND blob_key = ?",
+                (key, blob_key)
+            )
+            return blob_key
+
+    def materialize(self, key: str, file_path: str) -> bool:
+        return self.blobs.link_into(key, file_path)
+
+    def store(self, prompt: str, aspect_ratio: str, file_path: str) -> Optional[str]:
+        try:
+            blob_key = self.blobs.put_file(file_path)
+            with self.pool.connection() as conn:
+                conn.execute(
+                    "INSERT OR IGNORE INTO cached_images (prompt_key, blob_key, aspect_ratio, created_at, uses) "
+                    "VALUES (?, ?, ?, ?, 1)",
+                    (self.prompt_key(prompt, aspect_ratio), blob_key, aspect_ratio, time.time())
+                )
+            return blob_key
+        except Exception as e:
+            print(f"Error guardando imagen en caché: {str(e)}")
+            return None
+
+    def evict_lru(self, bytes_needed: int) -> int:
+        """Drop the least used, oldest images until bytes_needed are freed. Returns bytes freed"""
+        freed = 0
+        with self.pool.connection() as conn:
+            rows = conn.execute(
+                "SELECT prompt_key, blob_key FROM cached_images ORDER BY uses ASC, created_at ASC"
+            ).fetchall()
+            for row in rows:
+                if freed >= bytes_needed:
+                    break
+                conn.execute(
+                    "DELETE FROM cached_images WHERE prompt_key = ? AND blob_key = ?",
+                    (row["prompt_key"], row["blob_key"])
+                )
+                still_used = conn.execute(
+                    "SELECT 1 FROM cached_images WHERE blob_key = ?", (row["blob_key"],)
+                ).fetchone()
+                if not still_used:
+                    freed += self.blobs.remove(row["blob_key"]) or 0
+        return freed
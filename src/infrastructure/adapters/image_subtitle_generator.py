@@ -1,4 +1,5 @@
 import os
+from collections import OrderedDict
 import cv2
 import numpy as np
 from PIL import Image, ImageDraw, ImageFont
@@ -6,6 +7,8 @@ import tempfile
 import subprocess
 from typing import List, Tuple
 import math
+from .lyrics_processor import parse_lyrics
+from .artifact_store import scratch_area, scratch_dir
 
 
 class ImageSubtitleGenerator:
@@ -14,16 +17,33 @@ class ImageSubtitleGenerator:
     Evita problemas de Fontconfig en Windows
     """
 
+    # Imágenes de línea ya renderizadas (los estribillos se repiten mucho)
+    TEXT_IMAGE_CACHE_SIZE = 256
+
     def __init__(self):
         self.width = 1280
         self.height = 720
         self.subtitle_height = 150
+        self._fonts = {}
+        self._text_image_cache: "OrderedDict[tuple, Image.Image]" = OrderedDict()
+
+    def _load_font(self, size: int):
+        """Carga la fuente una sola vez por tamaño"""
+        if size not in self._fonts:
+            try:
+                self._fonts[size] = ImageFont.truetype("arial.ttf", size)
+            except:
+                # Si no encuentra arial, usar fuente por defecto
+                self._fonts[size] = ImageFont.load_default()
+                print("Usando fuente por defecto (puede verse pequeña)")
+        return self._fonts[size]
 
     def create_subtitle_overlay(self, video_path: str, output_path: str, lyrics: str,
                                 audio_path: str = None, duration: float = 0) -> bool:
         """
         Crea un video con subtítulos renderizados como imágenes
         """
+        temp_dir = None
         try:
             # Preparar las letras
             lines = self._prepare_lyrics(lyrics)
@@ -32,7 +52,7 @@ class ImageSubtitleGenerator:
                 return self._copy_with_audio(video_path, output_path, audio_path)
 
             # Crear directorio temporal para las imágenes de subtítulos
-            temp_dir = tempfile.mkdtemp(prefix='subtitles_')
+            temp_dir = scratch_area().track(tempfile.mkdtemp(prefix='subtitles_', dir=scratch_dir()))
 
             # Generar imágenes de subtítulos
             print("Generando imágenes de subtítulos karaoke...")
@@ -43,52 +63,21 @@ class ImageSubtitleGenerator:
                 return self._copy_with_audio(video_path, output_path, audio_path)
 
             # Aplicar subtítulos al video
-            success = self._apply_image_subtitles(video_path, output_path, subtitle_images, audio_path)
-
-            # Limpiar archivos temporales
-            self._cleanup_temp_files(temp_dir)
-
-            return success
+            return self._apply_image_subtitles(video_path, output_path, subtitle_images, audio_path)
 
         except Exception as e:
             print(f"Error creando subtítulos con imágenes: {str(e)}")
             return self._copy_with_audio(video_path, output_path, audio_path)
+        finally:
+            # Limpiar archivos temporales
+            if temp_dir:
+                self._cleanup_temp_files(temp_dir)
 
     def _prepare_lyrics(self, lyrics: str) -> List[str]:
         """
         Prepara las letras dividiéndolas en líneas apropiadas
         """
-        import re
-        # Limpiar el texto
-        clean_lyrics = re.sub(r'\[.*?\]', '', lyrics)  # Remover etiquetas
-        clean_lyrics = re.sub(r'\n+', '\n', clean_lyrics)  # Normalizar saltos
-        clean_lyrics = clean_lyrics.strip()
-
-        if not clean_lyrics:
-            return []
-
-        # Dividir en líneas y filtrar vacías
-        lines = [line.strip() for line in clean_lyrics.split('\n') if line.strip()]
-
-        # Procesar líneas muy largas
-        processed_lines = []
-        for line in lines:
-            if len(line) > 50:  # Si es muy larga, dividirla
-                words = line.split()
-                current_line = ""
-                for word in words:
-                    if len(current_line + " " + word) <= 50:
-                        current_line += (" " + word) if current_line else word
-                    else:
-                        if current_line:
-                            processed_lines.append(current_line)
-                        current_line = word
-                if current_line:
-                    processed_lines.append(current_line)
-            else:
-                processed_lines.append(line)
-
-        return processed_lines[:20]  # Máximo 20 líneas
+        return parse_lyrics(lyrics).display_lines(50, 20)
 
     def _generate_subtitle_images(self, lines: List[str], duration: float, temp_dir: str) -> List[dict]:
         """
@@ -97,16 +86,20 @@ class ImageSubtitleGenerator:
         subtitle_images = []
         time_per_line = duration / len(lines) if lines and duration > 0 else 5
 
+        # Las líneas repetidas (misma imagen memoizada) reutilizan el mismo PNG
+        written = {}  # id(img) -> (img, path); guardar img evita que se reutilice el id
+
+        def save_once(img: Image.Image, path: str) -> str:
+            if id(img) in written:
+                return written[id(img)][1]
+            img.save(path)
+            written[id(img)] = (img, path)
+            return path
+
         try:
             # Intentar usar una fuente del sistema o usar fuente por defecto
-            try:
-                font_large = ImageFont.truetype("arial.ttf", 48)
-                font_medium = ImageFont.truetype("arial.ttf", 42)
-            except:
-                # Si no encuentra arial, usar fuente por defecto
-                font_large = ImageFont.load_default()
-                font_medium = ImageFont.load_default()
-                print("Usando fuente por defecto (puede verse pequeña)")
+            font_large = self._load_font(48)
+            font_medium = self._load_font(42)
 
             for i, line in enumerate(lines):
                 start_time = i * time_per_line
@@ -123,8 +116,7 @@ class ImageSubtitleGenerator:
                     outline_width=3,
                     y_offset=self._calculate_bounce(i, 0)
                 )
-                white_path = os.path.join(temp_dir, f"subtitle_{i:04d}_white.png")
-                img_white.save(white_path)
+                white_path = save_once(img_white, os.path.join(temp_dir, f"subtitle_{i:04d}_white.png"))
 
                 subtitle_images.append({
                     'path': white_path,
@@ -141,8 +133,7 @@ class ImageSubtitleGenerator:
                     outline_width=4,
                     y_offset=self._calculate_bounce(i, 1)
                 )
-                yellow_path = os.path.join(temp_dir, f"subtitle_{i:04d}_yellow.png")
-                img_yellow.save(yellow_path)
+                yellow_path = save_once(img_yellow, os.path.join(temp_dir, f"subtitle_{i:04d}_yellow.png"))
 
                 subtitle_images.append({
                     'path': yellow_path,
@@ -163,31 +154,40 @@ class ImageSubtitleGenerator:
         """
         Crea una imagen PNG con texto y transparencia
         """
+        font_key = (getattr(font, 'path', None), getattr(font, 'size', None), id(font))
+        key = (text, font_key, text_color, outline_color, outline_width, y_offset)
+        cached = self._text_image_cache.get(key)
+        if cached is not None:
+            self._text_image_cache.move_to_end(key)
+            return cached
+
         # Crear imagen transparente
         img = Image.new('RGBA', (self.width, self.subtitle_height), (0, 0, 0, 0))
         draw = ImageDraw.Draw(img)
 
-        # Calcular posición del texto
+        # Calcular posición del texto (incluyendo el borde)
         try:
-            bbox = draw.textbbox((0, 0), text, font=font)
+            bbox = draw.textbbox((0, 0), text, font=font, stroke_width=outline_width)
             text_width = bbox[2] - bbox[0]
             text_height = bbox[3] - bbox[1]
         except:
             # Fallback para versiones antiguas de Pillow
-            text_width, text_height = draw.textsize(text, font=font)
-
-        x = (self.width - text_width) // 2
-        y = (self.subtitle_height - text_height) // 2 + y_offset
-
-        # Dibujar outline (borde)
-        for dx in range(-outline_width, outline_width + 1):
-            for dy in range(-outline_width, outline_width + 1):
-                if dx != 0 or dy != 0:
-                    draw.text((x + dx, y + dy), text, font=font, fill=outline_color + (255,))
-
-        # Dibujar texto principal
-        draw.text((x, y), text, font=font, fill=text_color + (255,))
-
+            text_width, text_height = draw.textsize(text, font=font, stroke_width=outline_width)
+
+        x = (self.width - text_width) // 2 + outline_width
+        y = (self.subtitle_height - text_height) // 2 + outline_width + y_offset
+
+        # Texto y borde en una sola rasterización con el stroke nativo de Pillow
+        draw.text(
+            (x, y), text, font=font,
+            fill=text_color + (255,),
+            stroke_width=outline_width,
+            stroke_fill=outline_color + (255,)
+        )
+
+        self._text_image_cache[key] = img
+        while len(self._text_image_cache) > self.TEXT_IMAGE_CACHE_SIZE:
+            self._text_image_cache.popitem(last=False)
         return img
 
     def _calculate_bounce(self, line_index: int, phase: int) -> int:
@@ -198,65 +198,74 @@ class ImageSubtitleGenerator:
         offset = math.sin(line_index * 0.5 + phase * math.pi) * amplitude
         return int(offset)
 
+    def _write_overlay_playlist(self, subtitle_images: List[dict], temp_dir: str) -> str:
+        """
+        Escribe un script del concat demuxer que encadena los PNG con su duración.
+        Los huecos sin subtítulo se rellenan con una imagen transparente, de modo
+        que todo el karaoke es un único stream RGBA temporizado.
+        """
+        blank_path = os.path.join(temp_dir, "subtitle_blank.png")
+        Image.new('RGBA', (self.width, self.subtitle_height), (0, 0, 0, 0)).save(blank_path)
+
+        def file_line(path: str) -> str:
+            escaped = os.path.abspath(path).replace('\\', '/').replace("'", "'\\''")
+            return f"file '{escaped}'\n"
+
+        def entry(path: str, duration: float) -> str:
+            return f"{file_line(path)}duration {duration:.3f}\n"
+
+        parts = ["ffconcat version 1.0\n"]
+        cursor = 0.0
+        for subtitle in sorted(subtitle_images, key=lambda s: s['start']):
+            if subtitle['start'] > cursor + 0.001:
+                parts.append(entry(blank_path, subtitle['start'] - cursor))
+                cursor = subtitle['start']
+            duration = subtitle['end'] - cursor
+            if duration <= 0.001:
+                continue
+            parts.append(entry(subtitle['path'], duration))
+            cursor = subtitle['end']
+
+        # Terminar en transparente; el concat demuxer ignora la duración de la última entrada
+        parts.append(entry(blank_path, 0.1))
+        parts.append(file_line(blank_path))
+
+        playlist_path = os.path.join(temp_dir, "subtitles.ffconcat")
+        with open(playlist_path, 'w', encoding='utf-8') as f:
+            f.write(''.join(parts))
+        return playlist_path
+
     def _apply_image_subtitles(self, video_path: str, output_path: str,
                               subtitle_images: List[dict], audio_path: str = None) -> bool:
         """
         Aplica las imágenes de subtítulos al video usando FFmpeg
         """
         try:
-            # Construir filtro complejo para superponer las imágenes
-            filter_parts = []
-
-            for i, subtitle in enumerate(subtitle_images):
-                # Cada imagen se superpone en su tiempo específico
-                filter_parts.append(
-                    f"[{i+1}:v]format=rgba,colorchannelmixer=aa=1.0[sub{i}];"
-                    f"[0:v][sub{i}]overlay=x=0:y=H-{self.subtitle_height}:"
-                    f"enable='between(t,{subtitle['start']:.2f},{subtitle['end']:.2f})'[v{i}]"
-                )
-
-            # Construir comando FFmpeg
-            ffmpeg_cmd = ['ffmpeg']
+            # Un solo input con todas las imágenes temporizadas y un solo overlay,
+            # así el coste del filtro no depende del número de líneas
+            temp_dir = os.path.dirname(subtitle_images[0]['path'])
+            playlist_path = self._write_overlay_playlist(subtitle_images, temp_dir)
 
-            # Video input
-            ffmpeg_cmd.extend(['-i', video_path])
-
-            # Imagen inputs
-            for subtitle in subtitle_images:
-                ffmpeg_cmd.extend(['-loop', '1', '-t', '1', '-i', subtitle['path']])
+            ffmpeg_cmd = [
+                'ffmpeg',
+                '-i', video_path,
+                '-f', 'concat', '-safe', '0', '-i', playlist_path
+            ]
 
             # Audio input si existe
-            if audio_path and os.path.exists(audio_path):
+            has_audio = audio_path and os.path.exists(audio_path)
+            if has_audio:
                 ffmpeg_cmd.extend(['-i', audio_path])
 
-            # Si hay subtítulos, aplicar filtros
-            if filter_parts:
-                # Conectar todos los filtros en cadena
-                filter_complex = ""
-                last_output = "0:v"
-
-                for i, subtitle in enumerate(subtitle_images):
-                    if i == 0:
-                        filter_complex += f"[1:v]format=rgba[sub0];"
-                        filter_complex += f"[0:v][sub0]overlay=x=0:y=H-{self.subtitle_height}:"
-                        filter_complex += f"enable='between(t,{subtitle['start']:.2f},{subtitle['end']:.2f})'"
-                    else:
-                        filter_complex += f"[{i+1}:v]format=rgba[sub{i}];"
-                        filter_complex += f"[v{i-1}][sub{i}]overlay=x=0:y=H-{self.subtitle_height}:"
-                        filter_complex += f"enable='between(t,{subtitle['start']:.2f},{subtitle['end']:.2f})'"
-
-                    if i < len(subtitle_images) - 1:
-                        filter_complex += f"[v{i}];"
-
-                ffmpeg_cmd.extend(['-filter_complex', filter_complex])
-                ffmpeg_cmd.extend(['-map', f'[v{len(subtitle_images)-1}]'])
-            else:
-                ffmpeg_cmd.extend(['-map', '0:v'])
+            filter_complex = (
+                "[1:v]format=rgba[subs];"
+                f"[0:v][subs]overlay=x=0:y=H-{self.subtitle_height}:eof_action=pass[vout]"
+            )
+            ffmpeg_cmd.extend(['-filter_complex', filter_complex, '-map', '[vout]'])
 
             # Mapear audio si existe
-            if audio_path and os.path.exists(audio_path):
-                audio_index = len(subtitle_images) + 1
-                ffmpeg_cmd.extend(['-map', f'{audio_index}:a', '-c:a', 'copy'])
+            if has_audio:
+                ffmpeg_cmd.extend(['-map', '2:a', '-c:a', 'copy'])
 
             # Configuración de salida
             ffmpeg_cmd.extend([
@@ -315,8 +324,4 @@ class ImageSubtitleGenerator:
         """
         Limpia los archivos temporales
         """
-        try:
-            import shutil
-            shutil.rmtree(temp_dir, ignore_errors=True)
-        except:
-            pass
\ No newline at end of file
+        scratch_area().discard(temp_dir)
\ No newline at end of file
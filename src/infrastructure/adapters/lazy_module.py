@@ -0,0 +1,42 @@
+import importlib
+import sys
+from typing import List
+
+
+# SDKs y librerías de medios que un worker que solo sirve la API no necesita cargar
+HEAVY_MODULES = ("openai", "aiohttp", "requests", "moviepy", "numpy", "cv2", "PIL")
+
+
+class LazyModule:
+    """
+    Stand-in for a module that is imported on first attribute access.
+
+    ``aiohttp = lazy_module("aiohttp")`` at the top of an adapter keeps the
+    code unchanged (``aiohttp.ClientSession()``, ``except aiohttp.ClientError``)
+    while the real import happens the first time a request is made.
+    """
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+
+    def _load(self):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr: str):
+        return getattr(self._load(), attr)
+
+    def __repr__(self) -> str:
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module '{self._name}' ({state})>"
+
+
+def lazy_module(name: str) -> LazyModule:
+    return LazyModule(name)
+
+
+def loaded_heavy_modules() -> List[str]:
+    """HEAVY_MODULES already imported by this process"""
+    return [name for name in HEAVY_MODULES if name in sys.modules]
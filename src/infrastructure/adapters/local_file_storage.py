@@ -1,6 +1,7 @@
 import os
 import json
-from typing import List
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
 from datetime import datetime
 
 from ...domain.ports.file_storage import FileStoragePort
@@ -9,13 +10,69 @@ from ...domain.entities.song_request import SongRequest, ModelVersion
 from ...domain.entities.song_response import SongResponse, SongTrack
 from ...domain.entities.image_response import ImageResponse
 from ...domain.entities.video_response import VideoResponse
+from .session_search_index import SessionSearchIndex
+from .artifact_store import ArtifactStore
 
 
 class LocalFileStorage(FileStoragePort):
     
+    # Change listeners per output directory, shared by every instance pointing at it
+    _listeners: Dict[str, List[Callable[[str], None]]] = {}
+    _listeners_lock = threading.Lock()
+    
     def __init__(self, base_output_dir: str = "output"):
         self.base_output_dir = base_output_dir
         os.makedirs(base_output_dir, exist_ok=True)
+        self._search_index: Optional[SessionSearchIndex] = None
+    
+    @property
+    def search_index(self) -> SessionSearchIndex:
+        if self._search_index is None:
+            self._search_index = SessionSearchIndex(os.path.join(self.base_output_dir, "search_index.db"))
+        return self._search_index
+    
+    def adopt_artifact(self, file_path: str) -> None:
+        ArtifactStore.shared().adopt(file_path)
+
+    def is_search_ready(self) -> bool:
+        return self.search_index.is_built()
+    
+    def build_search_index(self) -> None:
+        if not self.search_index.is_built():
+            self.search_index.rebuild(self.get_all_sessions())
+
+    def search_sessions(self, query: str, limit: int = 50) -> List[Tuple[str, float]]:
+        """Ranked (session_id, score) matches for a free-text query over title, style and lyrics"""
+        self.build_search_index()
+        matches = []
+        for session_id, score in self.search_index.search(query, limit):
+            # Session deleted outside the app: drop it from the index instead of returning it
+            if not os.path.exists(os.path.join(self.base_output_dir, session_id, "metadata.json")):
+                self.search_index.remove_session(session_id)
+                continue
+            matches.append((session_id, score))
+        return matches
+    
+    def subscribe(self, listener: Callable[[str], None]) -> None:
+        key = os.path.abspath(self.base_output_dir)
+        with self._listeners_lock:
+            self._listeners.setdefault(key, []).append(listener)
+    
+    def unsubscribe(self, listener: Callable[[str], None]) -> None:
+        key = os.path.abspath(self.base_output_dir)
+        with self._listeners_lock:
+            if listener in self._listeners.get(key, []):
+                self._listeners[key].remove(listener)
+    
+    def _publish(self, session_id: str):
+        """Notify listeners that a session changed (called from the saving thread)"""
+        with self._listeners_lock:
+            listeners = list(self._listeners.get(os.path.abspath(self.base_output_dir), []))
+        for listener in listeners:
+            try:
+                listener(session_id)
+            except Exception as e:
+                print(f"Error notifying storage listener: {str(e)}")
     
     def create_session_directory(self, session: GenerationSession) -> str:
         session_path = os.path.join(self.base_output_dir, session.session_id)
@@ -75,6 +132,12 @@ class LocalFileStorage(FileStoragePort):
             with open(metadata_path, 'w', encoding='utf-8') as f:
                 json.dump(metadata, f, indent=2, ensure_ascii=False)
             
+            try:
+                self.search_index.index_session(session)
+            except Exception as e:
+                print(f"Error updating search index: {str(e)}")
+            
+            self._publish(session.session_id)
             return True
         except Exception as e:
             print(f"Error saving metadata: {str(e)}")
@@ -88,7 +151,8 @@ class LocalFileStorage(FileStoragePort):
         
         for session_dir in os.listdir(self.base_output_dir):
             session_path = os.path.join(self.base_output_dir, session_dir)
-            if os.path.isdir(session_path):
+            # .store / .scratch no son sesiones
+            if os.path.isdir(session_path) and not session_dir.startswith('.'):
                 try:
                     session = self.get_session_by_id(session_dir)
                     sessions.append(session)
@@ -0,0 +1,159 @@
+import hashlib
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+# Compiladas una sola vez para todos los backends de subtítulos
+_SECTION_TAG_RE = re.compile(r'\[(.*?)\]')
+_BLANK_LINES_RE = re.compile(r'\n+')
+_WORD_RE = re.compile(r'\S+')
+_VOWEL_GROUP_RE = re.compile(r'[aeiouyáéíóúüàèìòùâêîôûäëïö]+', re.IGNORECASE)
+_LETTER_RE = re.compile(r'[^\W\d_]', re.UNICODE)
+
+
+def estimate_syllables(word: str) -> int:
+    """Rough syllable count (vowel groups), good enough to weight karaoke timing"""
+    if not _LETTER_RE.search(word):
+        return 0
+    return max(1, len(_VOWEL_GROUP_RE.findall(word)))
+
+
+def display_width(text: str) -> int:
+    """Width in monospace cells: wide/full-width characters count 2, combining marks 0"""
+    width = 0
+    for char in text:
+        if unicodedata.combining(char):
+            continue
+        width += 2 if unicodedata.east_asian_width(char) in ('W', 'F') else 1
+    return width
+
+
+@dataclass(frozen=True)
+class LyricWord:
+    text: str
+    syllables: int
+    width: int
+
+
+@dataclass(frozen=True)
+class LyricLine:
+    text: str
+    section: Optional[str]
+    words: Tuple[LyricWord, ...]
+
+    @property
+    def syllables(self) -> int:
+        return sum(word.syllables for word in self.words)
+
+    @property
+    def width(self) -> int:
+        return display_width(self.text)
+
+
+def split_words(text: str) -> Tuple[LyricWord, ...]:
+    return tuple(
+        LyricWord(token, estimate_syllables(token), display_width(token))
+        for token in _WORD_RE.findall(text)
+    )
+
+
+def word_durations(words: Tuple[LyricWord, ...], total: float) -> List[float]:
+    """Split a line's duration across its words proportionally to their syllables"""
+    if not words:
+        return []
+    weights = [max(word.syllables, 1) for word in words]
+    scale = total / sum(weights)
+    return [weight * scale for weight in weights]
+
+
+def wrap_line(line: str, max_chars: int) -> List[str]:
+    """Break a line into pieces of at most max_chars characters at word boundaries"""
+    if len(line) <= max_chars:
+        return [line]
+
+    pieces = []
+    current = ""
+    for word in line.split():
+        if len(current + " " + word) <= max_chars:
+            current += (" " + word) if current else word
+        else:
+            if current:
+                pieces.append(current)
+            current = word
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+@dataclass(frozen=True)
+class ParsedLyrics:
+    """Lyrics parsed once: section tags, lines and words with syllables and widths"""
+    digest: str
+    sections: Tuple[str, ...]
+    lines: Tuple[LyricLine, ...]
+    _display_cache: Dict[tuple, List[str]] = field(default_factory=dict, compare=False, repr=False)
+
+    def display_lines(self, max_chars: int, max_lines: int,
+                      clean: Optional[Callable[[str], str]] = None) -> List[str]:
+        """
+        Lines ready for a subtitle backend: optionally cleaned, wrapped at
+        max_chars and capped at max_lines. Memoized per backend settings.
+        """
+        key = (max_chars, max_lines, getattr(clean, '__qualname__', None))
+        cached = self._display_cache.get(key)
+        if cached is not None:
+            return list(cached)
+
+        result = []
+        for line in self.lines:
+            text = clean(line.text) if clean else line.text
+            result.extend(wrap_line(text, max_chars))
+
+        result = result[:max_lines]
+        self._display_cache[key] = result
+        return list(result)
+
+
+def _parse(lyrics: str, digest: str) -> ParsedLyrics:
+    sections = []
+    current_section = None
+    lines = []
+
+    for raw_line in lyrics.split('\n'):
+        tags = [tag.strip() for tag in _SECTION_TAG_RE.findall(raw_line) if tag.strip()]
+        if tags:
+            sections.extend(tags)
+            current_section = tags[-1]
+        text = _SECTION_TAG_RE.sub('', raw_line).strip()
+        if text:
+            lines.append(LyricLine(text, current_section, split_words(text)))
+
+    return ParsedLyrics(digest, tuple(sections), tuple(lines))
+
+
+_CACHE_SIZE = 64
+_cache: "OrderedDict[str, ParsedLyrics]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def parse_lyrics(lyrics: str) -> ParsedLyrics:
+    """Parse lyrics, memoized by content hash so every backend in a fallback chain shares it"""
+    lyrics = _BLANK_LINES_RE.sub('\n', lyrics or '').strip()
+    digest = hashlib.sha1(lyrics.encode('utf-8')).hexdigest()
+
+    with _cache_lock:
+        parsed = _cache.get(digest)
+        if parsed is not None:
+            _cache.move_to_end(digest)
+            return parsed
+
+    parsed = _parse(lyrics, digest)
+    with _cache_lock:
+        _cache[digest] = parsed
+        while len(_cache) > _CACHE_SIZE:
+            _cache.popitem(last=False)
+    return parsed
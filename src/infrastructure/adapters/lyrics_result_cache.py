@@ -0,0 +1,127 @@
+import asyncio
+import hashlib
+import re
+import time
+import unicodedata
+from typing import Callable, Optional, Tuple
+
+from ..config.settings import LyricsCacheSettings
+from ..persistence.sqlite_pool import get_pool
+from .openai_streaming import notify
+
+
+_PUNCTUATION_RE = re.compile(r'[^\w\s]', re.UNICODE)
+
+
+def normalize_description(description: str) -> str:
+    """
+    Canonical form of a lyrics description: case, accents, punctuation and
+    spacing are ignored, so "Canción alegre  sobre un PERRO!" and
+    "cancion alegre sobre un perro" hit the same cache entry.
+    """
+    text = unicodedata.normalize('NFKD', description or '')
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    text = _PUNCTUATION_RE.sub(' ', text.casefold())
+    return ' '.join(text.split())
+
+
+class LyricsResultCache:
+    """SQLite store of generated lyrics keyed by normalized description + generator identity"""
+
+    def __init__(self, settings: Optional[LyricsCacheSettings] = None):
+        self.settings = settings or LyricsCacheSettings.from_env()
+        self.ttl_seconds = self.settings.ttl_hours * 3600
+        self.pool = get_pool(self.settings.db_path)
+        self._init_database()
+
+    def _init_database(self):
+        with self.pool.connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS lyrics_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    scope TEXT NOT NULL,
+                    description TEXT NOT NULL,
+                    identity TEXT NOT NULL,
+                    lyrics TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    hits INTEGER DEFAULT 0
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_lyrics_cache_created ON lyrics_cache(created_at)")
+
+    def scope_for(self, user_id) -> str:
+        return "shared" if self.settings.scope == "shared" else f"user:{user_id}"
+
+    @staticmethod
+    def make_key(scope: str, description: str, identity: str) -> str:
+        raw = "\x00".join((scope, normalize_description(description), identity))
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        with self.pool.connection() as conn:
+            row = conn.execute(
+                "SELECT lyrics FROM lyrics_cache WHERE cache_key = ? AND created_at >= ?",
+                (key, time.time() - self.ttl_seconds)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE lyrics_cache SET hits = hits + 1 WHERE cache_key = ?", (key,))
+            return row["lyrics"]
+
+    def put(self, key: str, scope: str, description: str, identity: str, lyrics: str):
+        with self.pool.connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO lyrics_cache "
+                "(cache_key, scope, description, identity, lyrics, created_at, hits) "
+                "VALUES (?, ?, ?, ?, ?, ?, 0)",
+                (key, scope, normalize_description(description), identity, lyrics, time.time())
+            )
+
+    def purge_expired(self) -> int:
+        with self.pool.connection() as conn:
+            cursor = conn.execute(
+                "DELETE FROM lyrics_cache WHERE created_at < ?",
+                (time.time() - self.ttl_seconds,)
+            )
+            return cursor.rowcount
+
+
+class CachedLyricsClient:
+    """
+    Wraps a lyrics client (OpenAILyricsClient & co.) with LyricsResultCache.
+
+    The key includes the client's ``cache_identity`` (assistant or model and
+    temperature), so changing the generator never returns stale lyrics.
+    """
+
+    def __init__(self, client, cache: LyricsResultCache, user_id):
+        self.client = client
+        self.cache = cache
+        self.scope = cache.scope_for(user_id)
+
+    async def generate(self, description: str, progress_callback=None, session_id: str = "unknown",
+                       delta_callback: Optional[Callable[[str], object]] = None,
+                       force_fresh: bool = False) -> Tuple[str, bool]:
+        """Returns (lyrics, served_from_cache)"""
+        identity = getattr(self.client, "cache_identity", type(self.client).__name__)
+        key = self.cache.make_key(self.scope, description, identity)
+
+        if self.cache.settings.enabled and not force_fresh:
+            # SQLite fuera del event loop
+            lyrics = await asyncio.to_thread(self.cache.get, key)
+            if lyrics is not None:
+                await notify(progress_callback, "Letra recuperada de la caché")
+                await notify(delta_callback, lyrics)
+                return lyrics, True
+
+        lyrics = await self.client.generate_lyrics(
+            description, progress_callback, session_id=session_id, delta_callback=delta_callback
+        )
+        if self.cache.settings.enabled:
+            await asyncio.to_thread(self.cache.put, key, self.scope, description, identity, lyrics)
+        return lyrics, False
+
+    async def generate_lyrics(self, description: str, progress_callback=None, session_id: str = "unknown",
+                              delta_callback: Optional[Callable[[str], object]] = None) -> str:
+        lyrics, _ = await self.generate(description, progress_callback, session_id, delta_callback)
+        return lyrics
@@ -8,6 +8,8 @@ from moviepy.editor import (
 )
 from moviepy.video.fx import resize
 import math
+from .lyrics_processor import parse_lyrics
+from .artifact_store import scratch_area
 
 
 class MoviePyKaraokeGenerator:
@@ -27,6 +29,7 @@ class MoviePyKaraokeGenerator:
         Crea un video con subtítulos karaoke animados y bailarines con configuración personalizada
         Estrategia: Crear video sin audio con MoviePy, luego añadir audio con FFmpeg
         """
+        temp_video = None
         try:
             # Aplicar configuración personalizada si se proporciona
             if subtitle_config:
@@ -71,9 +74,9 @@ class MoviePyKaraokeGenerator:
             # Preparar letras
             lines = self._prepare_lyrics(lyrics)
 
-            # Crear archivo temporal para video sin audio
-            import tempfile
-            temp_video = tempfile.NamedTemporaryFile(suffix='.mp4', delete=False).name
+            # Crear archivo temporal para video sin audio (área scratch, en uso hasta el finally)
+            scratch = scratch_area()
+            temp_video = scratch.track(scratch.new_path(suffix='.mp4', prefix='karaoke_'))
 
             if lines:
                 # Crear clips de subtítulos animados
@@ -108,12 +111,6 @@ class MoviePyKaraokeGenerator:
             # Ahora usar FFmpeg para combinar video con audio
             success = self._add_audio_with_ffmpeg(temp_video, output_path, audio_path)
 
-            # Limpiar archivo temporal
-            try:
-                os.remove(temp_video)
-            except:
-                pass
-
             if success:
                 print("✅ ¡Video karaoke creado exitosamente con audio!")
             else:
@@ -125,43 +122,16 @@ class MoviePyKaraokeGenerator:
             print(f"Error en MoviePy: {str(e)}")
             # Fallback: copiar video con audio
             return self._fallback_copy(video_path, output_path, audio_path)
+        finally:
+            # Limpiar archivo temporal
+            if temp_video:
+                scratch_area().discard(temp_video)
 
     def _prepare_lyrics(self, lyrics: str) -> List[str]:
         """
         Prepara y limpia las letras
         """
-        # Limpiar texto
-        clean_lyrics = re.sub(r'\[.*?\]', '', lyrics)  # Quitar etiquetas
-        clean_lyrics = re.sub(r'\n+', '\n', clean_lyrics).strip()
-
-        if not clean_lyrics:
-            return []
-
-        # Dividir en líneas
-        lines = [line.strip() for line in clean_lyrics.split('\n') if line.strip()]
-
-        # Procesar líneas largas
-        processed = []
-        for line in lines:
-            # Limpiar caracteres problemáticos para MoviePy
-            line = self._clean_text_for_moviepy(line)
-
-            if len(line) > 45:  # Líneas más cortas para mejor visualización
-                words = line.split()
-                current = ""
-                for word in words:
-                    if len(current + " " + word) <= 45:
-                        current += (" " + word) if current else word
-                    else:
-                        if current:
-                            processed.append(current)
-                        current = word
-                if current:
-                    processed.append(current)
-            else:
-                processed.append(line)
-
-        return processed[:25]  # Máximo 25 líneas
+        return parse_lyrics(lyrics).display_lines(45, 25, clean=self._clean_text_for_moviepy)
 
     def _clean_text_for_moviepy(self, text: str) -> str:
         """
@@ -1,8 +1,5 @@
-import asyncio
-import time
-import traceback
-from openai import OpenAI
-from typing import Optional
+from typing import Callable, Optional
+from .openai_streaming import notify, stream_assistant_run, stream_chat_completion
 from .usage_tracker import get_tracker, APIUsage
 
 
@@ -12,12 +9,16 @@ class OpenAILyricsClientHybrid:
     """
 
     def __init__(self, api_key: str, assistant_id: str = None):
-        self.client = OpenAI(api_key=api_key)
+        from openai import AsyncOpenAI
+        self.client = AsyncOpenAI(api_key=api_key)
         self.assistant_id = assistant_id
         self.tracker = get_tracker()
         self.use_assistant = True  # Try assistant first
+        # Identifica al generador en la caché de letras
+        self.cache_identity = f"hybrid:{assistant_id}:gpt-4o-mini:0.8"
 
-    async def generate_lyrics(self, description: str, progress_callback=None, session_id: str = "unknown") -> str:
+    async def generate_lyrics(self, description: str, progress_callback=None, session_id: str = "unknown",
+                              delta_callback: Optional[Callable[[str], object]] = None) -> str:
         """
         Generate song lyrics - tries Assistant first, falls back to Chat Completions if 404
 
@@ -25,6 +26,7 @@ class OpenAILyricsClientHybrid:
             description: The description of the song to generate lyrics for
             progress_callback: Optional callback for progress updates
             session_id: Session ID for tracking
+            delta_callback: Optional callback receiving each text fragment as it is generated
 
         Returns:
             Generated lyrics as a string
@@ -33,7 +35,7 @@ class OpenAILyricsClientHybrid:
         # Try with Assistant first (if configured and not previously failed)
         if self.use_assistant and self.assistant_id:
             try:
-                return await self._generate_with_assistant(description, progress_callback, session_id)
+                return await self._generate_with_assistant(description, progress_callback, session_id, delta_callback)
             except Exception as e:
                 error_str = str(e).lower()
                 # If it's a 404 error (assistant not found), switch to Chat Completions permanently
@@ -46,9 +48,10 @@ class OpenAILyricsClientHybrid:
                     raise
 
         # Use Chat Completions (either as fallback or primary method)
-        return await self._generate_with_chat(description, progress_callback, session_id)
+        return await self._generate_with_chat(description, progress_callback, session_id, delta_callback)
 
-    async def _generate_with_assistant(self, description: str, progress_callback=None, session_id: str = "unknown") -> str:
+    async def _generate_with_assistant(self, description: str, progress_callback=None, session_id: str = "unknown",
+                                       delta_callback=None) -> str:
         """Generate lyrics using Assistants API"""
         usage = APIUsage(
             api_name="OpenAI",
@@ -60,91 +63,54 @@ class OpenAILyricsClientHybrid:
         try:
             print(f"[OpenAI Hybrid] Intentando con Assistant: {self.assistant_id}")
 
-            if progress_callback:
-                await asyncio.get_event_loop().run_in_executor(
-                    None, progress_callback, "Conectando con el asistente de OpenAI..."
-                )
+            await notify(progress_callback, "Conectando con el asistente de OpenAI...")
 
             # Create a thread
-            thread = await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: self.client.beta.threads.create()
-            )
+            thread = await self.client.beta.threads.create()
 
-            if progress_callback:
-                await asyncio.get_event_loop().run_in_executor(
-                    None, progress_callback, "Enviando solicitud de generación de letra..."
-                )
+            await notify(progress_callback, "Enviando solicitud de generación de letra...")
 
             # Create message first, then run (V2 approach)
-            message = await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: self.client.beta.threads.messages.create(
-                    thread_id=thread.id,
-                    role="user",
-                    content=description
-                )
+            await self.client.beta.threads.messages.create(
+                thread_id=thread.id,
+                role="user",
+                content=description
             )
 
-            # Create and poll run
-            run = await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: self.client.beta.threads.runs.create_and_poll(
-                    thread_id=thread.id,
-                    assistant_id=self.assistant_id
-                )
+            await notify(progress_callback, "Generando letra de la canción...")
+
+            # Run streaming the assistant's text as it is produced
+            lyrics, status, last_error, total_tokens = await stream_assistant_run(
+                self.client, thread.id, self.assistant_id, delta_callback
             )
 
-            if progress_callback:
-                await asyncio.get_event_loop().run_in_executor(
-                    None, progress_callback, "Generando letra de la canción..."
-                )
-
-            # Check if run completed
-            if run.status == 'completed':
-                # Get messages
-                messages = await asyncio.get_event_loop().run_in_executor(
-                    None,
-                    lambda: self.client.beta.threads.messages.list(thread_id=thread.id)
-                )
-
-                # Get the assistant's response
-                for message in messages.data:
-                    if message.role == "assistant":
-                        if message.content and len(message.content) > 0:
-                            # Handle text content
-                            for content in message.content:
-                                if content.type == 'text':
-                                    lyrics = content.text.value
-                                    print(f"[OpenAI Hybrid - Assistant] Letra generada exitosamente")
-
-                                    if progress_callback:
-                                        await asyncio.get_event_loop().run_in_executor(
-                                            None, progress_callback, "Letra generada exitosamente"
-                                        )
-
-                                    # Registrar uso exitoso
-                                    usage.response_data = {"lyrics_length": len(lyrics)}
-                                    usage.tokens_used = len(lyrics) // 4  # Estimación aproximada
-                                    usage.cost_usd = self.tracker.calculate_openai_cost("gpt-4", usage.tokens_used)
-                                    usage.success = True
-                                    self.tracker.track_usage(usage)
-
-                                    return lyrics
+            if status != 'completed':
+                error_msg = f"La generación falló con estado: {status}"
+                if last_error:
+                    error_msg = f"La generación falló: {last_error}"
 
                 usage.success = False
-                usage.error_message = "No se pudo obtener respuesta del asistente"
+                usage.error_message = error_msg
                 self.tracker.track_usage(usage)
-                raise Exception("No se pudo obtener respuesta del asistente")
-            else:
-                error_msg = f"La generación falló con estado: {run.status}"
-                if hasattr(run, 'last_error') and run.last_error:
-                    error_msg = f"La generación falló: {run.last_error}"
+                raise Exception(error_msg)
 
+            if not lyrics:
                 usage.success = False
-                usage.error_message = error_msg
+                usage.error_message = "No se pudo obtener respuesta del asistente"
                 self.tracker.track_usage(usage)
-                raise Exception(error_msg)
+                raise Exception("No se pudo obtener respuesta del asistente")
+
+            print(f"[OpenAI Hybrid - Assistant] Letra generada exitosamente")
+            await notify(progress_callback, "Letra generada exitosamente")
+
+            # Registrar uso exitoso
+            usage.response_data = {"lyrics_length": len(lyrics)}
+            usage.tokens_used = total_tokens or len(lyrics) // 4  # Estimación si el run no informa uso
+            usage.cost_usd = self.tracker.calculate_openai_cost("gpt-4", usage.tokens_used)
+            usage.success = True
+            self.tracker.track_usage(usage)
+
+            return lyrics
 
         except Exception as e:
             print(f"[OpenAI Hybrid - Assistant] ERROR: {str(e)}")
@@ -156,7 +122,8 @@ class OpenAILyricsClientHybrid:
 
             raise Exception(f"Error al generar letra: {str(e)}")
 
-    async def _generate_with_chat(self, description: str, progress_callback=None, session_id: str = "unknown") -> str:
+    async def _generate_with_chat(self, description: str, progress_callback=None, session_id: str = "unknown",
+                                  delta_callback=None) -> str:
         """Generate lyrics using Chat Completions API"""
         usage = APIUsage(
             api_name="OpenAI",
@@ -168,10 +135,7 @@ class OpenAILyricsClientHybrid:
         try:
             print(f"[OpenAI Hybrid] Generando letra con Chat Completions")
 
-            if progress_callback:
-                await asyncio.get_event_loop().run_in_executor(
-                    None, progress_callback, "Conectando con OpenAI (Chat)..."
-                )
+            await notify(progress_callback, "Conectando con OpenAI (Chat)...")
 
             # System prompt for lyrics generation
             system_prompt = """Eres un compositor profesional de canciones infantiles.
@@ -184,37 +148,30 @@ Tu tarea es crear letras de canciones para niños que sean:
 Genera SOLO la letra de la canción, sin títulos, sin explicaciones, sin comentarios adicionales.
 Usa formato de estrofas y coros claramente separados."""
 
-            if progress_callback:
-                await asyncio.get_event_loop().run_in_executor(
-                    None, progress_callback, "Generando letra de la canción..."
-                )
-
-            # Call OpenAI Chat Completions API
-            response = await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: self.client.chat.completions.create(
-                    model="gpt-4o-mini",  # Más económico que gpt-4
-                    messages=[
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": f"Crea una letra de canción sobre: {description}"}
-                    ],
-                    temperature=0.8,  # Creatividad moderada
-                    max_tokens=500
-                )
+            await notify(progress_callback, "Generando letra de la canción...")
+
+            # Call OpenAI Chat Completions API, streaming the deltas
+            lyrics, total_tokens = await stream_chat_completion(
+                self.client,
+                delta_callback,
+                model="gpt-4o-mini",  # Más económico que gpt-4
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": f"Crea una letra de canción sobre: {description}"}
+                ],
+                temperature=0.8,  # Creatividad moderada
+                max_tokens=500
             )
+            lyrics = lyrics.strip()
 
-            if response.choices and len(response.choices) > 0:
-                lyrics = response.choices[0].message.content.strip()
+            if lyrics:
                 print(f"[OpenAI Hybrid - Chat] Letra generada exitosamente")
 
-                if progress_callback:
-                    await asyncio.get_event_loop().run_in_executor(
-                        None, progress_callback, "Letra generada exitosamente"
-                    )
+                await notify(progress_callback, "Letra generada exitosamente")
 
                 # Registrar uso
                 usage.response_data = {"lyrics_length": len(lyrics)}
-                usage.tokens_used = response.usage.total_tokens if response.usage else len(lyrics) // 4
+                usage.tokens_used = total_tokens or len(lyrics) // 4
                 usage.cost_usd = self.tracker.calculate_openai_cost("gpt-4o-mini", usage.tokens_used)
                 usage.success = True
                 self.tracker.track_usage(usage)
@@ -1,6 +1,5 @@
-import asyncio
-from openai import OpenAI
-from typing import Optional
+from typing import Callable, Optional
+from .openai_streaming import notify, stream_chat_completion
 from .usage_tracker import get_tracker, APIUsage
 
 
@@ -11,10 +10,14 @@ class OpenAILyricsClientSimple:
     """
 
     def __init__(self, api_key: str, assistant_id: str = None):
-        self.client = OpenAI(api_key=api_key)
+        from openai import AsyncOpenAI
+        self.client = AsyncOpenAI(api_key=api_key)
         self.tracker = get_tracker()
+        # Identifica al generador en la caché de letras
+        self.cache_identity = "chat:gpt-4o-mini:0.8"
 
-    async def generate_lyrics(self, description: str, progress_callback=None, session_id: str = "unknown") -> str:
+    async def generate_lyrics(self, description: str, progress_callback=None, session_id: str = "unknown",
+                              delta_callback: Optional[Callable[[str], object]] = None) -> str:
         """
         Generate song lyrics based on a description using OpenAI Chat Completions
 
@@ -22,6 +25,7 @@ class OpenAILyricsClientSimple:
             description: The description of the song to generate lyrics for
             progress_callback: Optional callback for progress updates
             session_id: Session ID for tracking
+            delta_callback: Optional callback receiving each text fragment as it is generated
 
         Returns:
             Generated lyrics as a string
@@ -37,10 +41,7 @@ class OpenAILyricsClientSimple:
         try:
             print(f"[OpenAI Simple] Generando letra con descripción: {description}")
 
-            if progress_callback:
-                await asyncio.get_event_loop().run_in_executor(
-                    None, progress_callback, "Conectando con OpenAI..."
-                )
+            await notify(progress_callback, "Conectando con OpenAI...")
 
             # System prompt for lyrics generation
             system_prompt = """Eres un compositor profesional de canciones infantiles.
@@ -53,37 +54,30 @@ Tu tarea es crear letras de canciones para niños que sean:
 Genera SOLO la letra de la canción, sin títulos, sin explicaciones, sin comentarios adicionales.
 Usa formato de estrofas y coros claramente separados."""
 
-            if progress_callback:
-                await asyncio.get_event_loop().run_in_executor(
-                    None, progress_callback, "Generando letra de la canción..."
-                )
-
-            # Call OpenAI Chat Completions API
-            response = await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: self.client.chat.completions.create(
-                    model="gpt-4o-mini",  # Más económico que gpt-4
-                    messages=[
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": f"Crea una letra de canción sobre: {description}"}
-                    ],
-                    temperature=0.8,  # Creatividad moderada
-                    max_tokens=500
-                )
+            await notify(progress_callback, "Generando letra de la canción...")
+
+            # Call OpenAI Chat Completions API, streaming the deltas
+            lyrics, total_tokens = await stream_chat_completion(
+                self.client,
+                delta_callback,
+                model="gpt-4o-mini",  # Más económico que gpt-4
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": f"Crea una letra de canción sobre: {description}"}
+                ],
+                temperature=0.8,  # Creatividad moderada
+                max_tokens=500
             )
+            lyrics = lyrics.strip()
 
-            if response.choices and len(response.choices) > 0:
-                lyrics = response.choices[0].message.content.strip()
+            if lyrics:
                 print(f"[OpenAI Simple] Letra generada (primeros 100 chars): {lyrics[:100]}...")
 
-                if progress_callback:
-                    await asyncio.get_event_loop().run_in_executor(
-                        None, progress_callback, "Letra generada exitosamente"
-                    )
+                await notify(progress_callback, "Letra generada exitosamente")
 
                 # Registrar uso
                 usage.response_data = {"lyrics_length": len(lyrics)}
-                usage.tokens_used = response.usage.total_tokens if response.usage else len(lyrics) // 4
+                usage.tokens_used = total_tokens or len(lyrics) // 4
                 usage.cost_usd = self.tracker.calculate_openai_cost("gpt-4o-mini", usage.tokens_used)
                 usage.success = True
                 self.tracker.track_usage(usage)
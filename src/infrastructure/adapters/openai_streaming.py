@@ -0,0 +1,86 @@
+import inspect
+from typing import TYPE_CHECKING, Callable, Optional, Tuple
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+
+async def notify(callback: Optional[Callable], *args):
+    """Call a progress/delta callback that may be sync (GUI) or async (websocket)"""
+    if callback is None:
+        return
+    result = callback(*args)
+    if inspect.isawaitable(result):
+        await result
+
+
+async def stream_assistant_run(
+    client: 'AsyncOpenAI',
+    thread_id: str,
+    assistant_id: str,
+    delta_callback: Optional[Callable[[str], object]] = None
+) -> Tuple[str, str, Optional[str], Optional[int]]:
+    """
+    Run an assistant on a thread streaming its message deltas.
+    Returns (text, run status, last error, total tokens).
+    """
+    chunks = []
+    status = "in_progress"
+    last_error = None
+    total_tokens = None
+
+    stream = await client.beta.threads.runs.create(
+        thread_id=thread_id,
+        assistant_id=assistant_id,
+        stream=True
+    )
+    async for event in stream:
+        if event.event == "thread.message.delta":
+            for part in event.data.delta.content or []:
+                if part.type == "text" and part.text and part.text.value:
+                    chunks.append(part.text.value)
+                    await notify(delta_callback, part.text.value)
+        elif event.event in ("thread.run.completed", "thread.run.failed",
+                             "thread.run.cancelled", "thread.run.expired",
+                             "thread.run.incomplete"):
+            run = event.data
+            status = run.status
+            if getattr(run, "last_error", None):
+                last_error = str(run.last_error)
+            if getattr(run, "usage", None):
+                total_tokens = run.usage.total_tokens
+        elif event.event == "thread.run.requires_action":
+            # El asistente de letras no usa herramientas; no se puede continuar
+            status = "requires_action"
+            await client.beta.threads.runs.cancel(thread_id=thread_id, run_id=event.data.id)
+            break
+        elif event.event == "error":
+            status = "failed"
+            last_error = str(event.data)
+
+    return "".join(chunks), status, last_error, total_tokens
+
+
+async def stream_chat_completion(
+    client: 'AsyncOpenAI',
+    delta_callback: Optional[Callable[[str], object]] = None,
+    **params
+) -> Tuple[str, Optional[int]]:
+    """Stream a chat completion. Returns (text, total tokens)"""
+    chunks = []
+    total_tokens = None
+
+    stream = await client.chat.completions.create(
+        stream=True,
+        stream_options={"include_usage": True},
+        **params
+    )
+    async for chunk in stream:
+        if chunk.usage:
+            total_tokens = chunk.usage.total_tokens
+        if chunk.choices and chunk.choices[0].delta.content:
+            text = chunk.choices[0].delta.content
+            chunks.append(text)
+            await notify(delta_callback, text)
+
+    return "".join(chunks), total_tokens
@@ -1,12 +1,14 @@
 import os
 import json
 import asyncio
-import aiohttp
 from typing import Optional
 
 from ...domain.ports.image_generator import ImageGeneratorPort
 from ...domain.entities.image_request import ImageRequest
 from ...domain.entities.image_response import ImageResponse
+from .lazy_module import lazy_module
+
+aiohttp = lazy_module("aiohttp")
 
 
 class ReplicateImageClient(ImageGeneratorPort):
@@ -92,9 +94,18 @@ class ReplicateImageClient(ImageGeneratorPort):
                         # Asegurar que el directorio existe
                         os.makedirs(os.path.dirname(file_path), exist_ok=True)
                         
-                        with open(file_path, 'wb') as f:
-                            async for chunk in response.content.iter_chunked(8192):
-                                f.write(chunk)
+                        # Escribir aparte y reemplazar: el destino puede ser un enlace
+                        # duro a una imagen cacheada que no se debe sobrescribir
+                        tmp_path = f"{file_path}.part"
+                        try:
+                            with open(tmp_path, 'wb') as f:
+                                async for chunk in response.content.iter_chunked(8192):
+                                    f.write(chunk)
+                            os.replace(tmp_path, file_path)
+                        finally:
+                            # Descarga cortada a medias: no dejar el .part atrás
+                            if os.path.exists(tmp_path):
+                                os.unlink(tmp_path)
                         
                         print(f"Imagen descargada: {file_path}")
                         return True
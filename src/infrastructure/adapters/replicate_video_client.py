@@ -1,15 +1,18 @@
 import os
 import json
 import asyncio
-import aiohttp
 import subprocess
 from typing import Optional
-import tempfile
 
 from ...domain.ports.video_generator import VideoGeneratorPort
 from ...domain.entities.video_request import VideoRequest
 from ...domain.entities.video_response import VideoResponse
 from .subtitle_animator import SubtitleAnimator
+from .video_streaming_packager import VideoStreamingPackager
+from .artifact_store import ArtifactStore
+from .lazy_module import lazy_module
+
+aiohttp = lazy_module("aiohttp")
 
 
 class ReplicateVideoClient(VideoGeneratorPort):
@@ -22,6 +25,8 @@ class ReplicateVideoClient(VideoGeneratorPort):
         self.base_url = "https://api.replicate.com/v1"
         self.model = "wan-video/wan-2.2-i2v-fast"  # WAN Image-to-Video model
         self.subtitle_animator = SubtitleAnimator()
+        self.streaming_packager = VideoStreamingPackager()
+        self.scratch = ArtifactStore.shared().scratch
         
     async def generate_video(self, request: VideoRequest) -> VideoResponse:
         """
@@ -168,9 +173,17 @@ class ReplicateVideoClient(VideoGeneratorPort):
                         # Asegurar que el directorio existe
                         os.makedirs(os.path.dirname(file_path), exist_ok=True)
                         
-                        with open(file_path, 'wb') as f:
-                            async for chunk in response.content.iter_chunked(8192):
-                                f.write(chunk)
+                        # Escribir aparte y reemplazar: el destino puede ser un enlace a un blob compartido
+                        tmp_path = f"{file_path}.part"
+                        try:
+                            with open(tmp_path, 'wb') as f:
+                                async for chunk in response.content.iter_chunked(8192):
+                                    f.write(chunk)
+                            os.replace(tmp_path, file_path)
+                        finally:
+                            # Descarga cortada a medias: no dejar el .part atrás
+                            if os.path.exists(tmp_path):
+                                os.unlink(tmp_path)
                         
                         print(f"Video descargado: {file_path}")
                         return True
@@ -206,9 +219,9 @@ class ReplicateVideoClient(VideoGeneratorPort):
             # Calcular cuántas veces necesitamos repetir el video
             loops_needed = int(target_duration / original_duration) + 1
             
-            # Crear archivo temporal con lista de videos para concatenar
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False, encoding='utf-8') as f:
-                concat_file = f.name
+            # Crear archivo temporal con lista de videos para concatenar (en uso hasta el finally)
+            concat_file = self.scratch.track(os.path.abspath(self.scratch.new_path(suffix='.txt', prefix='concat_')))
+            with open(concat_file, 'w', encoding='utf-8') as f:
                 # Usar path absoluto y escapar comillas
                 abs_input_path = os.path.abspath(input_path).replace('\\', '/')
                 for _ in range(loops_needed):
@@ -246,12 +259,18 @@ class ReplicateVideoClient(VideoGeneratorPort):
                     
             finally:
                 # Limpiar archivo temporal
-                os.unlink(concat_file)
+                self.scratch.discard(concat_file)
                 
         except Exception as e:
             print(f"Error procesando video: {str(e)}")
             return False
     
+    def prepare_for_streaming(self, video_path: str) -> bool:
+        """
+        Faststart y, si está activado, variantes HLS/fMP4 del video final
+        """
+        return self.streaming_packager.prepare(video_path)
+    
     def get_audio_duration(self, audio_path: str) -> Optional[float]:
         """
         Obtiene la duración de un archivo de audio usando FFmpeg
@@ -290,38 +309,34 @@ class ReplicateVideoClient(VideoGeneratorPort):
         Crea un bucle del video con subtítulos animados tipo karaoke
         """
         try:
-            # Primero crear el bucle básico
-            temp_looped_path = output_path.replace('.mp4', '_temp_loop.mp4')
-            
-            loop_success = self.loop_video_to_duration(input_path, temp_looped_path, target_duration)
-            if not loop_success:
-                return False
-            
-            print("Añadiendo subtítulos animados...")
-            
-            # Luego añadir subtítulos al bucle con configuración personalizada
-            subtitle_success = self.subtitle_animator.add_subtitles_to_video(
-                temp_looped_path,
-                output_path,
-                lyrics,
-                target_duration,
-                audio_path,
-                subtitle_config
-            )
-            
-            # Limpiar archivo temporal
-            if os.path.exists(temp_looped_path):
-                os.unlink(temp_looped_path)
-            
-            if subtitle_success:
-                print(f"Video con subtítulos creado: {output_path}")
-                return True
-            else:
-                print("Error añadiendo subtítulos, usando video sin subtítulos")
-                # Si falla, al menos conservar el bucle sin subtítulos
-                if os.path.exists(temp_looped_path):
-                    os.rename(temp_looped_path, output_path)
-                return True
+            # El bucle intermedio vive en el área scratch y se borra siempre al salir
+            with self.scratch.scratch_file(suffix='.mp4', prefix='loop_') as temp_looped_path:
+                # Primero crear el bucle básico
+                loop_success = self.loop_video_to_duration(input_path, temp_looped_path, target_duration)
+                if not loop_success:
+                    return False
+                
+                print("Añadiendo subtítulos animados...")
+                
+                # Luego añadir subtítulos al bucle con configuración personalizada
+                subtitle_success = self.subtitle_animator.add_subtitles_to_video(
+                    temp_looped_path,
+                    output_path,
+                    lyrics,
+                    target_duration,
+                    audio_path,
+                    subtitle_config
+                )
+                
+                if subtitle_success:
+                    print(f"Video con subtítulos creado: {output_path}")
+                    return True
+                else:
+                    print("Error añadiendo subtítulos, usando video sin subtítulos")
+                    # Si falla, al menos conservar el bucle sin subtítulos
+                    if os.path.exists(temp_looped_path):
+                        os.replace(temp_looped_path, output_path)
+                    return True
                 
         except Exception as e:
             print(f"Error en loop_video_with_subtitles: {str(e)}")
@@ -0,0 +1,103 @@
+import re
+from typing import Iterable, List, Tuple
+
+from ...domain.entities.generation_session import GenerationSession
+from ..persistence.sqlite_pool import get_pool
+
+
+# Section tags like [Verse 1] / [Chorus] carry no search value
+_SECTION_TAG_RE = re.compile(r'\[[^\]]*\]')
+_TERM_RE = re.compile(r'\w+', re.UNICODE)
+
+
+class SessionSearchIndex:
+    """
+    SQLite FTS5 index over session title, style and lyrics.
+
+    Kept up to date by LocalFileStorage.save_metadata; queries are ranked with
+    BM25 (title weighs most, then style, then lyrics) and every term is matched
+    as a prefix, so "amo verd" finds "Amor de verano".
+    """
+
+    TITLE_WEIGHT = 10.0
+    STYLE_WEIGHT = 4.0
+    LYRICS_WEIGHT = 1.0
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.pool = get_pool(db_path)
+        self._init_database()
+
+    def _init_database(self):
+        with self.pool.connection() as conn:
+            conn.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS sessions_fts USING fts5(
+                    session_id UNINDEXED,
+                    title,
+                    style,
+                    lyrics,
+                    tokenize = 'unicode61 remove_diacritics 2',
+                    prefix = '2 3'
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS index_meta (
+                    key TEXT PRIMARY KEY,
+                    value TEXT
+                )
+            """)
+
+    def is_built(self) -> bool:
+        """Whether the index has been populated from the existing sessions at least once"""
+        with self.pool.connection() as conn:
+            return conn.execute("SELECT 1 FROM index_meta WHERE key = 'built'").fetchone() is not None
+
+    def index_session(self, session: GenerationSession):
+        lyrics = _SECTION_TAG_RE.sub(' ', session.request.prompt or '')
+        with self.pool.connection() as conn:
+            conn.execute("DELETE FROM sessions_fts WHERE session_id = ?", (session.session_id,))
+            conn.execute(
+                "INSERT INTO sessions_fts (session_id, title, style, lyrics) VALUES (?, ?, ?, ?)",
+                (session.session_id, session.request.title or '', session.request.style or '', lyrics)
+            )
+
+    def remove_session(self, session_id: str):
+        with self.pool.connection() as conn:
+            conn.execute("DELETE FROM sessions_fts WHERE session_id = ?", (session_id,))
+
+    def rebuild(self, sessions: Iterable[GenerationSession]):
+        with self.pool.connection() as conn:
+            conn.execute("DELETE FROM sessions_fts")
+            conn.executemany(
+                "INSERT INTO sessions_fts (session_id, title, style, lyrics) VALUES (?, ?, ?, ?)",
+                [
+                    (s.session_id, s.request.title or '', s.request.style or '',
+                     _SECTION_TAG_RE.sub(' ', s.request.prompt or ''))
+                    for s in sessions
+                ]
+            )
+            conn.execute("INSERT OR REPLACE INTO index_meta (key, value) VALUES ('built', '1')")
+
+    @staticmethod
+    def build_query(text: str) -> str:
+        """Turn free text into an FTS5 query: every term must match as a prefix"""
+        terms = _TERM_RE.findall(text.lower())
+        return ' '.join(f'"{term}"*' for term in terms)
+
+    def search(self, text: str, limit: int = 50) -> List[Tuple[str, float]]:
+        """Return (session_id, score) pairs, best match first (higher score is better)"""
+        query = self.build_query(text)
+        if not query:
+            return []
+
+        with self.pool.connection() as conn:
+            rows = conn.execute("""
+                SELECT session_id, bm25(sessions_fts, 0.0, ?, ?, ?) AS rank
+                FROM sessions_fts
+                WHERE sessions_fts MATCH ?
+                ORDER BY rank
+                LIMIT ?
+            """, (self.TITLE_WEIGHT, self.STYLE_WEIGHT, self.LYRICS_WEIGHT, query, limit)).fetchall()
+
+        # bm25() is lower-is-better; expose it as a positive relevance score
+        return [(row["session_id"], -row["rank"]) for row in rows]
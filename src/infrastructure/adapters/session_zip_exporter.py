@@ -0,0 +1,150 @@
+import json
+import os
+import subprocess
+import time
+import zipfile
+from typing import Iterable, Iterator, List, Optional
+
+from .srt_subtitle_generator import SRTSubtitleGenerator
+
+
+# Qué archivos de la sesión se exportan
+_EXPORT_EXTENSIONS = {'.mp3', '.wav', '.ogg', '.m4a', '.png', '.jpg', '.jpeg', '.mp4', '.json', '.srt'}
+# Formatos ya comprimidos: se guardan sin volver a comprimir
+_STORED_EXTENSIONS = {'.mp3', '.ogg', '.m4a', '.png', '.jpg', '.jpeg', '.mp4'}
+# Intermedios y variantes HLS no forman parte de la exportación
+_SKIPPED_MARKERS = ('_hls', '_tmp', '_temp')
+
+
+class _ZipStream:
+    """Write-only, unseekable sink: zipfile writes into it and we drain it between chunks"""
+
+    def __init__(self):
+        self._buffer = bytearray()
+
+    def write(self, data) -> int:
+        self._buffer += data
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+
+class SessionZipExporter:
+    """
+    Genera un ZIP de una o varias sesiones al vuelo.
+
+    El archivo nunca se escribe a disco: zipfile escribe sobre un buffer no
+    seekable (usa data descriptors) que se vacía tras cada bloque, así que la
+    memoria usada es constante sea cual sea el número de sesiones.
+    """
+
+    def __init__(self, base_output_dir: str, chunk_size: int = 256 * 1024):
+        self.base_output_dir = base_output_dir
+        self.chunk_size = chunk_size
+        self.srt_generator = SRTSubtitleGenerator()
+
+    def session_path(self, session_id: str) -> Optional[str]:
+        """Session directory, or None if it doesn't exist or escapes the output directory"""
+        base = os.path.realpath(self.base_output_dir)
+        path = os.path.realpath(os.path.join(base, session_id))
+        if os.path.dirname(path) != base or not os.path.isdir(path) or session_id.startswith('.'):
+            return None
+        return path
+
+    def existing_sessions(self, session_ids: Iterable[str]) -> List[str]:
+        return [sid for sid in dict.fromkeys(session_ids) if self.session_path(sid)]
+
+    def _export_files(self, session_path: str) -> List[str]:
+        files = []
+        for name in sorted(os.listdir(session_path)):
+            root, ext = os.path.splitext(name)
+            if ext.lower() not in _EXPORT_EXTENSIONS:
+                continue
+            if any(marker in root for marker in _SKIPPED_MARKERS):
+                continue
+            path = os.path.join(session_path, name)
+            if os.path.isfile(path):
+                files.append(path)
+        return files
+
+    def _probe_duration(self, path: str) -> Optional[float]:
+        try:
+            result = subprocess.run(
+                ['ffprobe', '-v', 'quiet', '-print_format', 'json', '-show_format', path],
+                capture_output=True, text=True, timeout=30
+            )
+            if result.returncode == 0:
+                return float(json.loads(result.stdout)['format']['duration'])
+        except Exception:
+            pass
+        return None
+
+    def _build_srt(self, session_path: str, files: List[str]) -> Optional[str]:
+        """SRT with the session lyrics spread over the song duration"""
+        try:
+            with open(os.path.join(session_path, "metadata.json"), 'r', encoding='utf-8') as f:
+                lyrics = json.load(f).get("request", {}).get("prompt", "")
+        except Exception:
+            return None
+        if not lyrics or not lyrics.strip():
+            return None
+
+        media = [p for p in files if p.lower().endswith(('.mp3', '.wav', '.ogg', '.m4a'))]
+        media += [p for p in files if p.lower().endswith('_cover_video.mp4')]
+        duration = next((d for d in map(self._probe_duration, media[:2]) if d), None) or 180
+        return self.srt_generator.build_srt(lyrics, duration) or None
+
+    def _write_file(self, archive: zipfile.ZipFile, stream: _ZipStream, path: str, arcname: str
+                    ) -> Iterator[bytes]:
+        info = zipfile.ZipInfo.from_file(path, arcname)
+        ext = os.path.splitext(path)[1].lower()
+        info.compress_type = zipfile.ZIP_STORED if ext in _STORED_EXTENSIONS else zipfile.ZIP_DEFLATED
+        size = os.path.getsize(path)
+
+        with open(path, 'rb') as src, archive.open(info, 'w', force_zip64=size > zipfile.ZIP64_LIMIT // 2) as dest:
+            while True:
+                chunk = src.read(self.chunk_size)
+                if not chunk:
+                    break
+                dest.write(chunk)
+                yield stream.drain()
+        yield stream.drain()
+
+    def iter_zip(self, session_ids: Iterable[str]) -> Iterator[bytes]:
+        """Yield the ZIP archive of the given sessions, chunk by chunk"""
+        for chunk in self._iter_zip(session_ids):
+            if chunk:
+                yield chunk
+
+    def _iter_zip(self, session_ids: Iterable[str]) -> Iterator[bytes]:
+        stream = _ZipStream()
+        with zipfile.ZipFile(stream, 'w', allowZip64=True) as archive:
+            for session_id in self.existing_sessions(session_ids):
+                session_path = self.session_path(session_id)
+                try:
+                    files = self._export_files(session_path)
+                    for path in files:
+                        arcname = f"{session_id}/{os.path.basename(path)}"
+                        yield from self._write_file(archive, stream, path, arcname)
+
+                    # Subtítulos generados a partir de las letras si la sesión no tiene .srt
+                    if not any(p.lower().endswith('.srt') for p in files):
+                        srt = self._build_srt(session_path, files)
+                        if srt:
+                            info = zipfile.ZipInfo(f"{session_id}/{session_id}.srt",
+                                                   date_time=time.localtime()[:6])
+                            info.compress_type = zipfile.ZIP_DEFLATED
+                            archive.writestr(info, srt.encode('utf-8-sig'))
+                            yield stream.drain()
+                except Exception as e:
+                    # A mitad de la descarga ya no se puede devolver un error HTTP: se omite la sesión
+                    print(f"Error exportando sesión {session_id}: {str(e)}")
+
+        # Central directory
+        yield stream.drain()
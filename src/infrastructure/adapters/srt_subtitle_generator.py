@@ -1,9 +1,10 @@
 import os
 import re
-import tempfile
 import subprocess
 from typing import List, Tuple
 from datetime import timedelta
+from .lyrics_processor import parse_lyrics
+from .artifact_store import scratch_area
 
 
 class SRTSubtitleGenerator:
@@ -16,6 +17,7 @@ class SRTSubtitleGenerator:
         """
         Crea un video con subtítulos SRT incrustados (hardcoded)
         """
+        srt_file = None
         try:
             print("Generando subtítulos en formato SRT...")
 
@@ -32,55 +34,21 @@ class SRTSubtitleGenerator:
                 return self._copy_with_audio(video_path, output_path, audio_path)
 
             # Aplicar subtítulos con FFmpeg usando método simple
-            success = self._apply_srt_subtitles(video_path, output_path, srt_file, audio_path)
-
-            # Limpiar archivo temporal
-            try:
-                os.remove(srt_file)
-            except:
-                pass
-
-            return success
+            return self._apply_srt_subtitles(video_path, output_path, srt_file, audio_path)
 
         except Exception as e:
             print(f"Error en SRT generator: {str(e)}")
             return self._copy_with_audio(video_path, output_path, audio_path)
+        finally:
+            # Limpiar archivo temporal
+            if srt_file:
+                scratch_area().discard(srt_file)
 
     def _prepare_lyrics(self, lyrics: str) -> List[str]:
         """
         Prepara las letras limpiando y dividiendo en líneas
         """
-        # Limpiar el texto
-        clean_lyrics = re.sub(r'\[.*?\]', '', lyrics)  # Remover etiquetas
-        clean_lyrics = re.sub(r'\n+', '\n', clean_lyrics).strip()
-
-        if not clean_lyrics:
-            return []
-
-        # Dividir en líneas
-        lines = [line.strip() for line in clean_lyrics.split('\n') if line.strip()]
-
-        # Procesar líneas largas
-        processed = []
-        for line in lines:
-            # Limpiar caracteres problemáticos
-            line = self._clean_text(line)
-            if len(line) > 60:
-                words = line.split()
-                current = ""
-                for word in words:
-                    if len(current + " " + word) <= 60:
-                        current += (" " + word) if current else word
-                    else:
-                        if current:
-                            processed.append(current)
-                        current = word
-                if current:
-                    processed.append(current)
-            else:
-                processed.append(line)
-
-        return processed[:30]  # Máximo 30 líneas
+        return parse_lyrics(lyrics).display_lines(60, 30, clean=self._clean_text)
 
     def _clean_text(self, text: str) -> str:
         """
@@ -97,39 +65,45 @@ class SRTSubtitleGenerator:
         text = re.sub(r'[^\w\s\-.,!?áéíóúñÁÉÍÓÚÑ]', '', text)
         return text.strip()
 
-    def _create_srt_file(self, lines: List[str], duration: float) -> str:
+    def build_srt(self, lyrics: str, duration: float) -> str:
         """
-        Crea un archivo SRT con los subtítulos
+        Devuelve el contenido SRT de las letras repartidas a lo largo de la duración
         """
-        try:
-            # Crear archivo temporal
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.srt', delete=False,
-                                           encoding='utf-8-sig') as f:  # UTF-8 con BOM
-                srt_path = f.name
+        return self._srt_text(self._prepare_lyrics(lyrics), duration)
 
-                time_per_line = duration / len(lines) if lines and duration > 0 else 3
+    def _srt_text(self, lines: List[str], duration: float) -> str:
+        time_per_line = duration / len(lines) if lines and duration > 0 else 3
 
-                for i, line in enumerate(lines):
-                    # Número de subtítulo
-                    f.write(f"{i + 1}\n")
+        blocks = []
+        for i, line in enumerate(lines):
+            # Tiempos
+            start_time = i * time_per_line
+            end_time = min((i + 1) * time_per_line, duration)
 
-                    # Tiempos
-                    start_time = i * time_per_line
-                    end_time = min((i + 1) * time_per_line, duration)
+            start_str = self._seconds_to_srt_time(start_time)
+            end_str = self._seconds_to_srt_time(end_time)
 
-                    start_str = self._seconds_to_srt_time(start_time)
-                    end_str = self._seconds_to_srt_time(end_time)
+            # Número, tiempos y texto (con formato simple para visibilidad)
+            blocks.append(f"{i + 1}\n{start_str} --> {end_str}\n{line}\n\n")
 
-                    f.write(f"{start_str} --> {end_str}\n")
+        return ''.join(blocks)
 
-                    # Texto (con formato simple para visibilidad)
-                    f.write(f"{line}\n\n")
+    def _create_srt_file(self, lines: List[str], duration: float) -> str:
+        """
+        Crea un archivo SRT con los subtítulos (en uso en el área scratch hasta que se descarte)
+        """
+        scratch = scratch_area()
+        srt_path = scratch.track(scratch.new_path(suffix='.srt', prefix='subs_'))
+        try:
+            with open(srt_path, 'w', encoding='utf-8-sig') as f:  # UTF-8 con BOM
+                f.write(self._srt_text(lines, duration))
 
-                print(f"Archivo SRT creado: {srt_path}")
-                return srt_path
+            print(f"Archivo SRT creado: {srt_path}")
+            return srt_path
 
         except Exception as e:
             print(f"Error creando SRT: {str(e)}")
+            scratch.discard(srt_path)
             return None
 
     def _seconds_to_srt_time(self, seconds: float) -> str:
@@ -0,0 +1,237 @@
+import os
+import shutil
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from ..config.settings import StorageQuotaSettings
+from .artifact_store import ArtifactStore
+
+
+# Intermedios regenerables, en orden de desalojo: descargas a medias, escalera
+# HLS (se reconstruye desde el video final) y animación original (se vuelve a
+# generar; sin ella no se puede rehacer el bucle sin pagar otra predicción)
+EVICTION_ORDER = ("partial", "preview", "original")
+
+
+def classify(filename: str) -> str:
+    if filename.endswith((".part", ".tmp")):
+        return "partial"
+    if "_hls" in filename:
+        return "preview"
+    if filename.endswith("_animation_original.mp4"):
+        return "original"
+    return "final"
+
+
+class StorageJanitor:
+    """
+    Disk usage of output/: per-user quotas and a free-space guard.
+
+    Only regenerable intermediates are ever evicted (see ``EVICTION_ORDER``),
+    least recently used session first; audio, covers, final videos and
+    metadata are never touched. Evicted files are usually hard links into the
+    ArtifactStore, so the space comes back when ``collect_garbage`` drops the
+    blob. ``extra_evictors`` lets shared caches (image cache...) give space
+    back when the disk is almost full.
+    """
+
+    def __init__(
+        self,
+        output_root: str = "output",
+        settings: Optional[StorageQuotaSettings] = None,
+        artifact_store: Optional[ArtifactStore] = None,
+        extra_evictors: Optional[List[Callable[[int], int]]] = None
+    ):
+        self.output_root = output_root
+        self.settings = settings or StorageQuotaSettings.from_env()
+        self.artifact_store = artifact_store or ArtifactStore.shared()
+        self.extra_evictors = extra_evictors or []
+        self.partial_max_age = self.artifact_store.settings.scratch_max_age_hours * 3600
+
+    @property
+    def quota_bytes(self) -> int:
+        return int(self.settings.user_quota_mb * 1024 * 1024)
+
+    def user_dir(self, user_id) -> str:
+        return os.path.join(self.output_root, f"user_{user_id}")
+
+    def _user_dirs(self) -> List[str]:
+        if not os.path.isdir(self.output_root):
+            return []
+        return [
+            entry.path for entry in os.scandir(self.output_root)
+            if entry.is_dir() and entry.name.startswith("user_")
+        ]
+
+    def _scan(self, root: str) -> List[Tuple[str, str, str, os.stat_result]]:
+        """(session, category, path, stat) of every file of a user directory"""
+        files = []
+        if not os.path.isdir(root):
+            return files
+        for session in os.scandir(root):
+            if session.name.startswith(".") or not session.is_dir():
+                continue
+            for folder, dirs, names in os.walk(session.path):
+                dirs[:] = [d for d in dirs if not d.startswith(".")]
+                for name in names:
+                    path = os.path.join(folder, name)
+                    try:
+                        st = os.lstat(path)
+                    except OSError:
+                        continue
+                    files.append((session.name, classify(name), path, st))
+        return files
+
+    def usage(self, user_id) -> Dict:
+        """Per-category usage of one user (bytes as seen by the user, shared blobs included)"""
+        files = self._scan(self.user_dir(user_id))
+        by_category: Dict[str, int] = defaultdict(int)
+        shared = 0
+        for _, category, _, st in files:
+            by_category[category] += st.st_size
+            if st.st_nlink > 1:
+                shared += st.st_size
+        total = sum(by_category.values())
+        quota = self.quota_bytes
+        return {
+            "bytes": total,
+            "files": len(files),
+            "sessions": len({session for session, _, _, _ in files}),
+            "by_category": dict(by_category),
+            "evictable_bytes": sum(by_category.get(c, 0) for c in EVICTION_ORDER),
+            "deduplicated_bytes": shared,
+            "quota_bytes": quota or None,
+            "over_quota": bool(quota) and total > quota
+        }
+
+    def _eviction_groups(self, roots: List[str]) -> List[Tuple[int, float, List[Tuple[str, int, int]]]]:
+        """
+        Evictable units sorted by (category order, last use). A session's HLS
+        files go together: half a ladder would leave a broken master playlist.
+        """
+        groups: Dict[Tuple[str, str, str], List] = defaultdict(list)
+        last_used: Dict[Tuple[str, str, str], float] = defaultdict(float)
+        partial_cutoff = time.time() - self.partial_max_age
+        for root in roots:
+            for session, category, path, st in self._scan(root):
+                if category not in EVICTION_ORDER:
+                    continue
+                # Una descarga en curso también es .part: solo las abandonadas
+                if category == "partial" and st.st_mtime >= partial_cutoff:
+                    continue
+                key = (root, session, category)
+                groups[key].append((path, st.st_size, st.st_nlink))
+                last_used[key] = max(last_used[key], st.st_atime, st.st_mtime)
+
+        ordered = [
+            (EVICTION_ORDER.index(key[2]), last_used[key], files)
+            for key, files in groups.items()
+        ]
+        ordered.sort(key=lambda group: (group[0], group[1]))
+        return ordered
+
+    @staticmethod
+    def _remove_group(files: List[Tuple[str, int, int]]) -> Tuple[int, int]:
+        """Returns (bytes removed from the user's view, bytes likely freed on disk)"""
+        removed = freed = 0
+        # El master primero para que nadie lo sirva apuntando a variantes borradas
+        for path, size, nlink in sorted(files, key=lambda f: not f[0].endswith(".m3u8")):
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            removed += size
+            # Con un único enlace más (el blob) el espacio vuelve tras collect_garbage
+            if nlink <= 2:
+                freed += size
+        return removed, freed
+
+    def enforce_quota(self, user_id) -> Dict:
+        """Evict the user's regenerable intermediates until they fit in the quota"""
+        usage = self.usage(user_id)
+        quota = self.quota_bytes
+        if not quota or usage["bytes"] <= quota:
+            return usage
+
+        excess = usage["bytes"] - quota
+        evicted = 0
+        for _, _, files in self._eviction_groups([self.user_dir(user_id)]):
+            if evicted >= excess:
+                break
+            removed, _ = self._remove_group(files)
+            evicted += removed
+        print(f"Cuota de almacenamiento user_{user_id}: {evicted / 1024 / 1024:.1f} MB desalojados")
+        return self.usage(user_id)
+
+    def disk_usage(self) -> Dict:
+        os.makedirs(self.output_root, exist_ok=True)
+        disk = shutil.disk_usage(self.output_root)
+        return {
+            "total_bytes": disk.total,
+            "free_bytes": disk.free,
+            "min_free_bytes": int(self.settings.min_free_mb * 1024 * 1024)
+        }
+
+    def ensure_free_space(self) -> int:
+        """Evict across all users (and shared caches) while the disk is below min_free. Returns bytes freed"""
+        disk = self.disk_usage()
+        needed = disk["min_free_bytes"] - disk["free_bytes"]
+        if needed <= 0:
+            return 0
+
+        freed = 0
+        for _, _, files in self._eviction_groups(self._user_dirs()):
+            if freed >= needed:
+                break
+            freed += self._remove_group(files)[1]
+        for evictor in self.extra_evictors:
+            if freed >= needed:
+                break
+            try:
+                freed += evictor(needed - freed)
+            except Exception as e:
+                print(f"Error liberando caché: {str(e)}")
+        print(f"Espacio en disco bajo: {freed / 1024 / 1024:.1f} MB liberados")
+        return freed
+
+    def sweep_partials(self) -> int:
+        """Delete downloads abandoned halfway (.part/.tmp older than the scratch max age)"""
+        removed = 0
+        for order, _, files in self._eviction_groups(self._user_dirs()):
+            if EVICTION_ORDER[order] == "partial":
+                removed += self._remove_group(files)[0]
+        return removed
+
+    def run_once(self) -> Dict:
+        """Full pass: temp files, quotas, free-space guard and blob GC"""
+        report = {}
+        report["scratch_entries"], report["scratch_bytes"] = self.artifact_store.sweep_scratch()
+        report["partial_bytes"] = self.sweep_partials()
+
+        over_quota = []
+        if self.quota_bytes:
+            for root in self._user_dirs():
+                user_id = os.path.basename(root)[len("user_"):]
+                if self.enforce_quota(user_id)["over_quota"]:
+                    over_quota.append(user_id)
+        report["over_quota_users"] = over_quota
+        report["evicted_for_disk_bytes"] = self.ensure_free_space()
+
+        # Después de desalojar: los blobs que ya nadie enlaza se liberan ahora
+        report["blobs"], report["blob_bytes"] = self.artifact_store.collect_garbage()
+        return report
+
+    def report(self, user_id, include_system: bool = False) -> Dict:
+        """Data for /api/storage"""
+        data = {
+            "user": self.usage(user_id),
+            "disk": self.disk_usage()
+        }
+        if include_system:
+            data["artifact_store"] = self.artifact_store.usage()
+            data["users"] = {
+                os.path.basename(root): self.usage(os.path.basename(root)[len("user_"):])["bytes"]
+                for root in self._user_dirs()
+            }
+        return data
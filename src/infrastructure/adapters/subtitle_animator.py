@@ -1,10 +1,11 @@
 import os
 import subprocess
-import tempfile
 import json
 import re
 from typing import List, Dict, Tuple
 import math
+from .lyrics_processor import parse_lyrics, split_words, word_durations
+from .artifact_store import scratch_area
 
 
 class SubtitleAnimator:
@@ -51,50 +52,23 @@ class SubtitleAnimator:
         """
         Prepara las letras dividiéndolas en líneas apropiadas
         """
-        # Limpiar el texto
-        clean_lyrics = re.sub(r'\[.*?\]', '', lyrics)  # Remover etiquetas como [Verse], [Chorus]
-        clean_lyrics = re.sub(r'\n+', '\n', clean_lyrics)  # Normalizar saltos de línea
-        clean_lyrics = clean_lyrics.strip()
-        
-        if not clean_lyrics:
-            return []
-        
-        # Dividir en líneas y filtrar vacías
-        lines = [line.strip() for line in clean_lyrics.split('\n') if line.strip()]
-        
-        # Limitar líneas muy largas
-        processed_lines = []
-        for line in lines:
-            if len(line) > 60:  # Si la línea es muy larga, dividirla
-                words = line.split()
-                current_line = ""
-                for word in words:
-                    if len(current_line + " " + word) <= 60:
-                        current_line += (" " + word) if current_line else word
-                    else:
-                        if current_line:
-                            processed_lines.append(current_line)
-                        current_line = word
-                if current_line:
-                    processed_lines.append(current_line)
-            else:
-                processed_lines.append(line)
-        
-        return processed_lines[:20]  # Máximo 20 líneas para evitar sobrecarga
-    
+        return parse_lyrics(lyrics).display_lines(60, 20)
+
     def _create_ass_subtitle_file(self, lyrics: str, duration: float) -> str:
         """
         Crea un archivo ASS con subtítulos animados tipo karaoke
+        (en uso en el área scratch hasta que se descarte con scratch_area().discard)
         """
+        ass_file_path = None
         try:
             lines = self._prepare_lyrics(lyrics)
             if not lines:
                 return None
 
             # Crear archivo temporal ASS
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.ass', delete=False, encoding='utf-8') as f:
-                ass_file_path = f.name
-
+            scratch = scratch_area()
+            ass_file_path = scratch.track(scratch.new_path(suffix='.ass', prefix='subs_'))
+            with open(ass_file_path, 'w', encoding='utf-8') as f:
                 # Escribir header mejorado con estilos karaoke
                 f.write(self._get_enhanced_ass_header())
 
@@ -113,6 +87,8 @@ class SubtitleAnimator:
 
         except Exception as e:
             print(f"Error creando archivo ASS: {str(e)}")
+            if ass_file_path:
+                scratch_area().discard(ass_file_path)
             return None
 
     def _get_enhanced_ass_header(self) -> str:
@@ -149,13 +125,12 @@ Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
         # Calcular duración de la línea en centésimas
         line_duration = (end_time - start_time) * 100
 
-        # Dividir texto en sílabas/palabras para efecto karaoke
-        words = clean_text.split()
+        # Dividir texto en palabras; cada una dura según sus sílabas estimadas
+        words = split_words(clean_text)
         if not words:
             return ""
 
         karaoke_text = ""
-        time_per_word = line_duration / len(words) if words else line_duration
 
         # Crear efectos de transformación y karaoke
         # Movimiento vertical (pos) y cambio de color progresivo
@@ -172,9 +147,9 @@ Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
         effects.append(r"{\move(640," + str(y_base) + ",640," + str(y_base - y_offset) + ")}")
 
         # Efectos de karaoke por palabra
-        for word in words:
+        for word, word_duration in zip(words, word_durations(words, line_duration)):
             # K-timing para efecto karaoke (relleno progresivo)
-            karaoke_text += r"{\k" + str(int(time_per_word)) + "}" + word + " "
+            karaoke_text += r"{\k" + str(int(word_duration)) + "}" + word.text + " "
 
         # Combinar efectos
         full_text = "".join(effects) + karaoke_text.strip()
@@ -189,7 +164,6 @@ Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
         Limpia texto para uso en archivos ASS
         """
         # Eliminar caracteres problemáticos pero mantener legibilidad
-        import re
         text = re.sub(r'\[.*?\]', '', text)  # Quitar etiquetas
         text = text.replace('\\', '')
         text = text.replace('{', '')
@@ -201,11 +175,12 @@ Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
     def _create_animated_subtitle_file(self, lines: List[str], duration: float) -> str:
         """
         Crea un archivo ASS con subtítulos animados tipo karaoke
+        (en uso en el área scratch hasta que se descarte con scratch_area().discard)
         """
         # Crear archivo temporal ASS
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.ass', delete=False, encoding='utf-8') as f:
-            ass_file_path = f.name
-            
+        scratch = scratch_area()
+        ass_file_path = scratch.track(scratch.new_path(suffix='.ass', prefix='subs_'))
+        with open(ass_file_path, 'w', encoding='utf-8') as f:
             # Escribir header del archivo ASS
             f.write(self._get_ass_header())
             
@@ -254,16 +229,13 @@ Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
         line_duration = end_time - start_time
         
         # Dividir texto en palabras para efecto karaoke
-        words = text.split()
+        words = split_words(text)
         karaoke_text = ""
         
         if words:
-            time_per_word = line_duration / len(words)
-            
-            for i, word in enumerate(words):
-                word_start = i * time_per_word * 100  # ASS usa centésimas de segundo
-                # Efecto karaoke: \k{duration} hace que la palabra se "llene" gradualmente
-                karaoke_text += f"\\k{int(time_per_word * 100)}{word} "
+            for word, word_duration in zip(words, word_durations(words, line_duration)):
+                # Efecto karaoke: \k{duration} hace que la palabra se "llene" gradualmente (centésimas)
+                karaoke_text += f"\\k{int(word_duration * 100)}{word.text} "
         else:
             karaoke_text = f"\\k{int(line_duration * 100)}{text}"
         
@@ -340,6 +312,7 @@ Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
         """
         Intenta aplicar subtítulos usando ASS con subtítulos incrustados
         """
+        ass_file = None
         try:
             # Primero crear archivo de subtítulos ASS
             ass_file = self._create_ass_subtitle_file(lyrics, audio_duration)
@@ -391,11 +364,6 @@ Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
 
             if result.returncode == 0:
                 print(f"¡Subtítulos karaoke aplicados exitosamente!")
-                # Limpiar archivo temporal
-                try:
-                    os.remove(ass_file)
-                except:
-                    pass
                 return True
             else:
                 print(f"Error aplicando subtítulos ASS: {result.stderr[:500]}")
@@ -408,6 +376,10 @@ Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
         except Exception as e:
             print(f"Error intentando aplicar subtítulos: {str(e)}")
             return False
+        finally:
+            # Limpiar archivo temporal
+            if ass_file:
+                scratch_area().discard(ass_file)
 
     def _try_simple_drawtext(self, video_path: str, output_path: str, lyrics: str, audio_path: str = None, audio_duration: float = 0) -> bool:
         """
@@ -607,7 +579,6 @@ Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
         Limpia el texto para que funcione en Windows con FFmpeg
         """
         # Mantener solo caracteres seguros
-        import re
 
         # Eliminar etiquetas como [Verse], [Chorus]
         text = re.sub(r'\[.*?\]', '', text)
@@ -1,6 +1,4 @@
-import requests
 import asyncio
-import aiohttp
 from typing import Optional, List
 from datetime import datetime
 import json
@@ -10,6 +8,9 @@ from ...domain.ports.music_generator import MusicGeneratorPort
 from ...domain.entities.song_request import SongRequest
 from ...domain.entities.song_response import SongResponse, SongTrack
 from .usage_tracker import get_tracker, APIUsage
+from .lazy_module import lazy_module
+
+aiohttp = lazy_module("aiohttp")
 
 
 class SunoAPIClient(MusicGeneratorPort):
@@ -121,9 +122,17 @@ class SunoAPIClient(MusicGeneratorPort):
             async with aiohttp.ClientSession() as session:
                 async with session.get(audio_url) as response:
                     if response.status == 200:
-                        with open(output_path, 'wb') as f:
-                            async for chunk in response.content.iter_chunked(8192):
-                                f.write(chunk)
+                        # Escribir aparte y reemplazar: el destino puede ser un enlace a un blob compartido
+                        tmp_path = f"{output_path}.part"
+                        try:
+                            with open(tmp_path, 'wb') as f:
+                                async for chunk in response.content.iter_chunked(8192):
+                                    f.write(chunk)
+                            os.replace(tmp_path, output_path)
+                        finally:
+                            # Descarga cortada a medias: no dejar el .part atrás
+                            if os.path.exists(tmp_path):
+                                os.unlink(tmp_path)
                         return True
                     else:
                         return False
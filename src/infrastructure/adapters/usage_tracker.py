@@ -1,10 +1,22 @@
+import atexit
 import json
-import sqlite3
-from datetime import datetime
+import queue
+import threading
+import time
+import zlib
+from datetime import datetime, date, timedelta
 from typing import Dict, List, Any, Optional
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass
 from pathlib import Path
 
+from ..persistence.sqlite_pool import get_pool
+from ..config.settings import UsageRetentionSettings
+
+try:
+    import zstandard
+except ImportError:  # Optional: only needed for USAGE_PAYLOAD_COMPRESSION=zstd
+    zstandard = None
+
 
 @dataclass
 class APIUsage:
@@ -29,13 +41,51 @@ class APIUsage:
             self.response_data = {}
 
 
+# Marker put on the queue to ask the writer to commit what it has right away
+_FLUSH = object()
+
+# Failed batches are retried with exponential backoff before being dropped
+_WRITE_RETRIES = 3
+_RETRY_BACKOFF = 0.5
+
+# Readers wait at most this long for queued events; past that they read what is committed
+_READ_FLUSH_TIMEOUT = 0.5
+
+
 class UsageTracker:
-    def __init__(self, db_file: str = "usage_tracking.db"):
+    def __init__(self, db_file: str = "usage_tracking.db", async_writes: bool = True,
+                 max_queue_size: int = 10000, batch_size: int = 100,
+                 flush_interval: float = 2.0,
+                 retention: Optional[UsageRetentionSettings] = None):
         self.db_file = Path(db_file)
+        self.pool = get_pool(self.db_file)
+        self.retention = retention or UsageRetentionSettings()
         self._init_database()
 
+        # Usage events are queued and written in batches by a background thread,
+        # so API calls never wait on SQLite or on JSON-encoding their payloads.
+        self.async_writes = async_writes
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped_events = 0
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue_size)
+        self._writer: Optional[threading.Thread] = None
+        self._writer_lock = threading.Lock()
+        self._closed = False
+        if async_writes:
+            atexit.register(self.close)
+
+        # Periodic compaction of old payloads + VACUUM
+        self._stop_maintenance = threading.Event()
+        self._maintenance: Optional[threading.Thread] = None
+        if async_writes and self.retention.maintenance_interval_hours > 0:
+            self._maintenance = threading.Thread(
+                target=self._maintenance_loop, name="usage-tracker-maintenance", daemon=True
+            )
+            self._maintenance.start()
+
     def _init_database(self):
-        with sqlite3.connect(self.db_file) as conn:
+        with self.pool.connection() as conn:
             conn.execute("""
                 CREATE TABLE IF NOT EXISTS api_usage (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -55,15 +105,173 @@ class UsageTracker:
             conn.execute("CREATE INDEX IF NOT EXISTS idx_api_name ON api_usage(api_name)")
             conn.execute("CREATE INDEX IF NOT EXISTS idx_session_id ON api_usage(session_id)")
 
-    def track_usage(self, usage: APIUsage):
-        with sqlite3.connect(self.db_file) as conn:
+            # Numeric epoch column so time filters are plain range scans on an index
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(api_usage)")}
+            if "ts_epoch" not in columns:
+                conn.execute("ALTER TABLE api_usage ADD COLUMN ts_epoch REAL")
+                # Timestamps are naive local ISO strings: convert each row with the
+                # UTC offset in force at that moment, so rows across DST changes are right
+                rows = conn.execute("SELECT id, timestamp FROM api_usage").fetchall()
+                conn.executemany(
+                    "UPDATE api_usage SET ts_epoch = ? WHERE id = ?",
+                    [(self._to_epoch(row["timestamp"]), row["id"]) for row in rows]
+                )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_ts_epoch ON api_usage(ts_epoch)")
+
+            # Retention: old rows keep summarized payloads plus an optional compressed original
+            if "payload_compacted" not in columns:
+                conn.execute("ALTER TABLE api_usage ADD COLUMN payload_compacted INTEGER DEFAULT 0")
+                conn.execute("ALTER TABLE api_usage ADD COLUMN payload_codec TEXT")
+                conn.execute("ALTER TABLE api_usage ADD COLUMN payload_blob BLOB")
+
+            # Per-day / per-API rollups, maintained incrementally on every write
+            rollup_exists = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'api_usage_daily'"
+            ).fetchone()
             conn.execute("""
-                INSERT INTO api_usage (
-                    timestamp, api_name, endpoint, request_data, response_data,
-                    tokens_used, cost_usd, session_id, success, error_message
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
+                CREATE TABLE IF NOT EXISTS api_usage_daily (
+                    day TEXT NOT NULL,
+                    api_name TEXT NOT NULL,
+                    total_calls INTEGER NOT NULL DEFAULT 0,
+                    failed_calls INTEGER NOT NULL DEFAULT 0,
+                    total_cost REAL NOT NULL DEFAULT 0.0,
+                    total_tokens INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (day, api_name)
+                ) WITHOUT ROWID
+            """)
+            if not rollup_exists:
+                conn.execute("""
+                    INSERT INTO api_usage_daily (day, api_name, total_calls, failed_calls, total_cost, total_tokens)
+                    SELECT
+                        substr(timestamp, 1, 10),
+                        api_name,
+                        COUNT(*),
+                        COUNT(CASE WHEN success = 0 THEN 1 END),
+                        COALESCE(SUM(cost_usd), 0.0),
+                        COALESCE(SUM(tokens_used), 0)
+                    FROM api_usage
+                    GROUP BY substr(timestamp, 1, 10), api_name
+                """)
+
+    def track_usage(self, usage: APIUsage):
+        """Record an API call. Non-blocking unless async_writes is disabled."""
+        if not self.async_writes or self._closed:
+            self._write_batch([usage])
+            return
+
+        self._ensure_writer()
+        try:
+            self._queue.put_nowait(usage)
+        except queue.Full:
+            self.dropped_events += 1
+            print(f"[UsageTracker] Queue full, dropped usage event for {usage.api_name} "
+                  f"({self.dropped_events} dropped so far)")
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until every queued usage event has been written.
+        With a timeout, gives up after that many seconds and returns False.
+        """
+        if self._writer is None or not self._writer.is_alive():
+            return True
+        try:
+            self._queue.put(_FLUSH, timeout=timeout)
+        except queue.Full:
+            return False
+        if timeout is None:
+            self._queue.join()
+            return True
+
+        deadline = time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def close(self):
+        """Write what is still queued and stop the background writer"""
+        if self._closed:
+            return
+        self.flush()
+        self._closed = True
+        self._stop_maintenance.set()
+        if self._writer is not None and self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join(timeout=10)
+
+    def _ensure_writer(self):
+        if self._writer is not None and self._writer.is_alive():
+            return
+        with self._writer_lock:
+            if self._writer is None or not self._writer.is_alive():
+                self._writer = threading.Thread(
+                    target=self._writer_loop, name="usage-tracker-writer", daemon=True
+                )
+                self._writer.start()
+
+    def _writer_loop(self):
+        batch: List[APIUsage] = []
+        pending = 0  # queue items (events and markers) awaiting task_done
+        deadline = None
+        stop = False
+
+        while not stop:
+            timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+            try:
+                item = self._queue.get(timeout=timeout)
+                pending += 1
+            except queue.Empty:
+                item = _FLUSH
+
+            if item is None:
+                stop = True
+            elif item is not _FLUSH:
+                batch.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+                if len(batch) < self.batch_size:
+                    continue
+
+            if batch:
+                self._write_with_retry(batch)
+                batch = []
+            deadline = None
+            for _ in range(pending):
+                self._queue.task_done()
+            pending = 0
+
+    def _write_with_retry(self, batch: List[APIUsage]):
+        delay = _RETRY_BACKOFF
+        for attempt in range(1, _WRITE_RETRIES + 1):
+            try:
+                self._write_batch(batch)
+                return
+            except Exception as e:
+                if attempt == _WRITE_RETRIES:
+                    self.dropped_events += len(batch)
+                    print(f"[UsageTracker] Error writing {len(batch)} usage events, giving up after "
+                          f"{attempt} attempts: {e} ({self.dropped_events} dropped so far)")
+                    return
+                print(f"[UsageTracker] Error writing {len(batch)} usage events (attempt {attempt}), "
+                      f"retrying in {delay:.1f}s: {e}")
+                time.sleep(delay)
+                delay *= 2
+
+    @staticmethod
+    def _to_epoch(timestamp: str) -> Optional[float]:
+        try:
+            return datetime.fromisoformat(timestamp).timestamp()
+        except (TypeError, ValueError):
+            return None
+
+    def _write_batch(self, usages: List[APIUsage]):
+        rows = [
+            (
                 usage.timestamp,
+                self._to_epoch(usage.timestamp),
                 usage.api_name,
                 usage.endpoint,
                 json.dumps(usage.request_data),
@@ -73,66 +281,249 @@ class UsageTracker:
                 usage.session_id,
                 usage.success,
                 usage.error_message
-            ))
+            )
+            for usage in usages
+        ]
+
+        rollups: Dict[tuple, List] = {}
+        for usage in usages:
+            totals = rollups.setdefault((usage.timestamp[:10], usage.api_name), [0, 0, 0.0, 0])
+            totals[0] += 1
+            totals[1] += 0 if usage.success else 1
+            totals[2] += usage.cost_usd or 0.0
+            totals[3] += usage.tokens_used or 0
+
+        with self.pool.connection() as conn:
+            conn.executemany("""
+                INSERT INTO api_usage (
+                    timestamp, ts_epoch, api_name, endpoint, request_data, response_data,
+                    tokens_used, cost_usd, session_id, success, error_message
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, rows)
+            conn.executemany("""
+                INSERT INTO api_usage_daily (day, api_name, total_calls, failed_calls, total_cost, total_tokens)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(day, api_name) DO UPDATE SET
+                    total_calls = total_calls + excluded.total_calls,
+                    failed_calls = failed_calls + excluded.failed_calls,
+                    total_cost = total_cost + excluded.total_cost,
+                    total_tokens = total_tokens + excluded.total_tokens
+            """, [(day, api_name, *totals) for (day, api_name), totals in rollups.items()])
 
     def get_usage_stats(self, days: int = 30) -> Dict[str, Any]:
-        with sqlite3.connect(self.db_file) as conn:
-            conn.row_factory = sqlite3.Row
+        """Usage summary for the last N days, answered from the daily rollups"""
+        self.flush(timeout=_READ_FLUSH_TIMEOUT)
+        since_day = (date.today() - timedelta(days=days)).isoformat()
 
+        with self.pool.connection() as conn:
             # Estadísticas generales
             cursor = conn.execute("""
                 SELECT
                     api_name,
-                    COUNT(*) as total_calls,
-                    SUM(cost_usd) as total_cost,
-                    SUM(tokens_used) as total_tokens,
-                    AVG(cost_usd) as avg_cost_per_call,
-                    COUNT(CASE WHEN success = 0 THEN 1 END) as failed_calls
-                FROM api_usage
-                WHERE datetime(timestamp) >= datetime('now', '-{} days')
+                    SUM(total_calls) as total_calls,
+                    SUM(total_cost) as total_cost,
+                    SUM(total_tokens) as total_tokens,
+                    SUM(total_cost) / SUM(total_calls) as avg_cost_per_call,
+                    SUM(failed_calls) as failed_calls
+                FROM api_usage_daily
+                WHERE day >= ?
                 GROUP BY api_name
                 ORDER BY total_cost DESC
-            """.format(days))
+            """, (since_day,))
 
             api_stats = [dict(row) for row in cursor.fetchall()]
 
             # Estadísticas por día
             cursor = conn.execute("""
                 SELECT
-                    date(timestamp) as date,
+                    day as date,
                     api_name,
-                    SUM(cost_usd) as daily_cost,
-                    COUNT(*) as daily_calls
-                FROM api_usage
-                WHERE datetime(timestamp) >= datetime('now', '-{} days')
-                GROUP BY date(timestamp), api_name
-                ORDER BY date DESC
-            """.format(days))
+                    total_cost as daily_cost,
+                    total_calls as daily_calls
+                FROM api_usage_daily
+                WHERE day >= ?
+                ORDER BY day DESC
+            """, (since_day,))
 
             daily_stats = [dict(row) for row in cursor.fetchall()]
 
-            # Total general
-            cursor = conn.execute("""
-                SELECT
-                    SUM(cost_usd) as total_cost,
-                    COUNT(*) as total_calls,
-                    SUM(tokens_used) as total_tokens
-                FROM api_usage
-                WHERE datetime(timestamp) >= datetime('now', '-{} days')
-            """.format(days))
-
-            totals = dict(cursor.fetchone())
-
-            return {
-                "api_stats": api_stats,
-                "daily_stats": daily_stats,
-                "totals": totals,
-                "period_days": days
-            }
+        # Total general
+        totals = {
+            "total_cost": sum(stat["total_cost"] for stat in api_stats) if api_stats else None,
+            "total_calls": sum(stat["total_calls"] for stat in api_stats),
+            "total_tokens": sum(stat["total_tokens"] for stat in api_stats) if api_stats else None
+        }
+
+        return {
+            "api_stats": api_stats,
+            "daily_stats": daily_stats,
+            "totals": totals,
+            "period_days": days
+        }
+
+    def get_usage_between(self, start: datetime, end: Optional[datetime] = None,
+                          api_name: Optional[str] = None) -> List[Dict]:
+        """Raw usage rows in [start, end), using the indexed epoch column (compressed payloads via get_payload)"""
+        self.flush(timeout=_READ_FLUSH_TIMEOUT)
+        end_epoch = (end or datetime.now()).timestamp()
+        query = """
+            SELECT id, timestamp, api_name, endpoint, request_data, response_data, tokens_used,
+                   cost_usd, session_id, success, error_message, ts_epoch, payload_compacted
+            FROM api_usage WHERE ts_epoch >= ? AND ts_epoch < ?
+        """
+        params: List[Any] = [start.timestamp(), end_epoch]
+        if api_name:
+            query += " AND api_name = ?"
+            params.append(api_name)
+        query += " ORDER BY ts_epoch"
+
+        with self.pool.connection() as conn:
+            return [dict(row) for row in conn.execute(query, params).fetchall()]
+
+    def compact_payloads(self, older_than_days: Optional[int] = None, chunk_size: int = 500) -> int:
+        """Replace full payloads of rows older than the retention window with summaries.
+
+        Costs, tokens and rollups are untouched. When compression is enabled the
+        original payloads stay recoverable through get_payload().
+        """
+        days = self.retention.full_payload_days if older_than_days is None else older_than_days
+        cutoff = (datetime.now() - timedelta(days=days)).timestamp()
+        codec = self._payload_codec()
+        compacted = 0
+
+        while True:
+            with self.pool.connection() as conn:
+                rows = conn.execute("""
+                    SELECT id, request_data, response_data FROM api_usage
+                    WHERE ts_epoch < ? AND payload_compacted = 0
+                    LIMIT ?
+                """, (cutoff, chunk_size)).fetchall()
+                if not rows:
+                    break
+
+                updates = []
+                for row in rows:
+                    request_data = self._loads(row["request_data"])
+                    response_data = self._loads(row["response_data"])
+                    blob = None
+                    if codec:
+                        raw = json.dumps({"request": request_data, "response": response_data}).encode("utf-8")
+                        blob = self._compress(raw, codec)
+                    updates.append((
+                        json.dumps(self._summarize_payload(request_data)),
+                        json.dumps(self._summarize_payload(response_data)),
+                        codec,
+                        blob,
+                        row["id"]
+                    ))
+
+                conn.executemany("""
+                    UPDATE api_usage
+                    SET request_data = ?, response_data = ?, payload_compacted = 1,
+                        payload_codec = ?, payload_blob = ?
+                    WHERE id = ?
+                """, updates)
+                compacted += len(updates)
+
+            if len(rows) < chunk_size:
+                break
+
+        return compacted
+
+    def get_payload(self, usage_id: int) -> Optional[Dict[str, Any]]:
+        """Full request/response payload of a usage row, decompressing compacted rows"""
+        self.flush(timeout=_READ_FLUSH_TIMEOUT)
+        with self.pool.connection() as conn:
+            row = conn.execute("""
+                SELECT request_data, response_data, payload_compacted, payload_codec, payload_blob
+                FROM api_usage WHERE id = ?
+            """, (usage_id,)).fetchone()
+
+        if row is None:
+            return None
+        if row["payload_compacted"] and row["payload_blob"] is not None:
+            return json.loads(self._decompress(row["payload_blob"], row["payload_codec"]))
+        return {
+            "request": self._loads(row["request_data"]),
+            "response": self._loads(row["response_data"])
+        }
+
+    def vacuum(self):
+        """Checkpoint the WAL and rebuild the file so compacted space is returned to disk"""
+        with self.pool.connection() as conn:
+            conn.execute("VACUUM")
+            # In WAL mode VACUUM's output lands in the -wal file until checkpointed
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def run_maintenance(self) -> int:
+        self.flush(timeout=_READ_FLUSH_TIMEOUT)
+        compacted = self.compact_payloads()
+        if compacted and self.retention.vacuum:
+            self.vacuum()
+        return compacted
+
+    def _maintenance_loop(self):
+        # First pass shortly after start: web workers restart far more often than daily
+        delay = min(300.0, self.retention.maintenance_interval_hours * 3600)
+        while not self._stop_maintenance.wait(delay):
+            try:
+                compacted = self.run_maintenance()
+                if compacted:
+                    print(f"[UsageTracker] Compacted payloads of {compacted} usage rows")
+            except Exception as e:
+                print(f"[UsageTracker] Maintenance error: {e}")
+            delay = self.retention.maintenance_interval_hours * 3600
+
+    def _payload_codec(self) -> Optional[str]:
+        codec = (self.retention.compression or "none").lower()
+        if codec == "zstd" and zstandard is None:
+            print("[UsageTracker] zstandard not installed, falling back to zlib")
+            return "zlib"
+        return codec if codec in ("zlib", "zstd") else None
+
+    @staticmethod
+    def _compress(raw: bytes, codec: str) -> bytes:
+        if codec == "zstd":
+            return zstandard.ZstdCompressor(level=10).compress(raw)
+        return zlib.compress(raw, 9)
+
+    @staticmethod
+    def _decompress(blob: bytes, codec: Optional[str]) -> bytes:
+        if codec == "zstd":
+            if zstandard is None:
+                raise RuntimeError("zstandard is required to read this payload")
+            return zstandard.ZstdDecompressor().decompress(blob)
+        return zlib.decompress(blob)
+
+    @staticmethod
+    def _loads(value: Optional[str]) -> Any:
+        if not value:
+            return {}
+        try:
+            return json.loads(value)
+        except (TypeError, ValueError):
+            return {}
+
+    @classmethod
+    def _summarize_payload(cls, data: Any, max_text: int = 120) -> Any:
+        """Keep top-level scalar fields (truncated) and describe nested structures by size"""
+        if not isinstance(data, dict):
+            return cls._summarize_value(data, max_text)
+        return {key: cls._summarize_value(value, max_text) for key, value in data.items()}
+
+    @staticmethod
+    def _summarize_value(value: Any, max_text: int) -> Any:
+        if isinstance(value, str):
+            return value if len(value) <= max_text else value[:max_text] + f"... ({len(value)} chars)"
+        if isinstance(value, dict):
+            return f"<dict: {len(value)} keys>"
+        if isinstance(value, list):
+            return f"<list: {len(value)} items>"
+        return value
 
     def get_session_usage(self, session_id: str) -> List[Dict]:
-        with sqlite3.connect(self.db_file) as conn:
-            conn.row_factory = sqlite3.Row
+        self.flush(timeout=_READ_FLUSH_TIMEOUT)
+        with self.pool.connection() as conn:
             cursor = conn.execute("""
                 SELECT * FROM api_usage
                 WHERE session_id = ?
@@ -169,5 +560,11 @@ _tracker = None
 def get_tracker() -> UsageTracker:
     global _tracker
     if _tracker is None:
-        _tracker = UsageTracker()
-    return _tracker
\ No newline at end of file
+        _tracker = UsageTracker(retention=UsageRetentionSettings.from_env())
+    return _tracker
+
+
+def shutdown_tracker():
+    """Flush pending usage events; call on application shutdown"""
+    if _tracker is not None:
+        _tracker.close()
\ No newline at end of file
@@ -0,0 +1,166 @@
+import glob
+import json
+import os
+import subprocess
+from typing import List, Optional, Tuple
+
+from ..config.settings import VideoStreamingSettings
+
+
+# Bitrates de vídeo/audio por altura de la variante
+_LADDER_BITRATES = {
+    1080: ("4500k", "128k"),
+    720: ("2500k", "128k"),
+    480: ("1000k", "96k"),
+    360: ("700k", "96k"),
+    240: ("400k", "64k"),
+}
+
+
+class VideoStreamingPackager:
+    """
+    Prepara los vídeos finales para streaming.
+
+    - faststart: mueve el índice (moov atom) al principio del MP4 para que el
+      navegador empiece a reproducir sin descargar el archivo completo.
+    - HLS/fMP4 (opcional): genera una escalera de variantes (p. ej. 480p y 240p)
+      en segmentos. Todos los archivos quedan en el directorio de la sesión con
+      nombres planos, así que /api/files los sirve sin rutas nuevas.
+    """
+
+    def __init__(self, settings: Optional[VideoStreamingSettings] = None):
+        self.settings = settings or VideoStreamingSettings.from_env()
+
+    @staticmethod
+    def hls_master_path(video_path: str) -> str:
+        base, _ = os.path.splitext(video_path)
+        return f"{base}_hls.m3u8"
+
+    def prepare(self, video_path: str) -> bool:
+        """Apply faststart and, if enabled, build the HLS ladder. Returns True if anything was produced"""
+        if not os.path.exists(video_path):
+            return False
+
+        produced = False
+        if self.settings.faststart:
+            produced = self.faststart(video_path) or produced
+        if self.settings.hls:
+            produced = self.package_hls(video_path) is not None or produced
+        return produced
+
+    def faststart(self, video_path: str) -> bool:
+        """Rewrite the MP4 in place with the moov atom first (stream copy, no re-encode)"""
+        tmp_path = video_path.replace('.mp4', '_faststart_tmp.mp4')
+        cmd = [
+            'ffmpeg', '-y', '-i', video_path,
+            '-map', '0', '-c', 'copy',
+            '-movflags', '+faststart',
+            tmp_path
+        ]
+        try:
+            result = subprocess.run(cmd, capture_output=True, text=True, timeout=300)
+            if result.returncode != 0:
+                print(f"Error aplicando faststart: {result.stderr[-500:]}")
+                return False
+            os.replace(tmp_path, video_path)
+            return True
+        except Exception as e:
+            print(f"Error aplicando faststart: {str(e)}")
+            return False
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+    def _probe(self, video_path: str) -> Tuple[Optional[int], Optional[int], bool]:
+        """(width, height, has_audio) of the source video"""
+        cmd = [
+            'ffprobe', '-v', 'quiet', '-print_format', 'json',
+            '-show_streams', video_path
+        ]
+        result = subprocess.run(cmd, capture_output=True, text=True)
+        if result.returncode != 0:
+            return None, None, False
+        streams = json.loads(result.stdout).get('streams', [])
+        video = next((s for s in streams if s.get('codec_type') == 'video'), None)
+        has_audio = any(s.get('codec_type') == 'audio' for s in streams)
+        if not video:
+            return None, None, has_audio
+        return video.get('width'), video.get('height'), has_audio
+
+    def _remove_previous_hls(self, video_path: str):
+        base, _ = os.path.splitext(video_path)
+        for path in glob.glob(f"{glob.escape(base)}_hls*"):
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+    def package_hls(self, video_path: str) -> Optional[str]:
+        """Encode every rendition as fMP4 HLS and write the master playlist. Returns its path"""
+        try:
+            width, height, has_audio = self._probe(video_path)
+            if not width or not height:
+                print(f"No se pudo analizar el vídeo para HLS: {video_path}")
+                return None
+
+            # No ampliar: solo variantes de altura <= a la original
+            heights = sorted({h for h in self.settings.hls_renditions if h <= height}, reverse=True)
+            if not heights:
+                heights = [height - height % 2]
+
+            self._remove_previous_hls(video_path)
+            directory = os.path.dirname(video_path)
+            base = os.path.splitext(os.path.basename(video_path))[0]
+            segment = self.settings.hls_segment_seconds
+
+            variants: List[Tuple[int, int, int, str, str]] = []
+            for h in heights:
+                w = int(round(width * h / height / 2)) * 2
+                video_bitrate, audio_bitrate = _LADDER_BITRATES.get(h, ("800k", "96k"))
+                name = f"{base}_hls_{h}p"
+                cmd = [
+                    'ffmpeg', '-y', '-i', video_path,
+                    '-map', '0:v:0', '-map', '0:a:0?',
+                    '-vf', f'scale={w}:{h}',
+                    '-c:v', 'libx264', '-preset', 'veryfast', '-profile:v', 'main',
+                    '-b:v', video_bitrate, '-maxrate', video_bitrate,
+                    '-bufsize', f"{int(video_bitrate[:-1]) * 2}k",
+                    '-pix_fmt', 'yuv420p',
+                    # Keyframe al inicio de cada segmento para que las variantes se alineen
+                    '-force_key_frames', f'expr:gte(t,n_forced*{segment})',
+                    '-sc_threshold', '0',
+                    '-c:a', 'aac', '-b:a', audio_bitrate,
+                    '-f', 'hls',
+                    '-hls_time', str(segment),
+                    '-hls_playlist_type', 'vod',
+                    '-hls_segment_type', 'fmp4',
+                    '-hls_fmp4_init_filename', f"{name}_init.mp4",
+                    '-hls_segment_filename', os.path.join(directory, f"{name}_%05d.m4s"),
+                    os.path.join(directory, f"{name}.m3u8")
+                ]
+                result = subprocess.run(cmd, capture_output=True, text=True, timeout=900)
+                if result.returncode != 0:
+                    print(f"Error generando variante HLS {h}p: {result.stderr[-500:]}")
+                    continue
+
+                bandwidth = (int(video_bitrate[:-1]) + (int(audio_bitrate[:-1]) if has_audio else 0)) * 1000
+                codecs = 'avc1.4d401f,mp4a.40.2' if has_audio else 'avc1.4d401f'
+                variants.append((bandwidth, w, h, f"{name}.m3u8", codecs))
+
+            if not variants:
+                return None
+
+            master_path = self.hls_master_path(video_path)
+            lines = ['#EXTM3U', '#EXT-X-VERSION:7', '#EXT-X-INDEPENDENT-SEGMENTS']
+            for bandwidth, w, h, playlist, codecs in variants:
+                lines.append(f'#EXT-X-STREAM-INF:BANDWIDTH={bandwidth},RESOLUTION={w}x{h},CODECS="{codecs}"')
+                lines.append(playlist)
+            with open(master_path, 'w', encoding='utf-8') as f:
+                f.write('\n'.join(lines) + '\n')
+
+            print(f"HLS generado: {master_path} ({', '.join(f'{h}p' for _, _, h, _, _ in variants)})")
+            return master_path
+
+        except Exception as e:
+            print(f"Error generando HLS: {str(e)}")
+            return None
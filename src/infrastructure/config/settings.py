@@ -2,7 +2,7 @@ import os
 import json
 from dotenv import load_dotenv
 from dataclasses import dataclass, asdict
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 from pathlib import Path
 
 load_dotenv()
@@ -53,6 +53,103 @@ class Settings:
         )
 
 
+@dataclass
+class UsageRetentionSettings:
+    full_payload_days: int = 30
+    compression: str = "zlib"  # "zlib", "zstd" or "none"
+    maintenance_interval_hours: float = 24.0
+    vacuum: bool = True
+
+    @classmethod
+    def from_env(cls) -> 'UsageRetentionSettings':
+        return cls(
+            full_payload_days=int(os.getenv("USAGE_FULL_PAYLOAD_DAYS", "30")),
+            compression=os.getenv("USAGE_PAYLOAD_COMPRESSION", "zlib").lower(),
+            maintenance_interval_hours=float(os.getenv("USAGE_MAINTENANCE_INTERVAL_HOURS", "24")),
+            vacuum=os.getenv("USAGE_VACUUM", "true").lower() in ("1", "true", "yes")
+        )
+
+
+@dataclass
+class VideoStreamingSettings:
+    faststart: bool = True
+    hls: bool = False
+    hls_renditions: Tuple[int, ...] = (480, 240)  # Alturas en píxeles
+    hls_segment_seconds: int = 4
+
+    @classmethod
+    def from_env(cls) -> 'VideoStreamingSettings':
+        renditions = os.getenv("VIDEO_HLS_RENDITIONS", "480,240")
+        return cls(
+            faststart=os.getenv("VIDEO_FASTSTART", "true").lower() in ("1", "true", "yes"),
+            hls=os.getenv("VIDEO_HLS", "false").lower() in ("1", "true", "yes"),
+            hls_renditions=tuple(int(h) for h in renditions.split(",") if h.strip()),
+            hls_segment_seconds=int(os.getenv("VIDEO_HLS_SEGMENT_SECONDS", "4"))
+        )
+
+
+@dataclass
+class LyricsCacheSettings:
+    enabled: bool = True
+    ttl_hours: float = 168.0
+    scope: str = "user"  # "user" (cada usuario su caché) o "shared"
+    db_path: str = "data/lyrics_cache.db"
+
+    @classmethod
+    def from_env(cls) -> 'LyricsCacheSettings':
+        return cls(
+            enabled=os.getenv("LYRICS_CACHE_ENABLED", "true").lower() in ("1", "true", "yes"),
+            ttl_hours=float(os.getenv("LYRICS_CACHE_TTL_HOURS", "168")),
+            scope=os.getenv("LYRICS_CACHE_SCOPE", "user").lower(),
+            db_path=os.getenv("LYRICS_CACHE_PATH", "data/lyrics_cache.db")
+        )
+
+
+@dataclass
+class ImageCacheSettings:
+    variants: int = 0  # 0: no reutilizar; N: reutilizar una de N imágenes por prompt
+    root: str = "data/image_cache"
+
+    @classmethod
+    def from_env(cls) -> 'ImageCacheSettings':
+        return cls(
+            variants=int(os.getenv("IMAGE_CACHE_VARIANTS", "0")),
+            root=os.getenv("IMAGE_CACHE_DIR", "data/image_cache")
+        )
+
+
+@dataclass
+class ArtifactStoreSettings:
+    enabled: bool = True
+    root: str = "output/.store"  # Mismo sistema de archivos que output/ para poder usar enlaces duros
+    scratch_dir: str = "output/.scratch"
+    scratch_max_age_hours: float = 6.0
+
+    @classmethod
+    def from_env(cls) -> 'ArtifactStoreSettings':
+        return cls(
+            enabled=os.getenv("ARTIFACT_DEDUP", "true").lower() in ("1", "true", "yes"),
+            root=os.getenv("ARTIFACT_STORE_DIR", "output/.store"),
+            scratch_dir=os.getenv("ARTIFACT_SCRATCH_DIR", "output/.scratch"),
+            scratch_max_age_hours=float(os.getenv("ARTIFACT_SCRATCH_MAX_AGE_HOURS", "6"))
+        )
+
+
+@dataclass
+class StorageQuotaSettings:
+    user_quota_mb: float = 0.0  # 0: sin límite por usuario
+    min_free_mb: float = 1024.0  # Por debajo, desalojar intermedios de todos los usuarios
+    janitor_interval_minutes: float = 30.0  # 0: solo al arrancar
+
+    @classmethod
+    def from_env(cls) -> 'StorageQuotaSettings':
+        return cls(
+            user_quota_mb=float(os.getenv("USER_STORAGE_QUOTA_MB", "0")),
+            min_free_mb=float(os.getenv("STORAGE_MIN_FREE_MB", "1024")),
+            janitor_interval_minutes=float(os.getenv("STORAGE_JANITOR_INTERVAL_MINUTES", "30"))
+        )
+
+
 class ConfigManager:
     def __init__(self, config_file: str = "api_config.json"):
         self.config_file = Path(config_file)
@@ -0,0 +1,95 @@
+import asyncio
+import itertools
+import threading
+from concurrent.futures import CancelledError, Future
+from typing import Any, Callable, Coroutine, Dict, Optional
+
+
+class Job:
+    """Handle for a coroutine submitted to the AsyncRuntime"""
+
+    def __init__(self, job_id: int, name: str, future: Future):
+        self.id = job_id
+        self.name = name
+        self.future = future
+
+    def cancel(self) -> bool:
+        """Cancel the job; the coroutine receives asyncio.CancelledError"""
+        return self.future.cancel()
+
+    def done(self) -> bool:
+        return self.future.done()
+
+    def cancelled(self) -> bool:
+        return self.future.cancelled()
+
+
+class AsyncRuntime:
+    """
+    One long-lived asyncio event loop running in a background thread.
+
+    GUI actions submit coroutines here instead of each spawning a thread with its
+    own event loop, so clients, connection pools and caches created inside the
+    loop are shared between concurrent generations. Results, errors and progress
+    are delivered back on the Tk thread through ``root.after``.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.loop = asyncio.new_event_loop()
+        self.jobs: Dict[int, Job] = {}
+        self._ids = itertools.count(1)
+        self._thread = threading.Thread(target=self._run_loop, name="gui-async-runtime", daemon=True)
+        self._thread.start()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, coro: Coroutine, on_success: Optional[Callable[[Any], None]] = None,
+               on_error: Optional[Callable[[Exception], None]] = None,
+               on_cancel: Optional[Callable[[], None]] = None, name: str = "job") -> Job:
+        """Schedule a coroutine on the shared loop; callbacks run on the Tk thread"""
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        job = Job(next(self._ids), name, future)
+        self.jobs[job.id] = job
+
+        def _done(fut: Future):
+            self.root.after(0, self._finish, job, fut, on_success, on_error, on_cancel)
+
+        future.add_done_callback(_done)
+        return job
+
+    def _finish(self, job: Job, fut: Future, on_success, on_error, on_cancel):
+        self.jobs.pop(job.id, None)
+        try:
+            result = fut.result()
+        except CancelledError:
+            if on_cancel:
+                on_cancel()
+            return
+        except Exception as e:
+            if on_error:
+                on_error(e)
+            else:
+                print(f"Error in background job '{job.name}': {e}")
+            return
+        if on_success:
+            on_success(result)
+
+    def progress_callback(self, handler: Callable[[str], None]) -> Callable[[str], None]:
+        """Wrap a Tk-side progress handler so it can be called from the runtime thread"""
+        def report(message: str):
+            self.root.after(0, handler, message)
+        return report
+
+    def cancel_all(self):
+        for job in list(self.jobs.values()):
+            job.cancel()
+
+    def shutdown(self, timeout: float = 5.0):
+        """Cancel pending jobs and stop the loop"""
+        self.cancel_all()
+        if self.loop.is_running():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=timeout)
@@ -4,11 +4,14 @@ from typing import Callable, Optional
 
 
 class SearchBar(ttk.Frame):
+    SEARCH_DEBOUNCE_MS = 250
+    
     def __init__(self, parent, on_search_callback: Callable[[str], None] = None, 
                  on_filter_callback: Callable[[str], None] = None):
         super().__init__(parent)
         self.on_search_callback = on_search_callback
         self.on_filter_callback = on_filter_callback
+        self._search_after_id = None
         self.setup_ui()
     
     def setup_ui(self):
@@ -52,7 +55,7 @@ class SearchBar(ttk.Frame):
         sort_combo = ttk.Combobox(
             search_frame,
             textvariable=self.sort_var,
-            values=["Más recientes", "Más antiguos", "Alfabético A-Z", "Alfabético Z-A"],
+            values=["Más recientes", "Más antiguos", "Alfabético A-Z", "Alfabético Z-A", "Relevancia"],
             state="readonly",
             width=15,
             font=('Segoe UI', 10)
@@ -70,7 +73,13 @@ class SearchBar(ttk.Frame):
         clear_btn.pack(side='right', padx=(10, 0))
     
     def _on_search_change(self, *args):
-        """Handle search text changes"""
+        """Handle search text changes (debounced: one search per typing pause)"""
+        if self._search_after_id is not None:
+            self.after_cancel(self._search_after_id)
+        self._search_after_id = self.after(self.SEARCH_DEBOUNCE_MS, self._emit_search)
+    
+    def _emit_search(self):
+        self._search_after_id = None
         if self.on_search_callback:
             search_text = self.search_var.get().strip()
             self.on_search_callback(search_text)
@@ -1,6 +1,5 @@
 import tkinter as tk
 from tkinter import ttk
-from PIL import Image, ImageTk
 import os
 from datetime import datetime
 from typing import Optional, Callable
@@ -9,12 +8,29 @@ import threading
 import time
 
 from ..styles import ThemeManager, create_status_badge
+from .thumbnail_service import ThumbnailService
+
+
+_mixer_checked = False
+
+
+def _ensure_mixer():
+    """Initialize pygame mixer for audio (only once globally)"""
+    global _mixer_checked
+    if _mixer_checked:
+        return
+    _mixer_checked = True
+    try:
+        if not pygame.mixer.get_init():
+            pygame.mixer.init()
+    except:
+        pass
 
 
 class SessionCard(ttk.Frame):
     def __init__(self, parent, session, on_play_callback=None, on_generate_image_callback=None, on_generate_video_callback=None, on_loop_video_callback=None):
         super().__init__(parent, style='Card.TFrame')
-        self.session = session
+        self.session = None
         self.on_play_callback = on_play_callback
         self.on_generate_image_callback = on_generate_image_callback
         self.on_generate_video_callback = on_generate_video_callback
@@ -26,17 +42,16 @@ class SessionCard(ttk.Frame):
         self.is_processing_video = False  # Flag to prevent multiple clicks
         self.is_processing_image = False  # Flag to prevent multiple clicks
         self.is_processing_loop = False  # Flag to prevent multiple clicks
+        self._controls_signature = None
+        self._clear_control_refs()
         
-        # Initialize pygame mixer for audio (only once globally)
-        try:
-            if not pygame.mixer.get_init():
-                pygame.mixer.init()
-        except:
-            pass
+        _ensure_mixer()
         
         self.setup_ui()
+        self.bind_session(session)
     
     def setup_ui(self):
+        """Build the widgets shared by every session; bind_session fills them in"""
         # Configure card style
         self.configure(padding=10, relief='raised', borderwidth=1)
         
@@ -51,9 +66,6 @@ class SessionCard(ttk.Frame):
         self.image_label = ttk.Label(left_frame)
         self.image_label.pack()
         
-        # Load and display image thumbnail or placeholder
-        self.load_thumbnail()
-        
         # Right side - Content
         right_frame = ttk.Frame(main_frame)
         right_frame.pack(side='left', fill='both', expand=True)
@@ -63,54 +75,112 @@ class SessionCard(ttk.Frame):
         title_frame.pack(fill='x', pady=(0, 5))
         
         # Title (bold and larger)
-        title_label = ttk.Label(
+        self.title_label = ttk.Label(
             title_frame, 
-            text=self.session.request.title, 
             font=('Segoe UI', 12, 'bold'),
             foreground='#2c3e50'
         )
-        title_label.pack(anchor='w')
+        self.title_label.pack(anchor='w')
         
         # Subtitle with style and model
-        subtitle_text = f"{self.session.request.style} • {self.session.request.model.value}"
-        if self.session.request.instrumental:
-            subtitle_text += " • Instrumental"
-        
-        subtitle_label = ttk.Label(
+        self.subtitle_label = ttk.Label(
             title_frame, 
-            text=subtitle_text,
             font=('Segoe UI', 9),
             foreground='#7f8c8d'
         )
-        subtitle_label.pack(anchor='w')
+        self.subtitle_label.pack(anchor='w')
         
         # Status badges
-        status_frame = ttk.Frame(right_frame)
-        status_frame.pack(fill='x', pady=(5, 10))
-        
-        # Music status badge
-        music_status = "completed" if (self.session.response and self.session.response.is_completed) else "processing"
-        music_badge = create_status_badge(status_frame, music_status)
-        music_badge.pack(side='left', padx=(0, 10))
-        
-        # Image status badge
-        image_status = "with_image" if (self.session.image_response and self.session.image_response.has_images) else "without_image"
-        image_badge = create_status_badge(status_frame, image_status)
-        image_badge.pack(side='left')
+        self.status_frame = ttk.Frame(right_frame)
+        self.status_frame.pack(fill='x', pady=(5, 10))
+        self.music_badge = None
+        self.image_badge = None
         
         # Date
-        date_str = datetime.fromtimestamp(self.session.timestamp).strftime("%d/%m/%Y %H:%M")
-        date_label = ttk.Label(
-            status_frame,
-            text=date_str,
+        self.date_label = ttk.Label(
+            self.status_frame,
             font=('Segoe UI', 8),
             foreground='#95a5a6'
         )
-        date_label.pack(side='right')
+        self.date_label.pack(side='right')
         
         # Controls frame
-        controls_frame = ttk.Frame(right_frame)
-        controls_frame.pack(fill='x', pady=(5, 0))
+        self.controls_frame = ttk.Frame(right_frame)
+        self.controls_frame.pack(fill='x', pady=(5, 0))
+    
+    def bind_session(self, session):
+        """Show another session in this card, reusing its widgets"""
+        same_session = self.session is not None and self.session.session_id == session.session_id
+        self.session = session
+        
+        if not same_session:
+            # Audio keeps playing; this card just stops tracking it
+            self.is_playing = False
+            self.current_track_index = 0
+            self.reset_processing_state()
+        self.available_tracks = []
+        
+        self.title_label.configure(text=session.request.title)
+        
+        subtitle_text = f"{session.request.style} • {session.request.model.value}"
+        if session.request.instrumental:
+            subtitle_text += " • Instrumental"
+        self.subtitle_label.configure(text=subtitle_text)
+        
+        # Music status badge
+        for badge in (self.music_badge, self.image_badge):
+            if badge is not None:
+                badge.destroy()
+        music_status = "completed" if (session.response and session.response.is_completed) else "processing"
+        self.music_badge = create_status_badge(self.status_frame, music_status)
+        self.music_badge.pack(side='left', padx=(0, 10))
+        
+        # Image status badge
+        image_status = "with_image" if (session.image_response and session.image_response.has_images) else "without_image"
+        self.image_badge = create_status_badge(self.status_frame, image_status)
+        self.image_badge.pack(side='left')
+        
+        date_str = datetime.fromtimestamp(session.timestamp).strftime("%d/%m/%Y %H:%M")
+        self.date_label.configure(text=date_str)
+        
+        # Load and display image thumbnail or placeholder
+        self.load_thumbnail()
+        
+        # Controls only change shape with the session's state; keep them when they match
+        signature = self._get_controls_signature()
+        if not same_session or signature != self._controls_signature:
+            self._controls_signature = signature
+            self.build_controls()
+        else:
+            self.update_track_selection_ui()
+    
+    def _get_controls_signature(self):
+        has_images = bool(self.session.image_response and self.session.image_response.has_images)
+        return (
+            len(self.get_available_tracks()) if self.has_audio() else None,
+            has_images,
+            bool(self.session.video_response and self.session.video_response.has_video),
+            bool(self.session.video_path and os.path.exists(self.session.video_path)),
+            has_images and self._has_original_video(),
+            bool(self.session.local_path and os.path.exists(self.session.local_path))
+        )
+    
+    def _clear_control_refs(self):
+        self.play_button = None
+        self.prev_button = None
+        self.next_button = None
+        self.track_label = None
+        self.generate_image_btn = None
+        self.generate_video_btn = None
+        self.loop_btn = None
+        self.regenerate_loop_btn = None
+    
+    def build_controls(self):
+        """(Re)create the action buttons for the current session"""
+        for child in self.controls_frame.winfo_children():
+            child.destroy()
+        self._clear_control_refs()
+        controls_frame = self.controls_frame
         
         # Audio controls (only if audio exists)
         if self.has_audio():
@@ -279,17 +349,25 @@ class SessionCard(ttk.Frame):
             folder_btn.pack(side='right')
     
     def load_thumbnail(self):
-        """Load and display image thumbnail or placeholder"""
+        """Show the cached thumbnail, or a placeholder until the background render is ready"""
         try:
+            service = ThumbnailService.instance(self)
             if self.session.image_path and os.path.exists(self.session.image_path):
-                # Load actual image
-                image = Image.open(self.session.image_path)
-                image = image.resize((120, 68), Image.Resampling.LANCZOS)  # 16:9 aspect ratio
-                self.thumbnail = ImageTk.PhotoImage(image)
-                self.image_label.configure(image=self.thumbnail)
-            else:
-                # Create placeholder
-                self.create_placeholder()
+                session_id = self.session.session_id
+                
+                def apply(photo):
+                    # The card may have been recycled for another session meanwhile
+                    if photo is not None and self.session is not None and self.session.session_id == session_id:
+                        self.thumbnail = photo
+                        self.image_label.configure(image=photo)
+                
+                photo = service.get(self.session.image_path, (120, 68), apply)
+                if photo is not None:
+                    self.thumbnail = photo
+                    self.image_label.configure(image=photo)
+                    return
+            
+            self.create_placeholder()
         except Exception as e:
             print(f"Error loading thumbnail: {e}")
             self.create_placeholder()
@@ -298,10 +376,7 @@ class SessionCard(ttk.Frame):
         """Create a placeholder image"""
         try:
             # Create a simple colored rectangle as placeholder
-            placeholder = Image.new('RGB', (120, 68), '#ecf0f1')
-            
-            # You could add text or icons here if PIL supports it
-            self.thumbnail = ImageTk.PhotoImage(placeholder)
+            self.thumbnail = ThumbnailService.instance(self).placeholder((120, 68))
             self.image_label.configure(image=self.thumbnail)
         except Exception as e:
             print(f"Error creating placeholder: {e}")
@@ -402,12 +477,12 @@ class SessionCard(ttk.Frame):
         if len(tracks) <= 1:
             return
         
-        if hasattr(self, 'prev_button') and hasattr(self, 'next_button'):
+        if self.prev_button is not None and self.next_button is not None:
             # Always enable both buttons for cycling through tracks
             self.prev_button.configure(state='normal')
             self.next_button.configure(state='normal')
         
-        if hasattr(self, 'track_label'):
+        if self.track_label is not None:
             track_num = self.current_track_index + 1
             self.track_label.configure(text=f"Track {track_num}/{len(tracks)}")
     
@@ -418,7 +493,7 @@ class SessionCard(ttk.Frame):
     
     def update_play_button_text(self):
         """Update play button text with track info"""
-        if hasattr(self, 'play_button'):
+        if self.play_button is not None:
             tracks = self.get_available_tracks()
             if len(tracks) <= 1:
                 # Single track - simple play/pause
@@ -450,7 +525,7 @@ class SessionCard(ttk.Frame):
 
         if self.on_generate_image_callback:
             self.is_processing_image = True
-            if hasattr(self, 'generate_image_btn'):
+            if self.generate_image_btn is not None:
                 self.generate_image_btn.config(state='disabled', text="⏳ Generando...")
             self.on_generate_image_callback(self.session)
     
@@ -461,7 +536,7 @@ class SessionCard(ttk.Frame):
 
         if self.on_generate_video_callback:
             self.is_processing_video = True
-            if hasattr(self, 'generate_video_btn'):
+            if self.generate_video_btn is not None:
                 self.generate_video_btn.config(state='disabled', text="⏳ Animando...")
             self.on_generate_video_callback(self.session)
     
@@ -472,9 +547,9 @@ class SessionCard(ttk.Frame):
 
         if self.on_loop_video_callback:
             self.is_processing_loop = True
-            if hasattr(self, 'loop_btn'):
+            if self.loop_btn is not None:
                 self.loop_btn.config(state='disabled', text="⏳ Creando bucle...")
-            if hasattr(self, 'regenerate_loop_btn'):
+            if self.regenerate_loop_btn is not None:
                 self.regenerate_loop_btn.config(state='disabled')
             self.on_loop_video_callback(self.session)
     
@@ -0,0 +1,152 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from PIL import Image, ImageTk
+
+
+class ThumbnailService:
+    """
+    Generates card thumbnails off the Tk main thread.
+
+    Small thumbnails are rendered once by a worker pool and stored in a disk
+    cache keyed by source path + mtime + size, so a cover is only decoded at
+    full resolution the first time it is seen. Ready PhotoImages are kept in an
+    in-memory LRU and handed back on the Tk thread via ``after``. The disk cache
+    is pruned on startup to ``max_cache_mb``, least recently used first.
+    """
+
+    _instance: Optional['ThumbnailService'] = None
+
+    def __init__(self, root, cache_dir: str = ".cache/thumbnails", max_workers: int = 2,
+                 memory_items: int = 256, max_cache_mb: float = 64):
+        self.root = root
+        self.cache_dir = cache_dir
+        self.memory_items = memory_items
+        self.max_cache_bytes = int(max_cache_mb * 1024 * 1024)
+        self._memory: "OrderedDict[tuple, ImageTk.PhotoImage]" = OrderedDict()
+        self._pending: Dict[tuple, List[Callable]] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="thumbnails")
+        self._placeholders: Dict[Tuple[int, int], ImageTk.PhotoImage] = {}
+        os.makedirs(cache_dir, exist_ok=True)
+        self._executor.submit(self._prune_disk_cache)
+
+    @classmethod
+    def instance(cls, widget) -> 'ThumbnailService':
+        """Process-wide service bound to the widget's Tk root"""
+        if cls._instance is None:
+            cls._instance = cls(widget.winfo_toplevel())
+        return cls._instance
+
+    def placeholder(self, size: Tuple[int, int] = (120, 68)) -> ImageTk.PhotoImage:
+        if size not in self._placeholders:
+            self._placeholders[size] = ImageTk.PhotoImage(Image.new('RGB', size, '#ecf0f1'))
+        return self._placeholders[size]
+
+    def get(self, path: str, size: Tuple[int, int], callback: Callable[[Optional[ImageTk.PhotoImage]], None]
+            ) -> Optional[ImageTk.PhotoImage]:
+        """
+        Return the thumbnail right away if it is in memory. Otherwise schedule it
+        and call ``callback(photo)`` on the Tk thread once it is ready (None on failure).
+        """
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size, size)
+
+        photo = self._memory.get(key)
+        if photo is not None:
+            self._memory.move_to_end(key)
+            return photo
+
+        with self._lock:
+            if key in self._pending:
+                self._pending[key].append(callback)
+                return None
+            self._pending[key] = [callback]
+
+        self._executor.submit(self._render, key)
+        return None
+
+    def _cache_path(self, key: tuple) -> str:
+        digest = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.png")
+
+    def _render(self, key: tuple):
+        path, _, _, size = key
+        image = None
+        try:
+            cache_path = self._cache_path(key)
+            if os.path.exists(cache_path):
+                image = Image.open(cache_path)
+                image.load()
+                # Mark as recently used for _prune_disk_cache (atime is unreliable)
+                os.utime(cache_path)
+            else:
+                source = Image.open(path)
+                # Let JPEG decode at reduced scale instead of full resolution
+                source.draft('RGB', (size[0] * 2, size[1] * 2))
+                image = source.convert('RGB').resize(size, Image.Resampling.LANCZOS)  # 16:9 aspect ratio
+                tmp_path = f"{cache_path}.{threading.get_ident()}.tmp"
+                image.save(tmp_path, format='PNG')
+                os.replace(tmp_path, cache_path)
+        except Exception as e:
+            print(f"Error generating thumbnail for {path}: {e}")
+            image = None
+
+        self.root.after(0, self._deliver, key, image)
+
+    def _prune_disk_cache(self):
+        """Drop leftover temp files and the least recently used thumbnails above max_cache_bytes"""
+        entries = []
+        # A render may be writing its .tmp right now: only remove abandoned ones
+        tmp_cutoff = time.time() - 3600
+        try:
+            for entry in os.scandir(self.cache_dir):
+                if not entry.is_file():
+                    continue
+                stat = entry.stat()
+                if entry.name.endswith('.tmp'):
+                    if stat.st_mtime < tmp_cutoff:
+                        os.unlink(entry.path)
+                elif entry.name.endswith('.png'):
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        except OSError as e:
+            print(f"Error scanning thumbnail cache: {e}")
+            return
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_cache_bytes:
+                break
+            try:
+                os.unlink(path)
+                total -= size
+            except OSError:
+                pass
+
+    def _deliver(self, key: tuple, image: Optional[Image.Image]):
+        # PhotoImage must be created on the Tk thread
+        photo = ImageTk.PhotoImage(image) if image is not None else None
+        if photo is not None:
+            self._memory[key] = photo
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
+
+        with self._lock:
+            callbacks = self._pending.pop(key, [])
+        for callback in callbacks:
+            try:
+                callback(photo)
+            except Exception as e:
+                print(f"Error applying thumbnail: {e}")
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,163 @@
+import tkinter as tk
+from tkinter import ttk
+from typing import Callable, List, Dict
+
+from .session_card import SessionCard
+
+
+class VirtualSessionList(ttk.Frame):
+    """
+    Scrollable list of session cards that only keeps widgets for the rows in
+    the viewport. Cards are recycled and re-bound to other sessions on scroll,
+    so the widget count stays constant no matter how many sessions there are.
+    ``row_height`` is only the starting estimate: it grows to fit the tallest
+    card actually realized, so a card is never clipped.
+    """
+
+    def __init__(self, parent, card_factory: Callable[[tk.Widget, object], SessionCard],
+                 row_height: int = 150, row_gap: int = 15, overscan: int = 1):
+        super().__init__(parent)
+        self.card_factory = card_factory
+        self.row_height = row_height
+        self.row_gap = row_gap
+        self.overscan = overscan
+
+        self.sessions: List = []
+        self.cards: List[SessionCard] = []
+        self._windows: Dict[SessionCard, int] = {}  # card -> canvas window id
+        self._rows: Dict[SessionCard, int] = {}  # card -> row index it shows
+        self._layout_pending = False
+        self._measure_pending = False
+
+        self.canvas = tk.Canvas(self, highlightthickness=0, yscrollincrement=40)
+        self.scrollbar = ttk.Scrollbar(self, orient='vertical', command=self.canvas.yview)
+        self.canvas.configure(yscrollcommand=self._on_canvas_scrolled)
+
+        self.canvas.pack(side="left", fill="both", expand=True)
+        self.scrollbar.pack(side="right", fill="y")
+
+        self.canvas.bind("<Configure>", self._on_canvas_configure)
+
+        # Empty / no-results message (hidden by default)
+        self.message_label = ttk.Label(
+            self.canvas,
+            font=('Segoe UI', 12),
+            foreground='#7f8c8d',
+            justify='center'
+        )
+        self._message_window = self.canvas.create_window(
+            0, 50, window=self.message_label, anchor='n', state='hidden'
+        )
+
+    def set_sessions(self, sessions: List, reset_scroll: bool = False):
+        """Replace the data model; only visible cards are re-bound"""
+        self.sessions = list(sessions)
+        self._rows.clear()  # Force rebinding: row N may now be a different session
+        self.canvas.configure(scrollregion=(0, 0, 0, self._content_height()))
+        if reset_scroll:
+            self.canvas.yview_moveto(0)
+        self._layout()
+
+    def show_message(self, text: str):
+        self.message_label.configure(text=text)
+        self.canvas.coords(self._message_window, self.canvas.winfo_width() / 2, 50)
+        self.canvas.itemconfigure(self._message_window, state='normal')
+
+    def hide_message(self):
+        self.canvas.itemconfigure(self._message_window, state='hidden')
+
+    def scroll_units(self, units: int):
+        self.canvas.yview_scroll(units, "units")
+
+    def _content_height(self) -> int:
+        return len(self.sessions) * self.row_height
+
+    def _on_canvas_scrolled(self, first, last):
+        self.scrollbar.set(first, last)
+        self._schedule_layout()
+
+    def _on_canvas_configure(self, event):
+        for window_id in self._windows.values():
+            self.canvas.itemconfigure(window_id, width=event.width)
+        self.canvas.coords(self._message_window, event.width / 2, 50)
+        self._schedule_layout()
+
+    def _schedule_layout(self):
+        # Coalesce bursts of scroll events into one layout pass per idle cycle
+        if not self._layout_pending:
+            self._layout_pending = True
+            self.after_idle(self._layout)
+
+    def _layout(self):
+        self._layout_pending = False
+        if not self.sessions:
+            for window_id in self._windows.values():
+                self.canvas.itemconfigure(window_id, state='hidden')
+            return
+
+        viewport_height = max(self.canvas.winfo_height(), self.row_height)
+        top = self.canvas.canvasy(0)
+        first = max(int(top // self.row_height) - self.overscan, 0)
+        last = min(int((top + viewport_height) // self.row_height) + self.overscan, len(self.sessions) - 1)
+        visible_rows = range(first, last + 1)
+
+        # Cards already showing a visible row stay put; the rest are recycled
+        free_cards = []
+        assigned = {}
+        for card in self.cards:
+            row = self._rows.get(card)
+            if row is not None and first <= row <= last and row not in assigned:
+                assigned[row] = card
+            else:
+                free_cards.append(card)
+
+        rebound = False
+        for row in visible_rows:
+            card = assigned.get(row)
+            if card is None:
+                if free_cards:
+                    card = free_cards.pop()
+                    card.bind_session(self.sessions[row])
+                else:
+                    # Grow the pool only up to what the viewport needs
+                    card = self._create_card(self.sessions[row])
+                self._rows[card] = row
+                rebound = True
+            window_id = self._windows[card]
+            self.canvas.coords(window_id, 0, row * self.row_height)
+            self.canvas.itemconfigure(window_id, state='normal')
+
+        for card in free_cards:
+            self._rows.pop(card, None)
+            window_id = self._windows[card]
+            self.canvas.coords(window_id, 0, -self.row_height * 2)
+            self.canvas.itemconfigure(window_id, state='hidden')
+
+        if rebound and not self._measure_pending:
+            # Requested sizes are only known once Tk has computed the new geometry
+            self._measure_pending = True
+            self.after_idle(self._fit_row_height)
+
+    def _fit_row_height(self):
+        """Grow rows to the tallest realized card (never shrink, so scrolling does not jump back and forth)"""
+        self._measure_pending = False
+        tallest = max((card.winfo_reqheight() for card in self.cards), default=0)
+        if tallest + self.row_gap <= self.row_height:
+            return
+        self.row_height = tallest + self.row_gap
+        for window_id in self._windows.values():
+            self.canvas.itemconfigure(window_id, height=tallest)
+        self.canvas.configure(scrollregion=(0, 0, 0, self._content_height()))
+        self._schedule_layout()
+
+    def _create_card(self, session) -> SessionCard:
+        card = self.card_factory(self.canvas, session)
+        window_id = self.canvas.create_window(
+            0, 0, window=card, anchor='nw',
+            width=max(self.canvas.winfo_width(), 1),
+            height=self.row_height - self.row_gap,
+            state='hidden'
+        )
+        self.cards.append(card)
+        self._windows[card] = window_id
+        return card
@@ -1,15 +1,16 @@
-import tkinter as tk
+import threading
 from tkinter import ttk, messagebox
 from typing import List, Callable, Optional
-import threading
-import asyncio
 
 from .components.session_card import SessionCard
 from .components.search_bar import SearchBar
+from .components.virtual_session_list import VirtualSessionList
 from ...domain.entities.generation_session import GenerationSession
 
 
 class HistoryTab(ttk.Frame):
+    SEARCH_LIMIT = 1000
+    
     def __init__(self, parent, list_sessions_use_case, generate_image_callback=None, generate_video_callback=None, loop_video_callback=None):
         super().__init__(parent)
         self.list_sessions_use_case = list_sessions_use_case
@@ -18,11 +19,16 @@ class HistoryTab(ttk.Frame):
         self.loop_video_callback = loop_video_callback
         self.all_sessions = []
         self.filtered_sessions = []
-        self.session_cards = []
+        self._pending_session_ids = set()
+        self._updates_scheduled = False
+        self._index_build_started = False
         
         self.setup_styles()
         self.setup_ui()
         self.refresh_history()
+        
+        # Patch single sessions when storage reports a change instead of reloading everything
+        self.list_sessions_use_case.subscribe_changes(self._on_storage_change)
     
     def setup_styles(self):
         """Configure custom styles for the history tab"""
@@ -88,53 +94,87 @@ class HistoryTab(ttk.Frame):
         )
         refresh_btn.pack(side='left', padx=(0, 10))
         
-        # Sessions container with scrollbar
-        sessions_container = ttk.Frame(main_container)
-        sessions_container.pack(fill='both', expand=True)
-        
-        # Create canvas and scrollbar for scrolling
-        self.canvas = tk.Canvas(sessions_container, highlightthickness=0)
-        scrollbar = ttk.Scrollbar(sessions_container, orient='vertical', command=self.canvas.yview)
-        self.scrollable_frame = ttk.Frame(self.canvas)
-        
-        self.scrollable_frame.bind(
-            "<Configure>",
-            lambda e: self.canvas.configure(scrollregion=self.canvas.bbox("all"))
-        )
-        
-        self.canvas.create_window((0, 0), window=self.scrollable_frame, anchor="nw")
-        self.canvas.configure(yscrollcommand=scrollbar.set)
-        
-        self.canvas.pack(side="left", fill="both", expand=True)
-        scrollbar.pack(side="right", fill="y")
+        # Sessions list: only the cards in the viewport exist as widgets
+        self.session_list = VirtualSessionList(main_container, self._create_session_card)
+        self.session_list.pack(fill='both', expand=True)
+        self.canvas = self.session_list.canvas
         
         # Bind mouse wheel to canvas
         self.canvas.bind("<MouseWheel>", self._on_mousewheel)
         self.bind_all("<MouseWheel>", self._on_mousewheel)
-        
-        # Empty state label (hidden by default)
-        self.empty_label = ttk.Label(
-            self.scrollable_frame,
-            text="📭 No hay canciones generadas aún\n\n¡Ve a la pestaña 'Generar Canción' para crear tu primera canción!",
-            font=('Segoe UI', 12),
-            foreground='#7f8c8d',
-            justify='center'
+    
+    def _create_session_card(self, parent, session: GenerationSession) -> SessionCard:
+        return SessionCard(
+            parent,
+            session,
+            on_generate_image_callback=self.on_generate_image_for_session,
+            on_generate_video_callback=self.on_generate_video_for_session,
+            on_loop_video_callback=self.on_loop_video_for_session
         )
     
+    @property
+    def session_cards(self) -> List[SessionCard]:
+        """Card widgets currently alive (recycled across sessions)"""
+        return self.session_list.cards
+    
     def _on_mousewheel(self, event):
         """Handle mouse wheel scrolling"""
-        self.canvas.yview_scroll(int(-1*(event.delta/120)), "units")
+        self.session_list.scroll_units(int(-1*(event.delta/120)))
     
     def refresh_history(self):
         """Refresh the sessions list"""
         try:
             self.all_sessions = self.list_sessions_use_case.execute()
-            self.apply_filters()
+            self.apply_filters(reset_scroll=False)
             self.update_stats()
         except Exception as e:
             messagebox.showerror("Error", f"Error al cargar el historial: {str(e)}")
     
-    def apply_filters(self):
+    def _on_storage_change(self, session_id: str):
+        """Storage listener; may be called from a worker thread"""
+        self.after(0, self._queue_session_update, session_id)
+    
+    def _queue_session_update(self, session_id: str):
+        # A single action saves metadata several times; coalesce them
+        self._pending_session_ids.add(session_id)
+        if not self._updates_scheduled:
+            self._updates_scheduled = True
+            self.after(150, self._apply_session_updates)
+    
+    def _apply_session_updates(self):
+        """Reload only the sessions that changed and patch them into the list"""
+        self._updates_scheduled = False
+        session_ids, self._pending_session_ids = self._pending_session_ids, set()
+        
+        positions = {session.session_id: i for i, session in enumerate(self.all_sessions)}
+        removed = set()
+        for session_id in session_ids:
+            try:
+                session = self.list_sessions_use_case.get_session_by_id(session_id)
+            except FileNotFoundError:
+                removed.add(session_id)
+                continue
+            except Exception as e:
+                print(f"Error loading session {session_id}: {str(e)}")
+                continue
+            
+            if session_id in positions:
+                self.all_sessions[positions[session_id]] = session
+            else:
+                self.all_sessions.insert(0, session)
+                positions = {s.session_id: i for i, s in enumerate(self.all_sessions)}
+        
+        if removed:
+            self.all_sessions = [s for s in self.all_sessions if s.session_id not in removed]
+        
+        self.apply_filters(reset_scroll=False)
+        self.update_stats()
+    
+    def destroy(self):
+        self.list_sessions_use_case.unsubscribe_changes(self._on_storage_change)
+        super().destroy()
+    
+    def apply_filters(self, reset_scroll: bool = True):
         """Apply current search and filter criteria"""
         search_text = self.search_bar.get_search_text().lower()
         filter_data = self.search_bar.get_filter_data()
@@ -142,14 +182,21 @@ class HistoryTab(ttk.Frame):
         # Start with all sessions
         filtered = self.all_sessions.copy()
         
-        # Apply text search
+        # Apply text search (full-text index, ranked by relevance)
+        ranking = {}
         if search_text:
-            filtered = [
-                session for session in filtered
-                if (search_text in session.request.title.lower() or 
-                    search_text in session.request.style.lower() or
-                    search_text in session.request.prompt.lower())
-            ]
+            try:
+                if not self.list_sessions_use_case.is_search_ready():
+                    # First search: the index is built in the background, substring match meanwhile
+                    self._build_search_index()
+                    filtered = self._substring_match(filtered, search_text)
+                else:
+                    matches = self.list_sessions_use_case.search(search_text, limit=self.SEARCH_LIMIT)
+                    ranking = {session_id: position for position, (session_id, _) in enumerate(matches)}
+                    filtered = [session for session in filtered if session.session_id in ranking]
+            except Exception as e:
+                print(f"Error searching sessions, falling back to substring match: {str(e)}")
+                filtered = self._substring_match(filtered, search_text)
         
         # Apply filter
         filter_type = filter_data['filter']
@@ -170,7 +217,9 @@ class HistoryTab(ttk.Frame):
         
         # Apply sorting
         sort_type = filter_data['sort']
-        if sort_type == "Más recientes":
+        if sort_type == "Relevancia" and ranking:
+            filtered.sort(key=lambda s: ranking[s.session_id])
+        elif sort_type in ("Más recientes", "Relevancia"):
             filtered.sort(key=lambda s: s.timestamp, reverse=True)
         elif sort_type == "Más antiguos":
             filtered.sort(key=lambda s: s.timestamp)
@@ -180,49 +229,47 @@ class HistoryTab(ttk.Frame):
             filtered.sort(key=lambda s: s.request.title.lower(), reverse=True)
         
         self.filtered_sessions = filtered
-        self.display_sessions()
+        self.display_sessions(reset_scroll=reset_scroll)
     
-    def display_sessions(self):
-        """Display the filtered sessions as cards"""
-        # Clear existing cards
-        for card in self.session_cards:
-            card.destroy()
-        self.session_cards.clear()
+    @staticmethod
+    def _substring_match(sessions: List[GenerationSession], search_text: str) -> List[GenerationSession]:
+        return [
+            session for session in sessions
+            if (search_text in session.request.title.lower() or 
+                search_text in session.request.style.lower() or
+                search_text in session.request.prompt.lower())
+        ]
+    
+    def _build_search_index(self):
+        if self._index_build_started:
+            return
+        self._index_build_started = True
         
-        # Hide empty label
-        self.empty_label.pack_forget()
+        def build():
+            try:
+                self.list_sessions_use_case.build_search_index()
+            except Exception as e:
+                print(f"Error building search index: {str(e)}")
+                return
+            self.after(0, self.apply_filters, False)
         
+        threading.Thread(target=build, name="search-index-build", daemon=True).start()
+    
+    def display_sessions(self, reset_scroll: bool = True):
+        """Display the filtered sessions, re-binding only the visible cards"""
         if not self.filtered_sessions:
             # Show empty state
             if not self.all_sessions:
-                self.empty_label.pack(pady=50)
+                self.session_list.show_message(
+                    "📭 No hay canciones generadas aún\n\n¡Ve a la pestaña 'Generar Canción' para crear tu primera canción!"
+                )
             else:
                 # No results from filter
-                no_results = ttk.Label(
-                    self.scrollable_frame,
-                    text="🔍 No se encontraron canciones con los filtros aplicados",
-                    font=('Segoe UI', 11),
-                    foreground='#7f8c8d'
-                )
-                no_results.pack(pady=30)
-                self.session_cards.append(no_results)
-            return
-        
-        # Create cards for each session
-        for i, session in enumerate(self.filtered_sessions):
-            card = SessionCard(
-                self.scrollable_frame,
-                session,
-                on_generate_image_callback=self.on_generate_image_for_session,
-                on_generate_video_callback=self.on_generate_video_for_session,
-                on_loop_video_callback=self.on_loop_video_for_session
-            )
-            card.pack(fill='x', pady=(0, 15))
-            self.session_cards.append(card)
+                self.session_list.show_message("🔍 No se encontraron canciones con los filtros aplicados")
+        else:
+            self.session_list.hide_message()
         
-        # Update canvas scroll region
-        self.scrollable_frame.update_idletasks()
-        self.canvas.configure(scrollregion=self.canvas.bbox("all"))
+        self.session_list.set_sessions(self.filtered_sessions, reset_scroll=reset_scroll)
     
     def update_stats(self):
         """Update the statistics label"""
@@ -245,83 +292,39 @@ class HistoryTab(ttk.Frame):
     def on_generate_image_for_session(self, session: GenerationSession):
         """Handle image generation request for a session"""
         if self.generate_image_callback:
-            # Run in thread to avoid blocking UI
-            thread = threading.Thread(
-                target=self._run_image_generation, 
-                args=(session,),
-                daemon=True
-            )
-            thread.start()
+            self._run_action(self.generate_image_callback, session, "Error al generar imagen")
     
     def on_generate_video_for_session(self, session: GenerationSession):
         """Handle video generation request for a session"""
         if self.generate_video_callback:
-            # Run in thread to avoid blocking UI
-            thread = threading.Thread(
-                target=self._run_video_generation, 
-                args=(session,),
-                daemon=True
-            )
-            thread.start()
-    
-    def _run_image_generation(self, session: GenerationSession):
-        """Run image generation in background thread"""
-        try:
-            # Call the callback which should handle the async generation
-            result = self.generate_image_callback(session)
-            
-            # Refresh history after generation
-            self.after(100, self.refresh_history)
-            
-        except Exception as e:
-            # Show error message in main thread
-            self.after(0, lambda: messagebox.showerror(
-                "Error", 
-                f"Error al generar imagen: {str(e)}"
-            ))
+            self._run_action(self.generate_video_callback, session, "Error al generar video")
     
     def on_loop_video_for_session(self, session: GenerationSession):
         """Handle video loop creation request for a session"""
         if self.loop_video_callback:
-            # Run in thread to avoid blocking UI
-            thread = threading.Thread(
-                target=self._run_loop_video, 
-                args=(session,),
-                daemon=True
-            )
-            thread.start()
+            self._run_action(self.loop_video_callback, session, "Error al crear bucle de video")
     
-    def _run_video_generation(self, session: GenerationSession):
-        """Run video generation in background thread"""
+    def _run_action(self, callback, session: GenerationSession, error_title: str):
+        """
+        Start an action for a session. The callback only confirms and submits the job
+        to the shared background runtime, so it runs on the Tk thread; the history is
+        refreshed by the completion handlers.
+        """
         try:
-            # Call the callback which should handle the async generation
-            result = self.generate_video_callback(session)
-            
-            # Refresh history after generation
-            self.after(100, self.refresh_history)
-            
+            started = callback(session)
         except Exception as e:
-            # Show error message in main thread
-            self.after(0, lambda: messagebox.showerror(
-                "Error", 
-                f"Error al generar video: {str(e)}"
-            ))
+            started = False
+            messagebox.showerror("Error", f"{error_title}: {str(e)}")
+        
+        if not started:
+            # Nothing was started: re-enable the card's buttons
+            self.reset_card(session)
     
-    def _run_loop_video(self, session: GenerationSession):
-        """Run video loop creation in background thread"""
-        try:
-            # Call the callback which should handle the async loop creation
-            result = self.loop_video_callback(session)
-            
-            # Refresh history after generation
-            self.after(100, self.refresh_history)
-            
-        except Exception as e:
-            # Show error message in main thread
-            self.after(0, lambda: messagebox.showerror(
-                "Error", 
-                f"Error al crear bucle de video: {str(e)}"
-            ))
+    def reset_card(self, session: GenerationSession):
+        for card in self.session_cards:
+            if card.session is not None and card.session.session_id == session.session_id:
+                card.reset_processing_state()
+                card.build_controls()
     
     def get_selected_session(self) -> Optional[GenerationSession]:
         """Get the currently selected session (for compatibility)"""
@@ -1,7 +1,5 @@
 import tkinter as tk
 from tkinter import ttk, scrolledtext, messagebox
-import asyncio
-import threading
 from typing import Optional
 
 from ...domain.entities.song_request import SongRequest, ModelVersion
@@ -14,6 +12,7 @@ from ...infrastructure.adapters.openai_lyrics_client import OpenAILyricsClient
 from ...application.use_cases.generate_song import GenerateSongUseCase
 from ...application.use_cases.list_sessions import ListSessionsUseCase
 from .history_tab import HistoryTab
+from .async_runtime import AsyncRuntime
 from .styles import ThemeManager
 from .settings_window import SettingsWindow
 from ...infrastructure.config.settings import ConfigManager
@@ -30,6 +29,10 @@ class MainWindow:
         # Configure styles after creating the main window
         ThemeManager.setup_styles()
 
+        # Shared background event loop for every async action started from the GUI
+        self.runtime = AsyncRuntime(self.root)
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+
         # Initialize config manager and usage tracker
         self.config_manager = ConfigManager()
         self.usage_tracker = get_tracker()
@@ -319,6 +322,10 @@ class MainWindow:
         
         ttk.Button(buttons_frame, text="Limpiar", command=self.clear_form).pack(side='left')
         
+        self.cancel_button = ttk.Button(buttons_frame, text="Cancelar",
+                                        command=self.cancel_all_jobs)
+        self.cancel_button.pack(side='right')
+        
         # Progress frame
         progress_frame = ttk.LabelFrame(main_frame, text="Progreso")
         progress_frame.pack(fill='x')
@@ -362,12 +369,7 @@ class MainWindow:
                 return False
             
             # Run generation in background thread
-            thread = threading.Thread(
-                target=self.run_image_generation_for_session, 
-                args=(session,),
-                daemon=True
-            )
-            thread.start()
+            self.run_image_generation_for_session(session)
             return True
             
         except Exception as e:
@@ -400,12 +402,7 @@ class MainWindow:
                 return False
             
             # Run generation in background thread
-            thread = threading.Thread(
-                target=self.run_video_generation_for_session, 
-                args=(session,),
-                daemon=True
-            )
-            thread.start()
+            self.run_video_generation_for_session(session)
             return True
             
         except Exception as e:
@@ -434,12 +431,7 @@ class MainWindow:
                 return False
             
             # Run loop creation in background thread
-            thread = threading.Thread(
-                target=self.run_loop_video_for_session, 
-                args=(session,),
-                daemon=True
-            )
-            thread.start()
+            self.run_loop_video_for_session(session)
             return True
             
         except Exception as e:
@@ -470,38 +462,26 @@ class MainWindow:
             self.progress_var.set("Generando letra con IA...")
             self.progress_bar.start()
 
-            # Run generation in background thread
-            thread = threading.Thread(
-                target=self.run_lyrics_generation,
-                args=(description,),
-                daemon=True
-            )
-            thread.start()
+            # Run generation on the background runtime
+            self.run_lyrics_generation(description)
 
         except Exception as e:
             messagebox.showerror("Error", f"Error al generar letra: {str(e)}")
             self.generate_lyrics_button.config(state='normal')
 
     def run_lyrics_generation(self, description: str):
-        """Run lyrics generation in background thread"""
-        try:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-
-            lyrics = loop.run_until_complete(
-                self.openai_client.generate_lyrics(
-                    description,
-                    self.update_progress,
-                    session_id="lyrics_generation"
-                )
-            )
-
-            self.root.after(0, self.lyrics_generation_completed, lyrics)
-
-        except Exception as e:
-            self.root.after(0, self.lyrics_generation_failed, str(e))
-        finally:
-            loop.close()
+        """Run lyrics generation on the background runtime"""
+        return self.runtime.submit(
+            self.openai_client.generate_lyrics(
+                description,
+                self.update_progress,
+                session_id="lyrics_generation"
+            ),
+            on_success=self.lyrics_generation_completed,
+            on_error=lambda e: self.lyrics_generation_failed(str(e)),
+            on_cancel=lambda: self.lyrics_generation_failed("Generación cancelada"),
+            name="lyrics"
+        )
 
     def lyrics_generation_completed(self, lyrics: str):
         """Handle successful lyrics generation"""
@@ -570,32 +550,23 @@ class MainWindow:
             self.generate_button.config(state='disabled')
             self.progress_bar.start()
             
-            thread = threading.Thread(target=self.run_generation, args=(request,))
-            thread.daemon = True
-            thread.start()
+            self.run_generation(request)
             
         except Exception as e:
             messagebox.showerror("Error", f"Error al crear la petición: {str(e)}")
     
     def run_generation(self, request: SongRequest):
-        try:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            
-            session = loop.run_until_complete(
-                self.generate_use_case.execute(
-                    request, 
-                    self.update_progress, 
-                    self.generate_image_var.get()
-                )
-            )
-            
-            self.root.after(0, self.generation_completed, session)
-            
-        except Exception as e:
-            self.root.after(0, self.generation_failed, str(e))
-        finally:
-            loop.close()
+        return self.runtime.submit(
+            self.generate_use_case.execute(
+                request, 
+                self.update_progress, 
+                self.generate_image_var.get()
+            ),
+            on_success=self.generation_completed,
+            on_error=lambda e: self.generation_failed(str(e)),
+            on_cancel=lambda: self.generation_failed("Generación cancelada"),
+            name="song"
+        )
     
     def update_progress(self, message: str):
         self.root.after(0, lambda: self.progress_var.set(message))
@@ -607,8 +578,6 @@ class MainWindow:
         
         messagebox.showinfo("Éxito", 
                           f"Canción generada exitosamente.\nGuardada en: {session.output_directory}")
-        
-        self.refresh_history()
     
     def generation_failed(self, error_message: str):
         self.progress_bar.stop()
@@ -631,34 +600,27 @@ class MainWindow:
     
     def run_image_generation_for_session(self, session):
         """
-        Ejecuta la generación de imagen para una sesión específica en un hilo separado
+        Ejecuta la generación de imagen para una sesión específica en el runtime compartido
         """
-        try:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            
-            # Crear caso de uso de imagen
-            from ...application.use_cases.generate_image import GenerateImageUseCase
-            generate_image_use_case = GenerateImageUseCase(self.image_client, self.file_storage)
-            
-            # Crear prompt basado en la información de la canción
-            image_prompt = f"{session.request.title}: {session.request.prompt}"
-            
-            # Generar imagen
-            updated_session = loop.run_until_complete(
-                generate_image_use_case.execute(
-                    session, 
-                    image_prompt, 
-                    self.update_image_generation_progress
-                )
-            )
-            
-            self.root.after(0, self.image_generation_completed, updated_session)
-            
-        except Exception as e:
-            self.root.after(0, self.image_generation_failed, str(e))
-        finally:
-            loop.close()
+        # Crear caso de uso de imagen
+        from ...application.use_cases.generate_image import GenerateImageUseCase
+        generate_image_use_case = GenerateImageUseCase(self.image_client, self.file_storage)
+        
+        # Crear prompt basado en la información de la canción
+        image_prompt = f"{session.request.title}: {session.request.prompt}"
+        
+        # Generar imagen
+        return self.runtime.submit(
+            generate_image_use_case.execute(
+                session, 
+                image_prompt, 
+                self.update_image_generation_progress
+            ),
+            on_success=self.image_generation_completed,
+            on_error=lambda e: self.image_generation_failed(str(e)),
+            on_cancel=self.reset_all_cards_processing_state,
+            name=f"image:{session.session_id}"
+        )
     
     def update_image_generation_progress(self, message: str):
         """
@@ -687,8 +649,7 @@ class MainWindow:
         # Reset processing state in the card
         self.reset_card_processing_state(session)
 
-        # Refrescar historial para mostrar los nuevos datos
-        self.refresh_history()
+        # El historial se actualiza solo a partir de los eventos del almacenamiento
         
         # Actualizar detalles si esta sesión sigue seleccionada
         selection = self.sessions_tree.selection()
@@ -712,30 +673,23 @@ class MainWindow:
     
     def run_video_generation_for_session(self, session):
         """
-        Ejecuta la generación de video para una sesión específica en un hilo separado
+        Ejecuta la generación de video para una sesión específica en el runtime compartido
         """
-        try:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            
-            # Crear caso de uso de video
-            from ...application.use_cases.generate_video import GenerateVideoUseCase
-            generate_video_use_case = GenerateVideoUseCase(self.video_client, self.file_storage)
-            
-            # Generar video animado
-            updated_session = loop.run_until_complete(
-                generate_video_use_case.execute(
-                    session, 
-                    self.update_video_generation_progress
-                )
-            )
-            
-            self.root.after(0, self.video_generation_completed, updated_session)
-            
-        except Exception as e:
-            self.root.after(0, self.video_generation_failed, str(e))
-        finally:
-            loop.close()
+        # Crear caso de uso de video
+        from ...application.use_cases.generate_video import GenerateVideoUseCase
+        generate_video_use_case = GenerateVideoUseCase(self.video_client, self.file_storage)
+        
+        # Generar video animado
+        return self.runtime.submit(
+            generate_video_use_case.execute(
+                session, 
+                self.update_video_generation_progress
+            ),
+            on_success=self.video_generation_completed,
+            on_error=lambda e: self.video_generation_failed(str(e)),
+            on_cancel=self.reset_all_cards_processing_state,
+            name=f"video:{session.session_id}"
+        )
     
     def update_video_generation_progress(self, message: str):
         """
@@ -760,8 +714,7 @@ class MainWindow:
         # Reset processing state in the card
         self.reset_card_processing_state(session)
 
-        # Refrescar historial para mostrar los nuevos datos
-        self.refresh_history()
+        # El historial se actualiza solo a partir de los eventos del almacenamiento
     
     def video_generation_failed(self, error_message: str):
         """
@@ -773,30 +726,23 @@ class MainWindow:
     
     def run_loop_video_for_session(self, session):
         """
-        Ejecuta la creación de bucle de video para una sesión específica en un hilo separado
+        Ejecuta la creación de bucle de video para una sesión específica en el runtime compartido
         """
-        try:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            
-            # Crear caso de uso de bucle de video
-            from ...application.use_cases.loop_video import LoopVideoUseCase
-            loop_video_use_case = LoopVideoUseCase(self.video_client, self.file_storage)
-            
-            # Crear bucle de video
-            updated_session = loop.run_until_complete(
-                loop_video_use_case.execute(
-                    session, 
-                    self.update_loop_video_progress
-                )
-            )
-            
-            self.root.after(0, self.loop_video_completed, updated_session)
-            
-        except Exception as e:
-            self.root.after(0, self.loop_video_failed, str(e))
-        finally:
-            loop.close()
+        # Crear caso de uso de bucle de video
+        from ...application.use_cases.loop_video import LoopVideoUseCase
+        loop_video_use_case = LoopVideoUseCase(self.video_client, self.file_storage)
+        
+        # Crear bucle de video
+        return self.runtime.submit(
+            loop_video_use_case.execute(
+                session, 
+                self.update_loop_video_progress
+            ),
+            on_success=self.loop_video_completed,
+            on_error=lambda e: self.loop_video_failed(str(e)),
+            on_cancel=self.reset_all_cards_processing_state,
+            name=f"loop:{session.session_id}"
+        )
     
     def update_loop_video_progress(self, message: str):
         """
@@ -820,8 +766,7 @@ class MainWindow:
         # Reset processing state in the card
         self.reset_card_processing_state(session)
 
-        # Refrescar historial para mostrar los nuevos datos
-        self.refresh_history()
+        # El historial se actualiza solo a partir de los eventos del almacenamiento
     
     def loop_video_failed(self, error_message: str):
         """
@@ -850,5 +795,13 @@ class MainWindow:
         if hasattr(self, 'history_tab'):
             self.history_tab.refresh_history()
     
+    def cancel_all_jobs(self):
+        """Cancel every generation still running on the background runtime"""
+        self.runtime.cancel_all()
+    
+    def on_close(self):
+        self.runtime.shutdown()
+        self.root.destroy()
+    
     def run(self):
         self.root.mainloop()
\ No newline at end of file
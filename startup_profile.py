@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Startup profiling: boot phase timings, RSS and heavy dependencies loaded.
+Run directly to check the import-time budget of the web app:
+
+    python startup_profile.py [module] [--budget-ms 1500]
+"""
+
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from src.infrastructure.adapters.lazy_module import HEAVY_MODULES, loaded_heavy_modules
+
+DEFAULT_IMPORT_BUDGET_MS = 1500
+
+
+def rss_mb() -> Optional[float]:
+    """Current resident memory (peak RSS where /proc is not available)"""
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # kB en Linux, bytes en macOS
+        return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        return None
+
+
+class StartupProfile:
+    """Timestamps of the boot phases of a process, measured from ``started``"""
+
+    def __init__(self, started: Optional[float] = None):
+        self.started = started if started is not None else time.perf_counter()
+        self.marks: List[Tuple[str, float]] = []
+
+    def mark(self, phase: str):
+        self.marks.append((phase, time.perf_counter()))
+
+    def report(self) -> Dict:
+        phases = {}
+        previous = self.started
+        for phase, at in self.marks:
+            phases[phase] = round((at - previous) * 1000, 1)
+            previous = at
+        rss = rss_mb()
+        return {
+            "phases_ms": phases,
+            "total_ms": round((previous - self.started) * 1000, 1),
+            "rss_mb": round(rss, 1) if rss is not None else None,
+            "heavy_modules": loaded_heavy_modules()
+        }
+
+    def print_report(self):
+        data = self.report()
+        phases = ", ".join(f"{phase} {ms:.0f} ms" for phase, ms in data["phases_ms"].items())
+        rss = f"{data['rss_mb']:.0f} MB" if data["rss_mb"] is not None else "n/a"
+        heavy = ", ".join(data["heavy_modules"]) or "none"
+        print(f"Startup: {data['total_ms']:.0f} ms ({phases}), RSS {rss}, heavy modules loaded: {heavy}")
+
+
+def measure_import(module: str) -> Tuple[Optional[float], List[str], str]:
+    """
+    Import ``module`` in a fresh interpreter with -X importtime.
+    Returns (cumulative ms, heavy modules it loaded, error output if it failed).
+    """
+    code = (
+        f"import {module}, sys; "
+        f"print('HEAVY:' + ','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True, text=True,
+        cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+    if result.returncode != 0:
+        return None, [], result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "import failed"
+
+    # "import time: self [us] | cumulative | imported package"
+    cumulative_us = None
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) == 3 and parts[2].strip() == module:
+            cumulative_us = int(parts[1])
+    heavy = []
+    for line in result.stdout.splitlines():
+        if line.startswith("HEAVY:"):
+            heavy = [m for m in line[len("HEAVY:"):].split(",") if m]
+    return (cumulative_us / 1000 if cumulative_us is not None else None), heavy, ""
+
+
+def check_import_budget(module: str = "web_app_secure", budget_ms: Optional[float] = None) -> Optional[bool]:
+    """Print the import cost of ``module``. True/False = within budget or not; None = could not import"""
+    if budget_ms is None:
+        budget_ms = float(os.getenv("IMPORT_BUDGET_MS", DEFAULT_IMPORT_BUDGET_MS))
+    elapsed_ms, heavy, error = measure_import(module)
+    if elapsed_ms is None:
+        print(f"[SKIP] Import time of {module}: {error}")
+        return None
+
+    ok = elapsed_ms <= budget_ms and not heavy
+    status = "OK" if ok else "SLOW"
+    print(f"[{status}] Import time of {module}: {elapsed_ms:.0f} ms (budget {budget_ms:.0f} ms)")
+    if heavy:
+        print(f"  Heavy modules imported eagerly: {', '.join(heavy)}")
+    return ok
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    budget = None
+    if "--budget-ms" in args:
+        index = args.index("--budget-ms")
+        budget = float(args[index + 1])
+        del args[index:index + 2]
+    result = check_import_budget(args[0] if args else "web_app_secure", budget)
+    sys.exit(0 if result is not False else 1)
@@ -2,10 +2,20 @@
 
 // Global state
 let ws = null;
-let clientId = generateUUID();
+// Stable per tab, so a reconnect is recognised as the same client
+let clientId = sessionStorage.getItem('wsClientId') || generateUUID();
+sessionStorage.setItem('wsClientId', clientId);
+// job_id -> last seen event seq, used to replay missed events after a reconnect
+let jobCursors = JSON.parse(sessionStorage.getItem('jobCursors') || '{}');
+let keepAliveTimer = null;
+// Job commands not yet acknowledged by a job_started event, resent after a reconnect
+let pendingJobCommands = {};
 let currentSessions = [];
+let displayedSessions = [];
 let currentUser = null;
 let currentGeneratingSessionId = null;
+// Text streamed so far for the lyrics job in progress (deltas carry their offset)
+let streamedLyrics = '';
 
 // Initialize app
 document.addEventListener('DOMContentLoaded', () => {
@@ -111,8 +121,14 @@ function initWebSocket() {
 
     ws.onopen = () => {
         console.log('✅ WebSocket connected');
+        // Ask for any job events missed while disconnected
+        ws.send(JSON.stringify({ command: 'resume', cursors: jobCursors }));
+        // Retry commands whose acknowledgement was lost; the idempotency key prevents a second job
+        Object.values(pendingJobCommands).forEach(payload => ws.send(JSON.stringify(payload)));
+
         // Keep-alive ping every 30 seconds
-        setInterval(() => {
+        clearInterval(keepAliveTimer);
+        keepAliveTimer = setInterval(() => {
             if (ws.readyState === WebSocket.OPEN) {
                 ws.send(JSON.stringify({ command: 'ping' }));
             }
@@ -135,13 +151,60 @@ function initWebSocket() {
     };
 }
 
+// Send a generation command with an idempotency key (retries map to the same job)
+function sendJobCommand(payload) {
+    payload.idempotency_key = generateUUID();
+    pendingJobCommands[payload.idempotency_key] = payload;
+    ws.send(JSON.stringify(payload));
+}
+
+// Remember the last event seen per job (terminal events close the job)
+function trackJobEvent(data) {
+    if (!data.job_id || !data.seq) return true;
+
+    const lastSeq = jobCursors[data.job_id] || 0;
+    if (data.seq <= lastSeq) return false;  // Already handled (replay overlap)
+
+    if (data.type === 'complete' || data.type === 'error') {
+        delete jobCursors[data.job_id];
+    } else {
+        jobCursors[data.job_id] = data.seq;
+    }
+    sessionStorage.setItem('jobCursors', JSON.stringify(jobCursors));
+    return true;
+}
+
 // Handle WebSocket messages
 function handleWebSocketMessage(data) {
     console.log('📨 WebSocket message:', data);
 
+    if (data.type === 'resume') {
+        data.events.forEach(handleWebSocketMessage);
+        return;
+    }
+
+    // Resubmission attached to an existing job: stop retrying this key
+    if (data.type === 'job_ack') {
+        if (data.idempotency_key) {
+            delete pendingJobCommands[data.idempotency_key];
+        }
+        return;
+    }
+
+    if (!trackJobEvent(data)) return;
+
     switch (data.type) {
+        case 'job_started':
+            if (data.idempotency_key) {
+                delete pendingJobCommands[data.idempotency_key];
+            }
+            break;
+        case 'delta':
+            if (data.kind === 'lyrics') appendLyricsDelta(data.offset, data.text);
+            break;
         case 'progress':
-            updateProgress(data.message);
+            if (data.kind === 'lyrics') break;  // The streamed text is the progress
+            updateProgress(data.message, data.progress);
             // Check for image completion
             if (data.message.includes('¡Imagen generada!') || data.message.includes('Imagen guardada:')) {
                 loadCurrentSessionPreview();
@@ -156,10 +219,18 @@ function handleWebSocketMessage(data) {
             }
             break;
         case 'complete':
-            handleGenerationComplete(data.data);
+            if (data.kind === 'lyrics') {
+                finishLyricsGeneration(data.data, null);
+            } else {
+                handleGenerationComplete(data.data);
+            }
             break;
         case 'error':
-            handleGenerationError(data.error);
+            if (data.kind === 'lyrics') {
+                finishLyricsGeneration(null, data.error);
+            } else {
+                handleGenerationError(data.error);
+            }
             break;
         case 'pong':
             // Keep-alive response
@@ -186,10 +257,20 @@ function updateStatusIndicator(status) {
     const indicator = document.getElementById('statusIndicator');
     const statusText = indicator.querySelector('.status-text');
 
-    if (status.ready) {
+    // Salud de la última validación (cacheada en el servidor, sin sondeo en vivo)
+    const failing = Object.entries(status.health || {})
+        .filter(([, health]) => health.status === 'error');
+
+    if (status.ready && failing.length) {
+        indicator.classList.remove('ready');
+        indicator.classList.add('error');
+        statusText.textContent = 'Error de API';
+        indicator.title = failing.map(([, health]) => health.message).join('\n');
+    } else if (status.ready) {
         indicator.classList.add('ready');
         indicator.classList.remove('error');
         statusText.textContent = 'Listo';
+        indicator.title = '';
     } else {
         indicator.classList.remove('ready');
         indicator.classList.add('error');
@@ -265,7 +346,7 @@ async function validateAPIs() {
     btn.innerHTML = '<span class="loading"></span> Validando...';
 
     try {
-        const response = await fetch('/api/validate-apis', { method: 'POST' });
+        const response = await fetch('/api/validate-apis?refresh=true', { method: 'POST' });
         const data = await response.json();
 
         const results = data.results;
@@ -294,15 +375,24 @@ async function generateLyrics() {
         return;
     }
 
+    const forceFresh = document.getElementById('forceFreshLyricsInput').checked;
     const btn = document.getElementById('generateLyricsBtn');
     btn.disabled = true;
     btn.innerHTML = '<span class="loading"></span> Generando...';
 
+    // Con WebSocket la letra llega token a token al textarea
+    if (ws && ws.readyState === WebSocket.OPEN) {
+        streamedLyrics = '';
+        document.getElementById('lyricsInput').value = '';
+        sendJobCommand({ command: 'generate_lyrics', description, force_fresh: forceFresh });
+        return;
+    }
+
     try {
         const response = await fetch('/api/generate-lyrics', {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ description })
+            body: JSON.stringify({ description, force_fresh: forceFresh })
         });
 
         if (!response.ok) {
@@ -311,7 +401,7 @@ async function generateLyrics() {
 
         const data = await response.json();
         document.getElementById('lyricsInput').value = data.lyrics;
-        showToast('✨ Letra generada con éxito', 'success');
+        showToast(data.cached ? '♻️ Letra recuperada de la caché' : '✨ Letra generada con éxito', 'success');
     } catch (error) {
         console.error('Error generating lyrics:', error);
         showToast(`Error al generar letra: ${error.message}`, 'error');
@@ -321,6 +411,29 @@ async function generateLyrics() {
     }
 }
 
+// Append a streamed lyrics fragment; fragments already shown (replays) are skipped
+function appendLyricsDelta(offset, text) {
+    if (offset > streamedLyrics.length) return;  // Gap: the complete event brings the full text
+    streamedLyrics = streamedLyrics.slice(0, offset) + text;
+    const lyricsInput = document.getElementById('lyricsInput');
+    lyricsInput.value = streamedLyrics;
+    lyricsInput.scrollTop = lyricsInput.scrollHeight;
+}
+
+function finishLyricsGeneration(result, error) {
+    const btn = document.getElementById('generateLyricsBtn');
+    btn.disabled = false;
+    btn.innerHTML = '✨ Generar Letra con IA';
+    streamedLyrics = '';
+
+    if (error) {
+        showToast(`Error al generar letra: ${error}`, 'error');
+        return;
+    }
+    document.getElementById('lyricsInput').value = result.lyrics;
+    showToast(result.cached ? '♻️ Letra recuperada de la caché' : '✨ Letra generada con éxito', 'success');
+}
+
 // Generate song
 function generateSong() {
     const lyrics = document.getElementById('lyricsInput').value.trim();
@@ -356,10 +469,10 @@ function generateSong() {
 
     // Send via WebSocket
     if (ws && ws.readyState === WebSocket.OPEN) {
-        ws.send(JSON.stringify({
+        sendJobCommand({
             command: 'generate_song',
             request: request
-        }));
+        });
 
         // Show progress
         showProgress('Iniciando generación de canción...');
@@ -401,7 +514,7 @@ function showProgress(message) {
     }, 100);
 }
 
-function updateProgress(message) {
+function updateProgress(message, serverProgress = null) {
     const progressText = document.getElementById('progressText');
     const progressFill = document.getElementById('progressFill');
     const progressSection = document.getElementById('progressSection');
@@ -412,12 +525,13 @@ function updateProgress(message) {
     // Show progress section
     progressSection.style.display = 'block';
 
-    // Calculate progress percentage based on message keywords
+    // Progress percentage: from the server event, or guessed from message keywords
     let progress = 0;
     const msg = message.toLowerCase();
 
-    // Determine progress based on keywords
-    if (msg.includes('iniciando') || msg.includes('creando sesión')) {
+    if (typeof serverProgress === 'number' && !msg.includes('error')) {
+        progress = serverProgress;
+    } else if (msg.includes('iniciando') || msg.includes('creando sesión')) {
         progress = 5;
     } else if (msg.includes('enviando') || msg.includes('petición')) {
         progress = 15;
@@ -517,6 +631,7 @@ async function refreshHistory() {
 // Render sessions
 async function renderSessions(sessions) {
     const sessionsList = document.getElementById('sessionsList');
+    displayedSessions = sessions;
 
     if (sessions.length === 0) {
         sessionsList.innerHTML = '<p class="empty-state">No hay sesiones generadas aún</p>';
@@ -557,6 +672,7 @@ async function renderSessions(sessions) {
                     ${!session.has_image ? `<button class="px-3 py-1.5 text-xs bg-slate-700 hover:bg-slate-600 text-white rounded-md transition" onclick="generateImageForSession('${session.session_id}')">📸 Imagen</button>` : ''}
                     ${session.has_image && !session.has_video ? `<button class="px-3 py-1.5 text-xs bg-slate-700 hover:bg-slate-600 text-white rounded-md transition" onclick="generateVideoForSession('${session.session_id}')">🎬 Video</button>` : ''}
                     ${session.has_video ? `<button class="px-3 py-1.5 text-xs bg-slate-700 hover:bg-slate-600 text-white rounded-md transition" onclick="loopVideoForSession('${session.session_id}')">🔄 Loop</button>` : ''}
+                    <button class="px-3 py-1.5 text-xs bg-slate-700 hover:bg-slate-600 text-white rounded-md transition" onclick="exportSession('${session.session_id}')">⬇️ ZIP</button>
                 </div>
             </div>
         </div>
@@ -568,14 +684,68 @@ async function renderSessions(sessions) {
     }
 }
 
-// Filter sessions
+// Export sessions as a streamed ZIP (the browser downloads it directly)
+function exportSession(sessionId) {
+    window.location.href = `/api/sessions/${encodeURIComponent(sessionId)}/export`;
+}
+
+function exportDisplayedSessions() {
+    const searchTerm = document.getElementById('searchInput').value.trim();
+    if (!searchTerm) {
+        window.location.href = '/api/sessions/export';
+        return;
+    }
+    if (displayedSessions.length === 0) {
+        showToast('No hay sesiones para exportar', 'error');
+        return;
+    }
+    const ids = displayedSessions.map(session => encodeURIComponent(session.session_id)).join(',');
+    window.location.href = `/api/sessions/export?ids=${ids}`;
+}
+
+// Filter sessions (debounced server-side full-text search)
+const SEARCH_DEBOUNCE_MS = 300;
+let searchDebounceTimer = null;
+let searchController = null;
+
 function filterSessions() {
-    const searchTerm = document.getElementById('searchInput').value.toLowerCase();
-    const filtered = currentSessions.filter(session =>
-        session.title.toLowerCase().includes(searchTerm) ||
-        session.style.toLowerCase().includes(searchTerm)
-    );
-    renderSessions(filtered);
+    clearTimeout(searchDebounceTimer);
+    searchDebounceTimer = setTimeout(runSessionSearch, SEARCH_DEBOUNCE_MS);
+}
+
+async function runSessionSearch() {
+    const searchTerm = document.getElementById('searchInput').value.trim();
+
+    // Drop any in-flight search so a slow response can't overwrite a newer one
+    if (searchController) {
+        searchController.abort();
+        searchController = null;
+    }
+
+    if (!searchTerm) {
+        renderSessions(currentSessions);
+        return;
+    }
+
+    searchController = new AbortController();
+    try {
+        const response = await fetch(
+            `/api/sessions/search?q=${encodeURIComponent(searchTerm)}&limit=50`,
+            { signal: searchController.signal }
+        );
+        if (!response.ok) throw new Error(`HTTP ${response.status}`);
+        const data = await response.json();
+        renderSessions(data.sessions);
+    } catch (error) {
+        if (error.name === 'AbortError') return;
+        console.error('Error searching sessions:', error);
+        // Fall back to filtering what is already loaded
+        const term = searchTerm.toLowerCase();
+        renderSessions(currentSessions.filter(session =>
+            session.title.toLowerCase().includes(term) ||
+            session.style.toLowerCase().includes(term)
+        ));
+    }
 }
 
 // Format date
@@ -652,12 +822,16 @@ async function openSessionDetail(sessionId) {
                 <div class="session-detail">
                     <h3>Video Animado</h3>
                     <div class="media-preview">
-                        <video controls src="${session.video_file.url}"></video>
+                        <video controls id="detailVideo"></video>
                     </div>
                 </div>
             ` : ''}
         `;
 
+        if (session.video_file) {
+            attachVideoSource(document.getElementById('detailVideo'), session.video_file);
+        }
+
         modal.classList.add('active');
     } catch (error) {
         console.error('Error loading session detail:', error);
@@ -673,10 +847,10 @@ function closeSessionModal() {
 // Generate image for session
 function generateImageForSession(sessionId) {
     if (ws && ws.readyState === WebSocket.OPEN) {
-        ws.send(JSON.stringify({
+        sendJobCommand({
             command: 'generate_image',
             session_id: sessionId
-        }));
+        });
 
         showToast('🖼️ Generando imagen...', 'success');
     } else {
@@ -687,10 +861,10 @@ function generateImageForSession(sessionId) {
 // Generate video for session
 function generateVideoForSession(sessionId) {
     if (ws && ws.readyState === WebSocket.OPEN) {
-        ws.send(JSON.stringify({
+        sendJobCommand({
             command: 'generate_video',
             session_id: sessionId
-        }));
+        });
 
         showProgress('🎬 Iniciando generación de video animado...');
         showToast('🎬 Generando video...', 'success');
@@ -754,11 +928,11 @@ function applySubtitleConfigAndGenerate() {
 
     // Send command with configuration
     if (ws && ws.readyState === WebSocket.OPEN) {
-        ws.send(JSON.stringify({
+        sendJobCommand({
             command: 'loop_video',
             session_id: currentLoopSessionId,
             subtitle_config: config
-        }));
+        });
 
         showProgress('🔄 Iniciando creación de loop con subtítulos personalizados...');
         showToast('🔄 Recreando bucle de video con tu configuración...', 'success');
@@ -904,11 +1078,10 @@ async function loadSessionContent(sessionId) {
             videoDiv.innerHTML = `
                 <div>
                     <label class="text-xs text-gray-400 block mb-1">Video Loop</label>
-                    <video controls preload="metadata" class="w-full rounded-lg" style="max-height: 300px;">
-                        <source src="${session.video_file.url}" type="video/mp4">
-                    </video>
+                    <video controls preload="metadata" class="w-full rounded-lg" style="max-height: 300px;"></video>
                 </div>
             `;
+            attachVideoSource(videoDiv.querySelector('video'), session.video_file);
         }
     } catch (error) {
         console.error('Error loading session content:', error);
@@ -916,6 +1089,41 @@ async function loadSessionContent(sessionId) {
     }
 }
 
+// Attach a video source: adaptive HLS when available, faststart MP4 otherwise
+function attachVideoSource(video, videoFile) {
+    if (!video || !videoFile) return;
+
+    if (video._hls) {
+        video._hls.destroy();
+        video._hls = null;
+    }
+
+    if (videoFile.hls_url) {
+        if (video.canPlayType('application/vnd.apple.mpegurl')) {
+            // Safari / iOS play HLS natively
+            video.src = videoFile.hls_url;
+            return;
+        }
+        if (window.Hls && Hls.isSupported()) {
+            const hls = new Hls();
+            hls.on(Hls.Events.ERROR, (event, data) => {
+                if (data.fatal) {
+                    // Fall back to the progressive MP4
+                    hls.destroy();
+                    video._hls = null;
+                    video.src = videoFile.url;
+                }
+            });
+            hls.loadSource(videoFile.hls_url);
+            hls.attachMedia(video);
+            video._hls = hls;
+            return;
+        }
+    }
+
+    video.src = videoFile.url;
+}
+
 // Display session preview
 function displaySessionPreview(session) {
     const previewSection = document.getElementById('previewSection');
@@ -958,7 +1166,7 @@ function displaySessionPreview(session) {
     // Show video if available
     if (session.video_file && session.video_file.url) {
         const video = document.getElementById('previewVideo');
-        video.src = session.video_file.url;
+        attachVideoSource(video, session.video_file);
         videoPreview.style.display = 'block';
         hasContent = true;
         console.log('✅ Showing video preview');
@@ -5,6 +5,10 @@ VideoMusic Generator - Secure Web Application
 FastAPI backend with Authentication, WebSocket support and API validation
 """
 
+import time
+
+_boot_started = time.perf_counter()
+
 import asyncio
 import json
 import os
@@ -12,7 +16,7 @@ import sys
 import io
 from pathlib import Path
 from typing import Optional, Dict, List
-from datetime import datetime
+from datetime import datetime, timedelta
 import uuid
 from contextlib import asynccontextmanager
 
@@ -23,7 +27,7 @@ if sys.platform == 'win32':
 
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Depends, Cookie, Response, Request
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse, FileResponse, JSONResponse, RedirectResponse
+from fastapi.responses import HTMLResponse, FileResponse, JSONResponse, RedirectResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 
@@ -37,6 +41,12 @@ from src.infrastructure.adapters.local_file_storage import LocalFileStorage
 from src.infrastructure.adapters.replicate_image_client import ReplicateImageClient
 from src.infrastructure.adapters.replicate_video_client import ReplicateVideoClient
 from src.infrastructure.adapters.openai_lyrics_client import OpenAILyricsClient
+from src.infrastructure.adapters.lyrics_result_cache import LyricsResultCache, CachedLyricsClient
+from src.infrastructure.adapters.image_prompt_cache import ImagePromptCache
+from src.infrastructure.adapters.storage_janitor import StorageJanitor
+from src.infrastructure.adapters.usage_tracker import get_tracker, shutdown_tracker
+from src.infrastructure.adapters.video_streaming_packager import VideoStreamingPackager
+from src.infrastructure.adapters.session_zip_exporter import SessionZipExporter
 from src.application.use_cases.generate_song import GenerateSongUseCase
 from src.application.use_cases.generate_image import GenerateImageUseCase
 from src.application.use_cases.generate_video import GenerateVideoUseCase
@@ -46,6 +56,13 @@ from src.application.use_cases.list_sessions import ListSessionsUseCase
 # Import our new modules
 from database import Database
 from api_validator import APIValidator
+from artifact_server import ArtifactServer
+from job_events import JobEventHub, request_fingerprint
+from startup_profile import StartupProfile
+
+# Boot phases (imports, module init, lifespan startup) reported once the app is up
+startup_profile = StartupProfile(_boot_started)
+startup_profile.mark("imports")
 
 # Lifespan handler
 @asynccontextmanager
@@ -53,6 +70,13 @@ async def lifespan(app: FastAPI):
     """Application lifespan events"""
     # Startup
     db.cleanup_expired_sessions()
+    # Intermedios abandonados, cuotas, espacio libre y blobs sin referencias; luego periódicamente
+    await run_storage_janitor()
+    janitor_task = None
+    if storage_janitor.settings.janitor_interval_minutes > 0:
+        janitor_task = asyncio.create_task(storage_janitor_loop())
+    startup_profile.mark("startup")
+    startup_profile.print_report()
     print("VideoMusic Generator Web App (Secure)")
     print("Output directory: output/")
     print("Authentication enabled")
@@ -60,8 +84,36 @@ async def lifespan(app: FastAPI):
     print("\nDefault credentials: admin / admin123")
     print("CHANGE THE PASSWORD IMMEDIATELY!\n")
     yield
-    # Shutdown (if needed)
-    pass
+    if janitor_task:
+        janitor_task.cancel()
+    # Shutdown: persist usage events still queued for the background writer
+    shutdown_tracker()
+
+async def run_storage_janitor():
+    try:
+        report = await asyncio.to_thread(storage_janitor.run_once)
+    except Exception as e:
+        print(f"Storage janitor error: {e}")
+        return
+    freed = (report["scratch_bytes"] + report["partial_bytes"] + report["blob_bytes"])
+    if report["scratch_entries"] or report["blobs"] or report["partial_bytes"]:
+        print(f"Storage cleanup: {report['scratch_entries']} scratch files, {report['blobs']} blobs, "
+              f"{freed / 1024 / 1024:.1f} MB freed")
+    if report["over_quota_users"]:
+        print(f"Users over storage quota: {', '.join(report['over_quota_users'])}")
+    # Expired lyrics are already ignored on read; this keeps the table from growing
+    try:
+        purged = await asyncio.to_thread(lyrics_cache.purge_expired)
+        if purged:
+            print(f"Lyrics cache: {purged} expired entries removed")
+    except Exception as e:
+        print(f"Lyrics cache purge error: {e}")
+
+async def storage_janitor_loop():
+    interval = storage_janitor.settings.janitor_interval_minutes * 60
+    while True:
+        await asyncio.sleep(interval)
+        await run_storage_janitor()
 
 # Create FastAPI app with lifespan
 app = FastAPI(
@@ -82,57 +134,61 @@ app.add_middleware(
 # Initialize database
 db = Database()
 
+# Generated files: ETag/Range/cache-aware serving
+artifact_server = ArtifactServer()
+
+# Generated lyrics reused for repeated descriptions (LYRICS_CACHE_* settings)
+lyrics_cache = LyricsResultCache()
+
+# Cover images reused for repeated prompts (IMAGE_CACHE_* settings)
+image_cache = ImagePromptCache()
+
+# Per-user quotas and free-space guard for output/ (USER_STORAGE_QUOTA_MB, STORAGE_* settings)
+storage_janitor = StorageJanitor("output", extra_evictors=[image_cache.evict_lru])
+
+startup_profile.mark("init")
+
 # WebSocket connection manager with user tracking
 class ConnectionManager:
     def __init__(self):
         self.active_connections: Dict[str, Dict] = {}  # client_id -> {websocket, user_id}
+        self.user_clients: Dict[int, set] = {}  # user_id -> {client_id}
 
     async def connect(self, websocket: WebSocket, client_id: str, user_id: int):
         await websocket.accept()
+        # A reconnect may reuse the client_id: the new socket replaces the stale one
         self.active_connections[client_id] = {
             "websocket": websocket,
             "user_id": user_id
         }
+        self.user_clients.setdefault(user_id, set()).add(client_id)
 
-    def disconnect(self, client_id: str):
-        if client_id in self.active_connections:
+    def disconnect(self, client_id: str, websocket: Optional[WebSocket] = None):
+        connection = self.active_connections.get(client_id)
+        # Ignore late disconnects of a socket that was already replaced by a reconnect
+        if connection and (websocket is None or connection["websocket"] is websocket):
             del self.active_connections[client_id]
+            clients = self.user_clients.get(connection["user_id"])
+            if clients:
+                clients.discard(client_id)
+                if not clients:
+                    del self.user_clients[connection["user_id"]]
+
+    async def send_to_client(self, client_id: str, event: dict):
+        connection = self.active_connections.get(client_id)
+        if not connection:
+            return
+        try:
+            await connection["websocket"].send_json(event)
+        except Exception as e:
+            print(f"Error sending {event.get('type')} to {client_id}: {e}")
+            self.disconnect(client_id, connection["websocket"])
 
-    async def send_progress(self, client_id: str, message: str):
-        if client_id in self.active_connections:
-            try:
-                await self.active_connections[client_id]["websocket"].send_json({
-                    "type": "progress",
-                    "message": message,
-                    "timestamp": datetime.now().isoformat()
-                })
-            except Exception as e:
-                print(f"Error sending progress to {client_id}: {e}")
-                self.disconnect(client_id)
-
-    async def send_complete(self, client_id: str, data: dict):
-        if client_id in self.active_connections:
-            try:
-                await self.active_connections[client_id]["websocket"].send_json({
-                    "type": "complete",
-                    "data": data,
-                    "timestamp": datetime.now().isoformat()
-                })
-            except Exception as e:
-                print(f"Error sending completion to {client_id}: {e}")
-                self.disconnect(client_id)
-
-    async def send_error(self, client_id: str, error: str):
-        if client_id in self.active_connections:
-            try:
-                await self.active_connections[client_id]["websocket"].send_json({
-                    "type": "error",
-                    "error": error,
-                    "timestamp": datetime.now().isoformat()
-                })
-            except Exception as e:
-                print(f"Error sending error to {client_id}: {e}")
-                self.disconnect(client_id)
+    async def send_to_user(self, user_id: int, event: dict):
+        """Fan an event out to every open socket of the user"""
+        client_ids = list(self.user_clients.get(user_id, ()))
+        if client_ids:
+            await asyncio.gather(*(self.send_to_client(cid, event) for cid in client_ids))
 
     def get_user_id(self, client_id: str) -> Optional[int]:
         if client_id in self.active_connections:
@@ -141,6 +197,9 @@ class ConnectionManager:
 
 manager = ConnectionManager()
 
+# Job progress events: job id, stage and numeric progress, coalesced, replayable
+job_events = JobEventHub(manager.send_to_user)
+
 # Pydantic models
 class LoginRequest(BaseModel):
     username: str
@@ -160,6 +219,7 @@ class ConfigUpdateRequest(BaseModel):
 
 class GenerateLyricsRequest(BaseModel):
     description: str
+    force_fresh: bool = False  # Ignore cached lyrics for this description
 
 class GenerateSongRequestModel(BaseModel):
     lyrics: str
@@ -228,9 +288,13 @@ def get_user_clients(user_id: int) -> Dict:
     # Initialize OpenAI client
     if settings.get("openai_api_key"):
         try:
-            clients["openai_client"] = OpenAILyricsClient(
-                api_key=settings["openai_api_key"],
-                assistant_id=settings.get("openai_assistant_id", "asst_tR6OL8QLpSsDDlc6hKdBmVNU")
+            clients["openai_client"] = CachedLyricsClient(
+                OpenAILyricsClient(
+                    api_key=settings["openai_api_key"],
+                    assistant_id=settings.get("openai_assistant_id", "asst_tR6OL8QLpSsDDlc6hKdBmVNU")
+                ),
+                lyrics_cache,
+                user_id
             )
         except:
             clients["openai_client"] = None
@@ -240,6 +304,11 @@ def get_user_clients(user_id: int) -> Dict:
     return clients
 
 # Routes
+@app.get("/health")
+async def health():
+    """Liveness probe (Docker HEALTHCHECK) with the boot profile of this worker"""
+    return {"status": "ok", "startup": startup_profile.report()}
+
 @app.get("/")
 async def read_root(token: str = Cookie(None, alias="auth_token")):
     """Serve the main page or login page"""
@@ -365,9 +434,37 @@ async def get_status(user: Dict = Depends(get_current_user)):
         "suno_configured": bool(settings.get("suno_api_key")),
         "replicate_configured": bool(settings.get("replicate_api_token")),
         "openai_configured": bool(settings.get("openai_api_key")),
-        "ready": bool(settings.get("suno_api_key"))
+        "ready": bool(settings.get("suno_api_key")),
+        # Last validation results only; never probes the providers
+        "health": APIValidator.cached_health(**_validator_kwargs(settings))
     }
 
+@app.get("/api/storage")
+async def get_storage(user: Dict = Depends(get_current_user)):
+    """Disk usage of the user's sessions, quota and free space (admins also get store totals)"""
+    return await asyncio.to_thread(storage_janitor.report, user["id"], bool(user.get("is_admin")))
+
+def _require_admin(user: Dict):
+    if not user.get("is_admin"):
+        raise HTTPException(status_code=403, detail="Admin only")
+
+@app.get("/api/usage/events")
+async def get_usage_events(hours: float = 24, api: Optional[str] = None, user: Dict = Depends(get_current_user)):
+    """API usage rows of the last ``hours`` (admins)"""
+    _require_admin(user)
+    start = datetime.now() - timedelta(hours=max(0.0, min(hours, 24 * 90)))
+    events = await asyncio.to_thread(get_tracker().get_usage_between, start, None, api)
+    return {"events": events}
+
+@app.get("/api/usage/events/{usage_id}/payload")
+async def get_usage_payload(usage_id: int, user: Dict = Depends(get_current_user)):
+    """Full request/response of a usage row, including compacted ones (admins)"""
+    _require_admin(user)
+    payload = await asyncio.to_thread(get_tracker().get_payload, usage_id)
+    if payload is None:
+        raise HTTPException(status_code=404, detail="Usage event not found")
+    return payload
+
 @app.get("/api/config")
 async def get_config(user: Dict = Depends(get_current_user)):
     """Get current user's API configuration (keys masked)"""
@@ -417,20 +514,26 @@ async def update_config(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error updating configuration: {str(e)}")
 
+def _validator_kwargs(settings: Dict) -> Dict:
+    return {
+        "suno_key": settings.get("suno_api_key"),
+        "suno_url": settings.get("suno_base_url", "https://api.sunoapi.org"),
+        "replicate_token": settings.get("replicate_api_token"),
+        "openai_key": settings.get("openai_api_key"),
+        "openai_assistant": settings.get("openai_assistant_id")
+    }
+
 @app.post("/api/validate-apis")
-async def validate_apis(user: Dict = Depends(get_current_user)):
-    """Validate all configured APIs for the current user"""
+async def validate_apis(refresh: bool = False, user: Dict = Depends(get_current_user)):
+    """Validate all configured APIs for the current user (cached results unless refresh=true)"""
     settings = db.get_user_api_settings(user["id"])
 
     if not settings:
         return {"results": {}, "message": "No APIs configured"}
 
     results = await APIValidator.validate_all_apis(
-        suno_key=settings.get("suno_api_key"),
-        suno_url=settings.get("suno_base_url", "https://api.sunoapi.org"),
-        replicate_token=settings.get("replicate_api_token"),
-        openai_key=settings.get("openai_api_key"),
-        openai_assistant=settings.get("openai_assistant_id")
+        **_validator_kwargs(settings),
+        use_cache=not refresh
     )
 
     return {"results": results}
@@ -447,15 +550,45 @@ async def generate_lyrics(
         raise HTTPException(status_code=400, detail="OpenAI not configured")
 
     try:
-        lyrics = await clients["openai_client"].generate_lyrics(
+        lyrics, cached = await clients["openai_client"].generate(
             request.description,
             lambda msg: None,
-            session_id=str(uuid.uuid4())
+            session_id=str(uuid.uuid4()),
+            force_fresh=request.force_fresh
         )
-        return {"lyrics": lyrics}
+        return {"lyrics": lyrics, "cached": cached}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating lyrics: {str(e)}")
 
+def _session_summary(session) -> Dict:
+    """Card-level fields shared by the session list and search endpoints"""
+    # Safely check for audio tracks
+    has_audio = False
+    if session.response is not None:
+        if hasattr(session.response, 'tracks') and session.response.tracks is not None:
+            has_audio = len(session.response.tracks) > 0
+
+    # Handle timestamp - could be datetime or int (Unix timestamp)
+    timestamp_iso = None
+    if hasattr(session.timestamp, 'isoformat'):
+        timestamp_iso = session.timestamp.isoformat()
+    elif isinstance(session.timestamp, (int, float)):
+        from datetime import datetime
+        timestamp_iso = datetime.fromtimestamp(session.timestamp).isoformat()
+    else:
+        timestamp_iso = str(session.timestamp)
+
+    return {
+        "session_id": session.session_id,
+        "timestamp": timestamp_iso,
+        "title": session.request.title,
+        "style": session.request.style,
+        "has_audio": has_audio,
+        "has_image": session.image_response is not None and session.image_response.has_images,
+        "has_video": session.video_response is not None and session.video_response.has_video,
+        "output_directory": session.output_directory
+    }
+
 @app.get("/api/sessions")
 async def list_sessions(user: Dict = Depends(get_current_user)):
     """List all generation sessions for current user"""
@@ -467,32 +600,7 @@ async def list_sessions(user: Dict = Depends(get_current_user)):
         sessions_data = []
         for session in sessions:
             try:
-                # Safely check for audio tracks
-                has_audio = False
-                if session.response is not None:
-                    if hasattr(session.response, 'tracks') and session.response.tracks is not None:
-                        has_audio = len(session.response.tracks) > 0
-
-                # Handle timestamp - could be datetime or int (Unix timestamp)
-                timestamp_iso = None
-                if hasattr(session.timestamp, 'isoformat'):
-                    timestamp_iso = session.timestamp.isoformat()
-                elif isinstance(session.timestamp, (int, float)):
-                    from datetime import datetime
-                    timestamp_iso = datetime.fromtimestamp(session.timestamp).isoformat()
-                else:
-                    timestamp_iso = str(session.timestamp)
-
-                sessions_data.append({
-                    "session_id": session.session_id,
-                    "timestamp": timestamp_iso,
-                    "title": session.request.title,
-                    "style": session.request.style,
-                    "has_audio": has_audio,
-                    "has_image": session.image_response is not None and session.image_response.has_images,
-                    "has_video": session.video_response is not None and session.video_response.has_video,
-                    "output_directory": session.output_directory
-                })
+                sessions_data.append(_session_summary(session))
             except Exception as e:
                 print(f"Error processing session {session.session_id}: {str(e)}")
                 continue
@@ -501,6 +609,74 @@ async def list_sessions(user: Dict = Depends(get_current_user)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error listing sessions: {str(e)}")
 
+def _load_search_hits(list_use_case: ListSessionsUseCase, matches) -> List[Dict]:
+    sessions_data = []
+    for session_id, score in matches:
+        try:
+            session = list_use_case.get_session_by_id(session_id)
+            summary = _session_summary(session)
+        except FileNotFoundError:
+            # Deleted between the search and the load
+            continue
+        except Exception as e:
+            print(f"Error processing session {session_id}: {str(e)}")
+            continue
+        summary["score"] = score
+        sessions_data.append(summary)
+    return sessions_data
+
+@app.get("/api/sessions/search")
+async def search_sessions(
+    q: str = "",
+    limit: int = 50,
+    user: Dict = Depends(get_current_user)
+):
+    """Full-text search over session title, style and lyrics, best match first"""
+    try:
+        clients = get_user_clients(user["id"])
+        list_use_case = ListSessionsUseCase(clients["file_storage"])
+        limit = max(1, min(limit, 200))
+        matches = await asyncio.to_thread(list_use_case.search, q, limit)
+        sessions_data = await asyncio.to_thread(_load_search_hits, list_use_case, matches)
+        return {"query": q, "sessions": sessions_data}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error searching sessions: {str(e)}")
+
+def _zip_download_response(exporter: SessionZipExporter, session_ids: List[str], filename: str) -> StreamingResponse:
+    return StreamingResponse(
+        exporter.iter_zip(session_ids),
+        media_type="application/zip",
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "Cache-Control": "no-store"
+        }
+    )
+
+@app.get("/api/sessions/export")
+async def export_sessions(ids: str = "", user: Dict = Depends(get_current_user)):
+    """Stream a ZIP of the selected sessions (comma-separated ids; empty = all sessions)"""
+    exporter = SessionZipExporter(f"output/user_{user['id']}")
+    if ids.strip():
+        session_ids = [sid.strip() for sid in ids.split(",") if sid.strip()]
+    else:
+        clients = get_user_clients(user["id"])
+        session_ids = [s.session_id for s in ListSessionsUseCase(clients["file_storage"]).execute()]
+
+    session_ids = exporter.existing_sessions(session_ids)
+    if not session_ids:
+        raise HTTPException(status_code=404, detail="No sessions to export")
+
+    filename = f"videomusic_{len(session_ids)}_sessions_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
+    return _zip_download_response(exporter, session_ids, filename)
+
+@app.get("/api/sessions/{session_id}/export")
+async def export_session(session_id: str, user: Dict = Depends(get_current_user)):
+    """Stream a ZIP with the audio, cover, video, metadata and subtitles of one session"""
+    exporter = SessionZipExporter(f"output/user_{user['id']}")
+    if not exporter.session_path(session_id):
+        raise HTTPException(status_code=404, detail="Session not found")
+    return _zip_download_response(exporter, [session_id], f"{session_id}.zip")
+
 @app.get("/api/sessions/{session_id}")
 async def get_session(session_id: str, user: Dict = Depends(get_current_user)):
     """Get details of a specific session"""
@@ -544,7 +720,7 @@ async def get_session(session_id: str, user: Dict = Depends(get_current_user)):
                     response_data["audio_files"].append({
                         "title": track.title,
                         "path": str(audio_file),
-                        "url": f"/api/files/{session_id}/{audio_file.name}"
+                        "url": artifact_server.versioned_url(f"/api/files/{session_id}/{audio_file.name}", audio_file)
                     })
 
         # Get image file from the session directory
@@ -557,7 +733,7 @@ async def get_session(session_id: str, user: Dict = Depends(get_current_user)):
                     image_path = image_files[0]
                     response_data["image_file"] = {
                         "path": str(image_path),
-                        "url": f"/api/files/{session_id}/{image_path.name}"
+                        "url": artifact_server.versioned_url(f"/api/files/{session_id}/{image_path.name}", image_path)
                     }
 
         # Get video file from the session directory
@@ -570,8 +746,15 @@ async def get_session(session_id: str, user: Dict = Depends(get_current_user)):
                     video_path = video_files[0]
                     response_data["video_file"] = {
                         "path": str(video_path),
-                        "url": f"/api/files/{session_id}/{video_path.name}"
+                        "url": artifact_server.versioned_url(f"/api/files/{session_id}/{video_path.name}", video_path),
+                        "hls_url": None
                     }
+                    # Adaptive HLS/fMP4 ladder, when the render pipeline produced one
+                    hls_master = Path(VideoStreamingPackager.hls_master_path(str(video_path)))
+                    if hls_master.exists():
+                        response_data["video_file"]["hls_url"] = artifact_server.versioned_url(
+                            f"/api/files/{session_id}/{hls_master.name}", hls_master
+                        )
 
         return response_data
     except HTTPException:
@@ -582,35 +765,43 @@ async def get_session(session_id: str, user: Dict = Depends(get_current_user)):
         print(traceback.format_exc())
         raise HTTPException(status_code=500, detail=f"Error getting session: {str(e)}")
 
-@app.get("/api/files/{session_id}/{filename}")
-async def get_file(session_id: str, filename: str, user: Dict = Depends(get_current_user)):
+@app.api_route("/api/files/{session_id}/{filename}", methods=["GET", "HEAD"])
+async def get_file(
+    session_id: str,
+    filename: str,
+    request: Request,
+    user: Dict = Depends(get_current_user)
+):
     """Serve generated files (audio, image, video) - only for file owner"""
     try:
-        file_path = Path(f"output/user_{user['id']}") / session_id / filename
+        file_path = ArtifactServer.resolve(Path(f"output/user_{user['id']}"), session_id, filename)
 
-        if not file_path.exists():
+        if file_path is None:
             raise HTTPException(status_code=404, detail="File not found")
 
-        ext = file_path.suffix.lower()
-        media_types = {
-            ".mp3": "audio/mpeg",
-            ".wav": "audio/wav",
-            ".ogg": "audio/ogg",
-            ".png": "image/png",
-            ".jpg": "image/jpeg",
-            ".jpeg": "image/jpeg",
-            ".mp4": "video/mp4",
-            ".webm": "video/webm"
-        }
-
-        media_type = media_types.get(ext, "application/octet-stream")
-        return FileResponse(file_path, media_type=media_type)
+        return await artifact_server.serve(request, file_path)
 
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error serving file: {str(e)}")
 
+def _resume_cursors(raw) -> Dict[str, int]:
+    """Last seen seq per job from a resume command; malformed entries are skipped"""
+    if not isinstance(raw, dict):
+        return {}
+    cursors = {}
+    for job_id, seq in raw.items():
+        if isinstance(seq, bool):
+            continue
+        try:
+            seq = int(seq)
+        except (TypeError, ValueError, OverflowError):
+            continue
+        if seq >= 0:
+            cursors[str(job_id)] = seq
+    return cursors
+
 @app.websocket("/ws/{client_id}")
 async def websocket_endpoint(websocket: WebSocket, client_id: str):
     """WebSocket endpoint for real-time progress updates"""
@@ -633,31 +824,115 @@ async def websocket_endpoint(websocket: WebSocket, client_id: str):
             data = await websocket.receive_json()
             command = data.get("command")
 
-            if command == "generate_song":
-                asyncio.create_task(generate_song_task(client_id, user["id"], data))
-            elif command == "generate_image":
-                asyncio.create_task(generate_image_task(client_id, user["id"], data))
-            elif command == "generate_video":
-                asyncio.create_task(generate_video_task(client_id, user["id"], data))
-            elif command == "loop_video":
-                asyncio.create_task(loop_video_task(client_id, user["id"], data))
+            job_tasks = {
+                "generate_song": ("song", generate_song_task),
+                "generate_image": ("image", generate_image_task),
+                "generate_video": ("video", generate_video_task),
+                "loop_video": ("loop", loop_video_task),
+                "generate_lyrics": ("lyrics", generate_lyrics_task),
+            }
+
+            if command in job_tasks:
+                kind, task = job_tasks[command]
+                idempotency_key = data.get("idempotency_key")
+                fingerprint = request_fingerprint(command, data)
+
+                # Double clicks and retried sends attach to the job already running
+                duplicate_id = job_events.find_duplicate(user["id"], idempotency_key, fingerprint)
+                if duplicate_id:
+                    # Ack the client's own key: the replayed job_started carries the first one
+                    await websocket.send_json({
+                        "type": "job_ack",
+                        "job_id": duplicate_id,
+                        "idempotency_key": idempotency_key
+                    })
+                    await websocket.send_json({
+                        "type": "resume",
+                        "jobs": [],
+                        "events": job_events.history(duplicate_id)
+                    })
+                    continue
+
+                job_id = job_events.create_job(
+                    user["id"], kind, data.get("session_id"),
+                    idempotency_key=idempotency_key, fingerprint=fingerprint
+                )
+                await job_events.started(job_id)
+
+                # Media jobs write to output/: free regenerable files first, refuse if still over quota
+                if kind != "lyrics" and storage_janitor.quota_bytes:
+                    usage = await asyncio.to_thread(storage_janitor.enforce_quota, user["id"])
+                    if usage["over_quota"]:
+                        await job_events.error(
+                            job_id,
+                            f"Storage quota exceeded ({usage['bytes'] / 1024 / 1024:.0f} MB of "
+                            f"{usage['quota_bytes'] / 1024 / 1024:.0f} MB)"
+                        )
+                        continue
+
+                asyncio.create_task(task(job_id, user["id"], data))
+            elif command == "resume":
+                # Reconnected client: replay what it missed since its last seen seq per job
+                cursors = _resume_cursors(data.get("cursors"))
+                await websocket.send_json({
+                    "type": "resume",
+                    "jobs": job_events.active_jobs(user["id"]),
+                    "events": job_events.replay(user["id"], cursors)
+                })
             elif command == "ping":
                 await websocket.send_json({"type": "pong"})
 
     except WebSocketDisconnect:
-        manager.disconnect(client_id)
+        manager.disconnect(client_id, websocket)
     except Exception as e:
         print(f"WebSocket error: {e}")
-        manager.disconnect(client_id)
+        manager.disconnect(client_id, websocket)
 
 # Background tasks (same as before but with user_id parameter)
-async def generate_song_task(client_id: str, user_id: int, data: dict):
+async def generate_lyrics_task(job_id: str, user_id: int, data: dict):
+    """Background task for lyrics generation, streaming the text as it is generated"""
+    try:
+        clients = get_user_clients(user_id)
+
+        if not clients["openai_client"]:
+            await job_events.error(job_id, "OpenAI not configured")
+            return
+
+        description = (data.get("description") or "").strip()
+        if not description:
+            await job_events.error(job_id, "Description is required")
+            return
+
+        streamed = 0
+
+        async def delta_callback(text: str):
+            nonlocal streamed
+            await job_events.delta(job_id, text, streamed)
+            streamed += len(text)
+
+        async def progress_callback(message: str):
+            await job_events.progress(job_id, message, stage="lyrics")
+
+        lyrics, cached = await clients["openai_client"].generate(
+            description,
+            progress_callback,
+            session_id=job_id,
+            delta_callback=delta_callback,
+            force_fresh=bool(data.get("force_fresh"))
+        )
+
+        await job_events.complete(job_id, {"lyrics": lyrics, "cached": cached})
+
+    except Exception as e:
+        await job_events.error(job_id, str(e))
+
+async def generate_song_task(job_id: str, user_id: int, data: dict):
     """Background task for song generation"""
     try:
         clients = get_user_clients(user_id)
 
         if not clients["suno_client"]:
-            await manager.send_error(client_id, "Suno API not configured")
+            await job_events.error(job_id, "Suno API not configured")
             return
 
         request_data = data.get("request", {})
@@ -673,12 +948,13 @@ async def generate_song_task(client_id: str, user_id: int, data: dict):
         generate_image = request_data.get("generate_image", True) and clients["image_client"] is not None
 
         async def progress_callback(message: str):
-            await manager.send_progress(client_id, message)
+            await job_events.progress(job_id, message)
 
         generate_use_case = GenerateSongUseCase(
             clients["suno_client"],
             clients["file_storage"],
-            clients["image_client"]
+            clients["image_client"],
+            image_cache
         )
 
         session = await generate_use_case.execute(request, progress_callback, generate_image)
@@ -687,22 +963,22 @@ async def generate_song_task(client_id: str, user_id: int, data: dict):
         db.track_generation_session(user_id, session.session_id, session.request.title, session.request.style)
         db.update_generation_status(session.session_id, "completed")
 
-        await manager.send_complete(client_id, {
+        await job_events.complete(job_id, {
             "session_id": session.session_id,
             "title": session.request.title,
             "output_directory": session.output_directory
         })
 
     except Exception as e:
-        await manager.send_error(client_id, str(e))
+        await job_events.error(job_id, str(e))
 
-async def generate_image_task(client_id: str, user_id: int, data: dict):
+async def generate_image_task(job_id: str, user_id: int, data: dict):
     """Background task for image generation"""
     try:
         clients = get_user_clients(user_id)
 
         if not clients["image_client"]:
-            await manager.send_error(client_id, "Replicate API not configured")
+            await job_events.error(job_id, "Replicate API not configured")
             return
 
         session_id = data.get("session_id")
@@ -710,32 +986,36 @@ async def generate_image_task(client_id: str, user_id: int, data: dict):
         session = list_use_case.get_session_by_id(session_id)
 
         if not session:
-            await manager.send_error(client_id, "Session not found")
+            await job_events.error(job_id, "Session not found")
             return
 
         async def progress_callback(message: str):
-            await manager.send_progress(client_id, message)
+            await job_events.progress(job_id, message)
 
         image_prompt = f"{session.request.title}: {session.request.prompt}"
-        generate_image_use_case = GenerateImageUseCase(clients["image_client"], clients["file_storage"])
+        generate_image_use_case = GenerateImageUseCase(clients["image_client"], clients["file_storage"], image_cache)
 
-        updated_session = await generate_image_use_case.execute(session, image_prompt, progress_callback)
+        # Regenerating a session's cover asks for a new image unless reuse is requested
+        updated_session = await generate_image_use_case.execute(
+            session, image_prompt, progress_callback,
+            reuse_cached=bool(data.get("reuse_cached_image", False))
+        )
 
-        await manager.send_complete(client_id, {
+        await job_events.complete(job_id, {
             "session_id": updated_session.session_id,
             "message": "Image generated successfully"
         })
 
     except Exception as e:
-        await manager.send_error(client_id, str(e))
+        await job_events.error(job_id, str(e))
 
-async def generate_video_task(client_id: str, user_id: int, data: dict):
+async def generate_video_task(job_id: str, user_id: int, data: dict):
     """Background task for video generation"""
     try:
         clients = get_user_clients(user_id)
 
         if not clients["video_client"]:
-            await manager.send_error(client_id, "Replicate API not configured")
+            await job_events.error(job_id, "Replicate API not configured")
             return
 
         session_id = data.get("session_id")
@@ -743,34 +1023,34 @@ async def generate_video_task(client_id: str, user_id: int, data: dict):
         session = list_use_case.get_session_by_id(session_id)
 
         if not session:
-            await manager.send_error(client_id, "Session not found")
+            await job_events.error(job_id, "Session not found")
             return
 
         if not session.image_response or not session.image_response.has_images:
-            await manager.send_error(client_id, "Session needs an image first")
+            await job_events.error(job_id, "Session needs an image first")
             return
 
         async def progress_callback(message: str):
-            await manager.send_progress(client_id, message)
+            await job_events.progress(job_id, message)
 
         generate_video_use_case = GenerateVideoUseCase(clients["video_client"], clients["file_storage"])
         updated_session = await generate_video_use_case.execute(session, progress_callback)
 
-        await manager.send_complete(client_id, {
+        await job_events.complete(job_id, {
             "session_id": updated_session.session_id,
             "message": "Video generated successfully"
         })
 
     except Exception as e:
-        await manager.send_error(client_id, str(e))
+        await job_events.error(job_id, str(e))
 
-async def loop_video_task(client_id: str, user_id: int, data: dict):
+async def loop_video_task(job_id: str, user_id: int, data: dict):
     """Background task for video loop creation"""
     try:
         clients = get_user_clients(user_id)
 
         if not clients["video_client"]:
-            await manager.send_error(client_id, "Replicate API not configured")
+            await job_events.error(job_id, "Replicate API not configured")
             return
 
         session_id = data.get("session_id")
@@ -778,29 +1058,36 @@ async def loop_video_task(client_id: str, user_id: int, data: dict):
         session = list_use_case.get_session_by_id(session_id)
 
         if not session:
-            await manager.send_error(client_id, "Session not found")
+            await job_events.error(job_id, "Session not found")
             return
 
         if not session.video_response or not session.video_response.has_video:
-            await manager.send_error(client_id, "Session needs a video first")
+            await job_events.error(job_id, "Session needs a video first")
             return
 
         async def progress_callback(message: str):
-            await manager.send_progress(client_id, message)
+            await job_events.progress(job_id, message)
+
+        loop_video_use_case = LoopVideoUseCase(clients["video_client"], clients["file_storage"])
+        if not await asyncio.to_thread(loop_video_use_case.has_original_video, session):
+            await job_events.error(
+                job_id,
+                "The original animation was evicted to free storage; generate the video again to create a loop"
+            )
+            return
 
         # Get subtitle configuration from request
         subtitle_config = data.get("subtitle_config", {})
 
-        loop_video_use_case = LoopVideoUseCase(clients["video_client"], clients["file_storage"])
         updated_session = await loop_video_use_case.execute(session, progress_callback, subtitle_config)
 
-        await manager.send_complete(client_id, {
+        await job_events.complete(job_id, {
             "session_id": updated_session.session_id,
             "message": "Video loop created successfully"
         })
 
     except Exception as e:
-        await manager.send_error(client_id, str(e))
+        await job_events.error(job_id, str(e))
 
 # Mount static files LAST (after all routes)
 app.mount("/static", StaticFiles(directory="web"), name="static")